@@ -0,0 +1,100 @@
+import asyncio
+
+from fastapi import APIRouter
+from pydantic import BaseModel
+from typing import Dict, List, Optional
+
+from ...services.draft_sessions import DraftSession, apply_action, draft_sessions, score_session
+
+
+router = APIRouter(prefix="/drafts", tags=["drafts"])
+
+
+class DraftCreateRequest(BaseModel):
+    patch: str
+    blue_side: bool = True
+
+
+class PickRequest(BaseModel):
+    side: str  # "blue" or "red"
+    role: str
+    champion: str
+
+
+class BanRequest(BaseModel):
+    champion: str
+
+
+class DraftResponse(BaseModel):
+    session_id: str
+    patch: str
+    blue_side: bool
+    blue_team: Dict[str, str]
+    red_team: Dict[str, str]
+    bans: List[str]
+    win_probability: float
+    model_version: str
+    details: Optional[Dict] = None
+
+
+async def _respond(session: DraftSession) -> DraftResponse:
+    probability, details = await asyncio.to_thread(score_session, session)
+    return DraftResponse(
+        session_id=session.id,
+        blue_side=session.blue_side,
+        win_probability=probability,
+        model_version=details.get("model_version", "unknown"),
+        details=details,
+        **session.state.snapshot(),
+    )
+
+
+@router.post("", response_model=DraftResponse)
+async def create_draft(payload: DraftCreateRequest) -> DraftResponse:
+    session = draft_sessions.create(payload.patch, payload.blue_side)
+    async with session.lock:
+        return await _respond(session)
+
+
+@router.get("/{session_id}", response_model=DraftResponse)
+async def get_draft(session_id: str) -> DraftResponse:
+    session = draft_sessions.get(session_id)
+    async with session.lock:
+        return await _respond(session)
+
+
+@router.post("/{session_id}/picks", response_model=DraftResponse)
+async def add_pick(session_id: str, payload: PickRequest) -> DraftResponse:
+    session = draft_sessions.get(session_id)
+    async with session.lock:
+        apply_action(session, lambda s: s.pick(payload.side, payload.role, payload.champion))
+        return await _respond(session)
+
+
+@router.delete("/{session_id}/picks/{side}/{role}", response_model=DraftResponse)
+async def remove_pick(session_id: str, side: str, role: str) -> DraftResponse:
+    session = draft_sessions.get(session_id)
+    async with session.lock:
+        apply_action(session, lambda s: s.unpick(side, role))
+        return await _respond(session)
+
+
+@router.post("/{session_id}/bans", response_model=DraftResponse)
+async def add_ban(session_id: str, payload: BanRequest) -> DraftResponse:
+    session = draft_sessions.get(session_id)
+    async with session.lock:
+        apply_action(session, lambda s: s.ban(payload.champion))
+        return await _respond(session)
+
+
+@router.delete("/{session_id}/bans/{champion}", response_model=DraftResponse)
+async def remove_ban(session_id: str, champion: str) -> DraftResponse:
+    session = draft_sessions.get(session_id)
+    async with session.lock:
+        apply_action(session, lambda s: s.unban(champion))
+        return await _respond(session)
+
+
+@router.delete("/{session_id}", status_code=204)
+async def delete_draft(session_id: str) -> None:
+    draft_sessions.delete(session_id)
@@ -0,0 +1,60 @@
+from typing import Any, Dict, List, Literal, Optional
+
+from fastapi import APIRouter, HTTPException, Query
+from pydantic import BaseModel, Field
+
+from ...core.config import settings
+from ...services.jobs import job_queue
+
+
+router = APIRouter(prefix="/jobs", tags=["jobs"])
+
+Stage = Literal["collect", "parse", "lane_wr", "featurize", "train", "all"]
+
+
+class CollectRequest(BaseModel):
+    game_name: str
+    tag_line: str
+    count: int = Field(50, ge=1, le=100)
+    queue: Optional[int] = 420
+    with_timeline: bool = False
+
+
+class PipelineRequest(BaseModel):
+    # Recent matches of this Riot ID; without it the run builds from JOB_MATCHES_PATH
+    collect: Optional[CollectRequest] = None
+    train: bool = True
+    patch: Optional[str] = None
+    calibration: Optional[Literal["isotonic", "platt"]] = "isotonic"
+    # Stages to rerun even when their inputs are unchanged
+    force: List[Stage] = []
+
+
+# Job handlers block their worker thread and the Redis store is synchronous, so the routes
+# are plain functions and run in FastAPI's threadpool
+
+
+@router.post("/pipeline", status_code=202)
+def submit_pipeline(payload: PipelineRequest) -> Dict[str, Any]:
+    if payload.collect is None and not settings.job_matches_path:
+        raise HTTPException(
+            status_code=422, detail="Pass collect, or configure JOB_MATCHES_PATH on the server"
+        )
+    if payload.collect is not None and not settings.riot_api_key:
+        raise HTTPException(status_code=503, detail="RIOT_API_KEY is not configured")
+    return job_queue.submit("pipeline", payload.model_dump())
+
+
+@router.get("")
+def list_jobs(limit: int = Query(50, ge=1, le=500)) -> List[Dict[str, Any]]:
+    return job_queue.recent(limit)
+
+
+@router.get("/{job_id}")
+def get_job(job_id: str) -> Dict[str, Any]:
+    return job_queue.get(job_id)
+
+
+@router.delete("/{job_id}")
+def cancel_job(job_id: str) -> Dict[str, Any]:
+    return job_queue.cancel(job_id)
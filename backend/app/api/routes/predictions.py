@@ -1,8 +1,12 @@
-from fastapi import APIRouter
+import asyncio
+
+from fastapi import APIRouter, HTTPException
 from pydantic import BaseModel
 from typing import Dict, List, Optional
 
-from ...services.prediction_service import predict_win_probability
+from ...core.config import settings
+from ...services.batching import batcher
+from ...services.prediction_service import predict_win_probabilities
 
 
 router = APIRouter(tags=["predictions"]) 
@@ -14,6 +18,9 @@ class PredictionRequest(BaseModel):
     runes: Dict[str, str]
     patch: str
     blue_side: bool
+    # Optional explicit role -> champion mappings; otherwise champions/lanes are paired up
+    blue_team: Optional[Dict[str, str]] = None
+    red_team: Optional[Dict[str, str]] = None
 
 
 class PredictionResponse(BaseModel):
@@ -22,11 +29,29 @@ class PredictionResponse(BaseModel):
     details: Optional[Dict] = None
 
 
-@router.post("/predict", response_model=PredictionResponse)
-async def predict(payload: PredictionRequest) -> PredictionResponse:
-    probability, details = predict_win_probability(payload.model_dump())
+def _to_response(probability: float, details: Dict) -> PredictionResponse:
     return PredictionResponse(
         win_probability=probability,
         model_version=details.get("model_version", "unknown"),
         details=details,
     )
+
+
+@router.post("/predict", response_model=PredictionResponse)
+async def predict(payload: PredictionRequest) -> PredictionResponse:
+    # Concurrent calls are micro-batched into a single model invocation
+    probability, details = await batcher.submit(payload.model_dump())
+    return _to_response(probability, details)
+
+
+@router.post("/predict/batch", response_model=List[PredictionResponse])
+async def predict_batch(payloads: List[PredictionRequest]) -> List[PredictionResponse]:
+    if len(payloads) > settings.predict_batch_max:
+        raise HTTPException(
+            status_code=422,
+            detail=f"At most {settings.predict_batch_max} drafts per batch, got {len(payloads)}",
+        )
+    results = await asyncio.to_thread(
+        predict_win_probabilities, [p.model_dump() for p in payloads]
+    )
+    return [_to_response(probability, details) for probability, details in results]
@@ -0,0 +1,48 @@
+import asyncio
+
+from fastapi import APIRouter
+from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+
+from ...services.recommendation_service import DraftContext, recommend_champions
+
+
+router = APIRouter(tags=["recommendations"])
+
+
+class RecommendationRequest(BaseModel):
+    draft: DraftContext
+    role: str
+    enemy_champions_by_role: Dict[str, str] = Field(default_factory=dict)
+    bans: List[str] = Field(default_factory=list)
+    top_k: Optional[int] = Field(default=20, ge=1)
+
+
+class ChampionRecommendation(BaseModel):
+    champion: str
+    win_probability: float
+
+
+class RecommendationResponse(BaseModel):
+    role: str
+    recommendations: List[ChampionRecommendation]
+    model_version: str
+    details: Optional[Dict] = None
+
+
+@router.post("/recommend", response_model=RecommendationResponse)
+async def recommend(payload: RecommendationRequest) -> RecommendationResponse:
+    ranked, details = await asyncio.to_thread(
+        recommend_champions,
+        payload.draft,
+        payload.role,
+        payload.enemy_champions_by_role,
+        payload.bans,
+        payload.top_k,
+    )
+    return RecommendationResponse(
+        role=payload.role,
+        recommendations=[ChampionRecommendation(**r) for r in ranked],
+        model_version=details.get("model_version", "unknown"),
+        details=details,
+    )
@@ -1,22 +1,42 @@
 from __future__ import annotations
 
-from typing import Any, Optional
+import asyncio
+import json
+import logging
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
 
 from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
 
+from ...core.config import settings
+from ...core.ml import ensure_ml_on_path
+from ...services import cache
+from ...services.cache import response_cache
 from ...services.riot_client import client as riot
 
+ensure_ml_on_path()
+
+from src.etl.parse_match import parse_match_to_record  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
 router = APIRouter(prefix="/riot", tags=["riot"])
 
 
 @router.get("/account/by-riot-id")
 async def account_by_riot_id(game_name: str = Query(...), tag_line: str = Query(...)) -> Any:
-    return await riot.get_by_riot_id(game_name=game_name, tag_line=tag_line)
+    return await response_cache.get_or_fetch(
+        f"account:{game_name.lower()}#{tag_line.lower()}",
+        cache.ACCOUNT,
+        lambda: riot.get_by_riot_id(game_name=game_name, tag_line=tag_line),
+    )
 
 
 @router.get("/summoner/by-puuid/{puuid}")
 async def summoner_by_puuid(puuid: str) -> Any:
-    return await riot.get_by_puuid(puuid)
+    return await response_cache.get_or_fetch(
+        f"summoner:{riot.platform}:{puuid}", cache.SUMMONER, lambda: riot.get_by_puuid(puuid)
+    )
 
 
 @router.get("/matches/by-puuid/{puuid}")
@@ -26,29 +46,162 @@ async def matches_by_puuid(
     count: int = Query(20, ge=1, le=100),
     queue: Optional[int] = Query(None, description="Queue ID (e.g., 420 for Ranked Solo)")
 ) -> Any:
-    return await riot.get_matches_by_puuid(puuid=puuid, start=start, count=count, queue=queue)
+    return await response_cache.get_or_fetch(
+        f"match_ids:{puuid}:{start}:{count}:{queue}",
+        cache.MATCH_IDS,
+        lambda: riot.get_matches_by_puuid(puuid=puuid, start=start, count=count, queue=queue),
+    )
 
 
 @router.get("/match/{match_id}")
 async def match(match_id: str) -> Any:
-    return await riot.get_match(match_id)
+    return await response_cache.get_or_fetch(
+        f"match:{match_id}", cache.MATCH, lambda: riot.get_match(match_id)
+    )
 
 
 @router.get("/match/{match_id}/timeline")
 async def match_timeline(match_id: str) -> Any:
-    return await riot.get_match_timeline(match_id)
+    return await response_cache.get_or_fetch(
+        f"timeline:{match_id}", cache.MATCH_TIMELINE, lambda: riot.get_match_timeline(match_id)
+    )
 
 
 @router.get("/league/entries/by-summoner/{encrypted_summoner_id}")
 async def league_entries_by_summoner(encrypted_summoner_id: str) -> Any:
-    return await riot.get_league_entries_by_summoner(encrypted_summoner_id)
+    return await response_cache.get_or_fetch(
+        f"league:{riot.platform}:{encrypted_summoner_id}",
+        cache.LEAGUE_ENTRIES,
+        lambda: riot.get_league_entries_by_summoner(encrypted_summoner_id),
+    )
+
+
+async def _ddragon_version() -> str:
+    return await response_cache.get_or_fetch(
+        "ddragon:version", cache.DDRAGON_VERSION, riot.get_ddragon_version
+    )
 
 
 @router.get("/static/champions")
 async def champions() -> Any:
-    return await riot.get_champions()
+    version = await _ddragon_version()
+    return await response_cache.get_or_fetch(
+        f"static:champions:{version}", cache.STATIC, lambda: riot.get_champions(version)
+    )
 
 
 @router.get("/static/runes")
 async def runes() -> Any:
-    return await riot.get_runes()
+    version = await _ddragon_version()
+    return await response_cache.get_or_fetch(
+        f"static:runes:{version}", cache.STATIC, lambda: riot.get_runes(version)
+    )
+
+
+def _ndjson(line: Dict[str, Any]) -> bytes:
+    return (json.dumps(line, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+async def _profile_lines(
+    account: Dict[str, Any], count: int, queue: Optional[int]
+) -> AsyncIterator[bytes]:
+    """NDJSON lines for a resolved account, yielded in the order the fetches finish.
+
+    The summoner -> league chain and the match-id -> matches fan-out run concurrently;
+    every upstream call (through the same cache as the single-resource routes) waits on
+    one semaphore of RIOT_PROFILE_CONCURRENCY slots. A failed fetch becomes an ``error``
+    line instead of ending the stream.
+    """
+    yield _ndjson({"type": "account", "data": account})
+    puuid = account["puuid"]
+    lines: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+    slots = asyncio.Semaphore(settings.riot_profile_concurrency)
+
+    async def fetch(kind: str, call: Callable[[], Awaitable[Any]], **fields: Any) -> Any:
+        try:
+            async with slots:
+                return await call()
+        except HTTPException as exc:
+            error = {"type": "error", "source": kind, "status": exc.status_code}
+            lines.put_nowait({**error, "detail": exc.detail, **fields})
+            return None
+
+    async def champion_index() -> Any:
+        try:
+            return (await riot.get_static_data()).champion_index
+        except Exception:
+            return None  # bans stay numeric ids
+
+    champions = asyncio.create_task(champion_index())
+
+    async def summoner_and_league() -> None:
+        summoner = await fetch("summoner", lambda: summoner_by_puuid(puuid))
+        if summoner is None:
+            return
+        lines.put_nowait({"type": "summoner", "data": summoner})
+        if summoner.get("id"):
+            entries = await fetch("league", lambda: league_entries_by_summoner(summoner["id"]))
+            if entries is not None:
+                lines.put_nowait({"type": "league", "data": entries})
+
+    async def one_match(index: int, match_id: str) -> None:
+        payload = await fetch("match", lambda: match(match_id), match_id=match_id)
+        if payload is not None:
+            record = parse_match_to_record(payload, champions=await champions)
+            lines.put_nowait({"type": "match", "index": index, "data": record})
+
+    async def match_history() -> None:
+        ids = await fetch(
+            "match_ids",
+            lambda: matches_by_puuid(puuid, start=0, count=count, queue=queue),
+        )
+        if ids is None:
+            return
+        lines.put_nowait({"type": "match_ids", "data": ids})
+        await asyncio.gather(*(one_match(i, match_id) for i, match_id in enumerate(ids)))
+
+    async def run() -> None:
+        try:
+            await asyncio.gather(summoner_and_league(), match_history())
+        finally:
+            lines.put_nowait(None)
+
+    runner = asyncio.create_task(run())
+    counts: Dict[str, int] = {}
+    try:
+        while (line := await lines.get()) is not None:
+            counts[line["type"]] = counts.get(line["type"], 0) + 1
+            yield _ndjson(line)
+        if runner.exception() is not None:
+            logger.error("Profile stream for %s failed", puuid, exc_info=runner.exception())
+            error = {"type": "error", "source": "profile", "status": 500}
+            yield _ndjson({**error, "detail": "Internal error"})
+            counts["error"] = counts.get("error", 0) + 1
+        done = {"matches": counts.get("match", 0), "errors": counts.get("error", 0)}
+        yield _ndjson({"type": "done", **done})
+    finally:
+        # Client went away (or we are done): stop outstanding upstream calls
+        for task in (runner, champions):
+            task.cancel()
+
+
+@router.get("/profile/{game_name}/{tag_line}")
+async def profile(
+    game_name: str,
+    tag_line: str,
+    count: int = Query(10, ge=1, le=100, description="Most recent matches to include"),
+    queue: Optional[int] = Query(None, description="Queue ID (e.g., 420 for Ranked Solo)"),
+) -> StreamingResponse:
+    """Account, summoner, league entries and recent match summaries as one NDJSON stream.
+
+    The account is resolved before streaming starts, so an unknown Riot ID is a plain 404.
+    """
+    account = await account_by_riot_id(game_name=game_name, tag_line=tag_line)
+    return StreamingResponse(
+        _profile_lines(account, count, queue), media_type="application/x-ndjson"
+    )
+
+
+@router.get("/cache/stats")
+async def cache_stats() -> Any:
+    return response_cache.snapshot()
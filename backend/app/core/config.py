@@ -1,6 +1,7 @@
 from pydantic import BaseModel
 from pydantic import Field
 import os
+from pathlib import Path
 from typing import Optional, List
 
 
@@ -12,14 +13,83 @@ class Settings(BaseModel):
 
     # Model serving
     model_path: str = Field(default=os.getenv("MODEL_PATH", "./models/model.joblib"))
+    # Seconds between MODEL_PATH mtime checks for hot reload (0 disables the watcher)
+    model_reload_interval: float = Field(default=float(os.getenv("MODEL_RELOAD_INTERVAL", "5")))
+    # Per-patch models ({model_id}.joblib + manifest.json, see ml/src/train/model_registry.py);
+    # loaded lazily and LRU-evicted beyond MODEL_CACHE_MB of bundle size. MODEL_PATH serves
+    # whatever no registry entry resolves to.
+    model_registry_dir: str = Field(default=os.getenv("MODEL_REGISTRY_DIR", "./models/registry"))
+    model_cache_mb: float = Field(default=float(os.getenv("MODEL_CACHE_MB", "1024")))
+    # Micro-batching of concurrent /predict calls into one predict_proba
+    predict_max_batch_size: int = Field(default=int(os.getenv("PREDICT_MAX_BATCH_SIZE", "64")))
+    predict_max_wait_ms: float = Field(default=float(os.getenv("PREDICT_MAX_WAIT_MS", "5")))
+    # Calibrated probabilities are clipped to [CALIBRATION_CLIP, 1 - CALIBRATION_CLIP]
+    calibration_clip: float = Field(default=float(os.getenv("CALIBRATION_CLIP", "0.01")))
+    # Largest draft list /predict/batch accepts (422 beyond it)
+    predict_batch_max: int = Field(default=int(os.getenv("PREDICT_BATCH_MAX", "256")))
+    # Live-draft sessions (/drafts): idle lifetime in seconds and LRU cap
+    draft_session_ttl: float = Field(default=float(os.getenv("DRAFT_SESSION_TTL", "1800")))
+    draft_max_sessions: int = Field(default=int(os.getenv("DRAFT_MAX_SESSIONS", "10000")))
+
+    # Feature sources shared with the ML workspace
+    ml_root: str = Field(
+        default=os.getenv("ML_ROOT", str(Path(__file__).resolve().parents[3] / "ml"))
+    )
+    champ_info_path: str = Field(
+        default=os.getenv("CHAMP_INFO_PATH", "./models/champ_info.parquet")
+    )
+    # Per-patch ChampionTable bundles ({patch}/attributes.npy + meta.json); the newest is
+    # memory-mapped so all workers share one copy. Falls back to champ_info_path if empty.
+    champion_table_dir: str = Field(
+        default=os.getenv("CHAMPION_TABLE_DIR", "./models/champion_table")
+    )
+    lane_wr_path: str = Field(default=os.getenv("LANE_WR_PATH", "./models/lane_wr.parquet"))
+    pair_matrix_dir: str = Field(default=os.getenv("PAIR_MATRIX_DIR", "./models/pair_matrices"))
 
     # Riot API config
-    riot_api_key: Optional[str] = Field(default=os.getenv("RGAPI-965d0ac6-09b6-4f6e-8037-bbb388db3d6a"))
+    riot_api_key: Optional[str] = Field(default=os.getenv("RIOT_API_KEY"))
     riot_platform: str = Field(default=os.getenv("RIOT_PLATFORM", "na1"))  # e.g., na1, euw1
     riot_region: str = Field(default=os.getenv("RIOT_REGION", "americas"))  # americas, europe, asia
+    # Overrides both routing hosts (e.g. a local mock server)
+    riot_base_url: Optional[str] = Field(default=os.getenv("RIOT_BASE_URL") or None)
+    # Application limits assumed until Riot's X-App-Rate-Limit header is seen
+    riot_app_rate_limit: str = Field(default=os.getenv("RIOT_APP_RATE_LIMIT", "20:1,100:120"))
+    riot_max_connections: int = Field(default=int(os.getenv("RIOT_MAX_CONNECTIONS", "50")))
+    # Upstream calls one /riot/profile stream may have in flight at once
+    riot_profile_concurrency: int = Field(default=int(os.getenv("RIOT_PROFILE_CONCURRENCY", "8")))
+
+    # Riot proxy response cache: "memory" (in-process LRU) or "redis"
+    cache_backend: str = Field(default=os.getenv("CACHE_BACKEND", "memory"))
+    redis_url: str = Field(default=os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+    cache_max_entries: int = Field(default=int(os.getenv("CACHE_MAX_ENTRIES", "2048")))
+    # JSON size bound of the in-process LRU; timelines are several MB each
+    cache_max_mb: float = Field(default=float(os.getenv("CACHE_MAX_MB", "256")))
+    # Timelines are immutable but large, so they expire instead of accumulating in Redis
+    cache_timeline_ttl: float = Field(default=float(os.getenv("CACHE_TIMELINE_TTL", "86400")))
+    # Match-id lists, league entries, account/summoner lookups
+    cache_short_ttl: float = Field(default=float(os.getenv("CACHE_SHORT_TTL", "60")))
+    # How long the latest DDragon version is trusted before re-checking
+    cache_static_ttl: float = Field(default=float(os.getenv("CACHE_STATIC_TTL", "3600")))
+
+    # Background jobs (/jobs): "memory" runs them on JOB_WORKERS threads in this process;
+    # "redis" queues them in REDIS_URL for any process with JOB_WORKERS > 0 (or the
+    # standalone `python -m app.services.jobs` consumer)
+    job_backend: str = Field(default=os.getenv("JOB_BACKEND", "memory"))
+    job_workers: int = Field(default=int(os.getenv("JOB_WORKERS", "1")))
+    job_max_history: int = Field(default=int(os.getenv("JOB_MAX_HISTORY", "200")))
+    # Seconds without a heartbeat after which a Redis-queued running job is requeued
+    job_stale_after: float = Field(default=float(os.getenv("JOB_STALE_AFTER", "60")))
+    # Pipeline stage outputs, content-hash state and the raw store of collected matches
+    job_work_dir: str = Field(default=os.getenv("JOB_WORK_DIR", "./jobs"))
+    # Existing matches parquet (file or directory) merged into every pipeline run
+    job_matches_path: Optional[str] = Field(default=os.getenv("JOB_MATCHES_PATH") or None)
+    # Size bound of the stage artifact cache under JOB_WORK_DIR/cache (0 disables it)
+    job_cache_max_gb: float = Field(default=float(os.getenv("JOB_CACHE_MAX_GB", "20")))
 
     # DDragon (static data)
-    ddragon_version: Optional[str] = Field(default=os.getenv("DDRAGON_VERSION"))
+    ddragon_version: Optional[str] = Field(default=os.getenv("DDRAGON_VERSION") or None)
+    # On-disk DDragon snapshots ({version}/champion.json, runesReforged.json)
+    static_data_dir: str = Field(default=os.getenv("STATIC_DATA_DIR", "./static_data"))
 
 
 settings = Settings()
@@ -0,0 +1,13 @@
+from __future__ import annotations
+
+import sys
+from pathlib import Path
+
+from .config import settings
+
+
+def ensure_ml_on_path() -> None:
+    """Make the ML workspace's ``src`` package importable (shared featurizers and clients)."""
+    ml_root = str(Path(settings.ml_root).resolve())
+    if ml_root not in sys.path:
+        sys.path.insert(0, ml_root)
@@ -1,11 +1,45 @@
+import asyncio
+import contextlib
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from .core.config import settings
+from .api.routes.drafts import router as drafts_router
+from .api.routes.jobs import router as jobs_router
 from .api.routes.predictions import router as predictions_router
+from .api.routes.recommendations import router as recommendations_router
 from .api.routes.riot import router as riot_router
+from .services import prediction_service
+from .services.batching import batcher
+from .services.jobs import job_queue
+from .services.riot_client import client as riot_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load the model once at startup so the first /predict does not pay for it
+    await asyncio.to_thread(prediction_service.warm_up)
+    await riot_client.preload_static_data()
+    watcher = None
+    if settings.model_reload_interval > 0:
+        watcher = asyncio.create_task(
+            prediction_service.watch_model_file(settings.model_reload_interval)
+        )
+    await batcher.start()
+    job_queue.start()
+    yield
+    job_queue.stop()
+    await batcher.stop()
+    await riot_client.aclose()
+    if watcher is not None:
+        watcher.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await watcher
+
 
-app = FastAPI(title="DraftDiff API", version="0.1.0")
+app = FastAPI(title="DraftDiff API", version="0.1.0", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,4 +56,7 @@ async def health() -> dict:
 
 
 app.include_router(predictions_router, prefix="/api/v1")
+app.include_router(recommendations_router, prefix="/api/v1")
+app.include_router(drafts_router, prefix="/api/v1")
 app.include_router(riot_router, prefix="/api/v1")
+app.include_router(jobs_router, prefix="/api/v1")
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from ..core.config import settings
+from .prediction_service import predict_win_probabilities
+
+_Item = Tuple[Dict, "asyncio.Future[Tuple[float, Dict]]"]
+# Queued by stop(): the worker scores what it has collected, then exits
+_STOP: Any = object()
+
+
+class MicroBatcher:
+    """Coalesce concurrent single-draft predictions into one model call.
+
+    Requests queue up for at most ``max_wait_ms`` (or until ``max_batch_size`` are waiting),
+    then the whole batch is scored in a worker thread so the event loop never blocks. If the
+    batch call raises, its drafts are re-scored one by one so a bad payload only fails its
+    own request.
+    """
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[Dict]], List[Tuple[float, Dict]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+    ) -> None:
+        self.predict_fn = predict_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self._queue: Optional[asyncio.Queue[_Item]] = None
+        self._worker: Optional[asyncio.Task[Any]] = None
+
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._worker = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._worker is None:
+            return
+        if self._queue is not None and not self._worker.done():
+            # A sentinel rather than cancel(), so the batch being scored still gets results
+            await self._queue.put(_STOP)
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._worker
+        self._worker = None
+        # Anything still queued is scored directly rather than dropped
+        queue, self._queue = self._queue, None
+        leftover: List[_Item] = []
+        while queue is not None and not queue.empty():
+            leftover.append(queue.get_nowait())
+        if leftover:
+            self._resolve(leftover, await asyncio.to_thread(self._predict_each, leftover))
+
+    async def submit(self, payload: Dict) -> Tuple[float, Dict]:
+        if not self.running or self._queue is None:
+            return (await asyncio.to_thread(self.predict_fn, [payload]))[0]
+        fut: asyncio.Future[Tuple[float, Dict]] = asyncio.get_running_loop().create_future()
+        await self._queue.put((payload, fut))
+        return await fut
+
+    async def _collect(self, queue: asyncio.Queue[_Item]) -> Tuple[List[_Item], bool]:
+        """Next batch, and whether stop() was requested while collecting it."""
+        first = await queue.get()
+        if first is _STOP:
+            return [], True
+        batch = [first]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(queue.get(), remaining)
+            except asyncio.TimeoutError:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _predict_each(self, batch: List[_Item]) -> List[Union[Tuple[float, Dict], Exception]]:
+        """Score drafts individually, so each gets its own result or error."""
+        results: List[Union[Tuple[float, Dict], Exception]] = []
+        for payload, _ in batch:
+            try:
+                results.append(self.predict_fn([payload])[0])
+            except Exception as exc:
+                results.append(exc)
+        return results
+
+    @staticmethod
+    def _resolve(batch: List[_Item], results: List[Union[Tuple[float, Dict], Exception]]) -> None:
+        for (_, fut), result in zip(batch, results):
+            if fut.done():
+                continue
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    async def _score(self, batch: List[_Item]) -> None:
+        payloads = [payload for payload, _ in batch]
+        try:
+            try:
+                results: List[Any] = await asyncio.to_thread(self.predict_fn, payloads)
+            except Exception:
+                if len(batch) == 1:
+                    raise
+                results = await asyncio.to_thread(self._predict_each, batch)
+        except asyncio.CancelledError:
+            # Cancelled from outside (e.g. loop teardown): fail the batch instead of hanging it
+            for _, fut in batch:
+                fut.cancel()
+            raise
+        except Exception as exc:
+            results = [exc]
+        self._resolve(batch, results)
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        while True:
+            batch, stopping = await self._collect(self._queue)
+            if batch:
+                await self._score(batch)
+            if stopping:
+                return
+
+
+batcher = MicroBatcher(
+    predict_win_probabilities,
+    max_batch_size=settings.predict_max_batch_size,
+    max_wait_ms=settings.predict_max_wait_ms,
+)
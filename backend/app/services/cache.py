@@ -0,0 +1,200 @@
+from __future__ import annotations
+
+import asyncio
+import functools
+import json
+import logging
+import time
+from collections import OrderedDict, defaultdict
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    """How long a route's responses live; ``ttl=None`` means never expire (immutable data)."""
+
+    name: str
+    ttl: Optional[float]
+
+
+class CacheBackend:
+    async def get(self, key: str) -> Any:
+        """Return the cached value or ``_MISSING``."""
+        raise NotImplementedError
+
+    async def set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        raise NotImplementedError
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class LRUCache(CacheBackend):
+    """In-process LRU bounded by entry count and, with ``max_bytes``, by the JSON size of the
+    values (a value larger than the whole bound is not cached), with per-entry expiry."""
+
+    def __init__(self, max_entries: int = 2048, max_bytes: Optional[int] = None) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._data: "OrderedDict[str, Tuple[Optional[float], Any, int]]" = OrderedDict()
+        self.bytes = 0
+        self.evictions = 0
+
+    def _drop(self, key: str) -> None:
+        self.bytes -= self._data.pop(key)[2]
+
+    async def get(self, key: str) -> Any:
+        entry = self._data.get(key)
+        if entry is None:
+            return _MISSING
+        expires_at, value, _ = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._drop(key)
+            return _MISSING
+        self._data.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        size = len(json.dumps(value)) if self.max_bytes is not None else 0
+        if key in self._data:
+            self._drop(key)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        self._data[key] = (expires_at, value, size)
+        self.bytes += size
+        while len(self._data) > self.max_entries or (
+            self.max_bytes is not None and self.bytes > self.max_bytes
+        ):
+            self._drop(next(iter(self._data)))
+            self.evictions += 1
+
+    def size(self) -> Optional[int]:
+        return len(self._data)
+
+
+class RedisCache(CacheBackend):
+    """Redis-backed cache shared across API workers; values are stored as JSON."""
+
+    def __init__(self, url: str, prefix: str = "draftdiff:riot:") -> None:
+        from redis import asyncio as redis_asyncio
+
+        self.redis = redis_asyncio.from_url(url)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Any:
+        try:
+            raw = await self.redis.get(self.prefix + key)
+        except Exception:
+            logger.warning("Redis get failed for %s; treating as miss", key, exc_info=True)
+            return _MISSING
+        return _MISSING if raw is None else json.loads(raw)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float]) -> None:
+        try:
+            await self.redis.set(
+                self.prefix + key, json.dumps(value), ex=int(ttl) if ttl is not None else None
+            )
+        except Exception:
+            logger.warning("Redis set failed for %s", key, exc_info=True)
+
+
+class ResponseCache:
+    """Cache-aside wrapper with request coalescing and per-policy hit/miss counters.
+
+    Concurrent misses for the same key share one upstream call; failures are not cached. The
+    call runs in its own task, so a cancelled caller (e.g. a disconnected client) only stops
+    waiting and the others still get the result.
+    """
+
+    def __init__(self, backend: CacheBackend) -> None:
+        self.backend = backend
+        self._inflight: Dict[str, "asyncio.Task[Any]"] = {}
+        self.stats: Dict[str, Dict[str, int]] = defaultdict(
+            lambda: {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        )
+
+    async def get_or_fetch(
+        self, key: str, policy: CachePolicy, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        stats = self.stats[policy.name]
+        value = await self.backend.get(key)
+        if value is not _MISSING:
+            stats["hits"] += 1
+            return value
+
+        task = self._inflight.get(key)
+        if task is not None:
+            stats["coalesced"] += 1
+        else:
+            stats["misses"] += 1
+            task = asyncio.ensure_future(self._fill(key, policy, fetch))
+            self._inflight[key] = task
+            task.add_done_callback(functools.partial(self._fill_done, key))
+        return await asyncio.shield(task)
+
+    async def _fill(
+        self, key: str, policy: CachePolicy, fetch: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        try:
+            value = await fetch()
+        except Exception:
+            self.stats[policy.name]["errors"] += 1
+            raise
+        await self.backend.set(key, value, policy.ttl)
+        return value
+
+    def _fill_done(self, key: str, task: "asyncio.Task[Any]") -> None:
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # Mark retrieved so a failure nobody else awaited is not logged as unhandled
+        if not task.cancelled():
+            task.exception()
+
+    def snapshot(self) -> Dict[str, Any]:
+        totals = {"hits": 0, "misses": 0, "coalesced": 0, "errors": 0}
+        for counters in self.stats.values():
+            for k, v in counters.items():
+                totals[k] += v
+        lookups = totals["hits"] + totals["misses"] + totals["coalesced"]
+        return {
+            "backend": type(self.backend).__name__,
+            "entries": self.backend.size(),
+            "evictions": getattr(self.backend, "evictions", None),
+            "bytes": getattr(self.backend, "bytes", None),
+            "hit_rate": (totals["hits"] / lookups) if lookups else None,
+            "totals": totals,
+            "by_policy": {name: dict(c) for name, c in self.stats.items()},
+        }
+
+
+# Per-route TTL policies
+MATCH = CachePolicy("match", ttl=None)  # finished matches never change
+MATCH_TIMELINE = CachePolicy("match_timeline", ttl=settings.cache_timeline_ttl)
+MATCH_IDS = CachePolicy("match_ids", ttl=settings.cache_short_ttl)
+LEAGUE_ENTRIES = CachePolicy("league_entries", ttl=settings.cache_short_ttl)
+ACCOUNT = CachePolicy("account", ttl=settings.cache_short_ttl)
+SUMMONER = CachePolicy("summoner", ttl=settings.cache_short_ttl)
+DDRAGON_VERSION = CachePolicy("ddragon_version", ttl=settings.cache_static_ttl)
+STATIC = CachePolicy("static", ttl=None)  # keyed by DDragon version, so a new patch is a new key
+
+
+def _build_backend() -> CacheBackend:
+    if settings.cache_backend == "redis":
+        try:
+            return RedisCache(settings.redis_url)
+        except ImportError:
+            logger.warning("redis package not installed; falling back to in-process LRU")
+    return LRUCache(
+        max_entries=settings.cache_max_entries, max_bytes=int(settings.cache_max_mb * (1 << 20))
+    )
+
+
+response_cache = ResponseCache(_build_backend())
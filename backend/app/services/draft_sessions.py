@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import asyncio
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Tuple
+
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..core.ml import ensure_ml_on_path
+from .feature_service import get_feature_sources
+from .prediction_service import get_model, model_details, score_frame
+
+ensure_ml_on_path()
+
+from src.features.draft_state import DraftState  # noqa: E402
+
+
+@dataclass
+class DraftSession:
+    id: str
+    state: DraftState
+    blue_side: bool
+    last_used: float = field(default_factory=time.monotonic)
+    # Serializes actions on one session; different sessions proceed concurrently
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+
+
+class DraftSessionStore:
+    """In-process live-draft sessions, dropped after ``ttl`` idle seconds or LRU beyond
+    ``max_sessions``. Sessions live in one API worker, so multi-worker deployments need
+    sticky routing on the session id."""
+
+    def __init__(self, ttl: float, max_sessions: int) -> None:
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, DraftSession]" = OrderedDict()
+
+    def _evict(self, now: float) -> None:
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if len(self._sessions) <= self.max_sessions and now - oldest.last_used < self.ttl:
+                break
+            self._sessions.popitem(last=False)
+
+    def create(self, patch: str, blue_side: bool) -> DraftSession:
+        sources = get_feature_sources()
+        state = DraftState(
+            sources.champion_tables.for_patch(patch),
+            patch,
+            lane_index=sources.lane_index,
+            pair_matrices=sources.pair_matrices.for_patch(patch),
+        )
+        session = DraftSession(id=uuid.uuid4().hex, state=state, blue_side=blue_side)
+        self._sessions[session.id] = session
+        self._evict(time.monotonic())
+        return session
+
+    def get(self, session_id: str) -> DraftSession:
+        now = time.monotonic()
+        self._evict(now)
+        session = self._sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail=f"Draft session {session_id} not found")
+        session.last_used = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def delete(self, session_id: str) -> None:
+        if self._sessions.pop(session_id, None) is None:
+            raise HTTPException(status_code=404, detail=f"Draft session {session_id} not found")
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+
+def apply_action(session: DraftSession, action: Callable[[DraftState], object]) -> None:
+    try:
+        action(session.state)
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+
+def score_session(session: DraftSession) -> Tuple[float, Dict]:
+    """One-row prediction from the session's running sums (requester-side probability)."""
+    model = get_model(session.state.patch)
+    if model is None:
+        raise HTTPException(status_code=503, detail="No trained model is loaded")
+    p_blue = float(score_frame(model, session.state.feature_frame())[0])
+    probability = p_blue if session.blue_side else 1.0 - p_blue
+    details = {**model_details(model), "blue_win_probability": p_blue}
+    return probability, details
+
+
+draft_sessions = DraftSessionStore(
+    ttl=settings.draft_session_ttl, max_sessions=settings.draft_max_sessions
+)
@@ -0,0 +1,127 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..core.config import settings
+from ..core.ml import ensure_ml_on_path
+
+# Featurization is shared with the ML workspace so serving builds exactly the training columns
+ensure_ml_on_path()
+
+from src.features.champion_table import ChampionTableSet  # noqa: E402
+from src.features.featurize import aggregate_side_features, as_champion_table  # noqa: E402
+from src.features.matchup_features import (  # noqa: E402
+    LaneWinrateIndex,
+    compute_lane_matchup_features,
+)
+from src.features.pair_features import PairMatrixSet  # noqa: E402
+
+
+_ROLE_ALIASES = {
+    "top": "top",
+    "jg": "jg",
+    "jungle": "jg",
+    "jungler": "jg",
+    "mid": "mid",
+    "middle": "mid",
+    "adc": "adc",
+    "bot": "adc",
+    "bottom": "adc",
+    "carry": "adc",
+    "sup": "sup",
+    "support": "sup",
+    "utility": "sup",
+}
+
+
+@dataclass(frozen=True)
+class FeatureSources:
+    # Per-patch champion attribute bundles (memory-mapped) over the champ_info table
+    champion_tables: ChampionTableSet
+    lane_index: LaneWinrateIndex
+    # Per-patch synergy/counter tensors (memory-mapped); empty when none are deployed
+    pair_matrices: PairMatrixSet
+
+
+_SOURCES: Optional[FeatureSources] = None
+
+
+def normalize_lane(lane: str) -> Optional[str]:
+    return _ROLE_ALIASES.get(lane.strip().lower())
+
+
+def teams_from_payload(payload: Dict) -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Resolve a prediction payload into (blue_team, red_team) role -> champion dicts.
+
+    Explicit ``blue_team``/``red_team`` mappings win. Otherwise ``champions[i]`` plays
+    ``lanes[i]``; the first champion seen for a role is blue, the second is red.
+    """
+    blue_team = dict(payload.get("blue_team") or {})
+    red_team = dict(payload.get("red_team") or {})
+    if blue_team or red_team:
+        return blue_team, red_team
+    for champ, lane in zip(payload.get("champions", []), payload.get("lanes", [])):
+        role = normalize_lane(lane)
+        if role is None or not champ:
+            continue
+        if role not in blue_team:
+            blue_team[role] = champ
+        elif role not in red_team:
+            red_team[role] = champ
+    return blue_team, red_team
+
+
+def load_champion_tables() -> ChampionTableSet:
+    """Memory-mapped per-patch bundles under champion_table_dir; patches before the oldest
+    bundle (or all of them, without bundles) use the table built from champ_info."""
+    champ_path = Path(settings.champ_info_path)
+    champ_info = pd.read_parquet(champ_path) if champ_path.exists() else pd.DataFrame()
+    if "champion" in champ_info.columns:
+        champ_info = champ_info.set_index("champion")
+    return ChampionTableSet.load(Path(settings.champion_table_dir), as_champion_table(champ_info))
+
+
+def load_feature_sources() -> FeatureSources:
+    lane_path = Path(settings.lane_wr_path)
+    lane_wr = pd.read_parquet(lane_path) if lane_path.exists() else pd.DataFrame()
+    return FeatureSources(
+        champion_tables=load_champion_tables(),
+        lane_index=LaneWinrateIndex(lane_wr),
+        pair_matrices=PairMatrixSet.load(Path(settings.pair_matrix_dir)),
+    )
+
+
+def get_feature_sources() -> FeatureSources:
+    global _SOURCES
+    if _SOURCES is None:
+        _SOURCES = load_feature_sources()
+    return _SOURCES
+
+
+def build_features(payload: Dict, sources: FeatureSources) -> Dict[str, float]:
+    blue_team, red_team = teams_from_payload(payload)
+    patch = str(payload.get("patch", ""))
+    side_feats = aggregate_side_features(
+        blue_team, red_team, sources.champion_tables.for_patch(patch)
+    )
+    lane_feats = compute_lane_matchup_features(blue_team, red_team, patch, sources.lane_index)
+    pair_feats = sources.pair_matrices.features(blue_team, red_team, patch)
+    return {**side_feats, **lane_feats, **pair_feats}
+
+
+def build_feature_matrix(payloads: Sequence[Dict], feature_names: List[str]) -> np.ndarray:
+    """Rows in ``feature_names`` order; features the draft does not produce are NaN."""
+    sources = get_feature_sources()
+    X = np.full((len(payloads), len(feature_names)), np.nan, dtype=np.float64)
+    for i, payload in enumerate(payloads):
+        feats = build_features(payload, sources)
+        for j, name in enumerate(feature_names):
+            if name in feats:
+                X[i, j] = feats[name]
+    return X
+
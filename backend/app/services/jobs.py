@@ -0,0 +1,525 @@
+from __future__ import annotations
+
+import abc
+import json
+import logging
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import HTTPException
+
+from ..core.config import settings
+from ..core.ml import ensure_ml_on_path
+
+logger = logging.getLogger(__name__)
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext:
+    """Handed to a running handler: ``update`` merges fields into the job record and
+    ``checkpoint`` raises JobCancelled once a cancel was requested (call it between steps)."""
+
+    def __init__(self, store: "JobStore", job_id: str) -> None:
+        self.store = store
+        self.job_id = job_id
+
+    def update(self, **fields: Any) -> None:
+        self.store.update(self.job_id, **fields)
+
+    def checkpoint(self) -> None:
+        if self.store.cancel_requested(self.job_id):
+            raise JobCancelled()
+
+
+# handler(params, context) -> JSON-able result
+Handler = Callable[[Dict[str, Any], JobContext], Any]
+
+
+class JobStore(abc.ABC):
+    """Job records (plain JSON-able dicts) keyed by id.
+
+    ``update`` merges fields without reading the record first, and ``transition`` is an
+    atomic compare-and-set on ``status``, so a cancel and a worker claiming the same queued
+    job cannot both win.
+    """
+
+    @abc.abstractmethod
+    def put(self, job: Dict[str, Any]) -> None: ...
+
+    @abc.abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]: ...
+
+    @abc.abstractmethod
+    def update(self, job_id: str, **fields: Any) -> None: ...
+
+    @abc.abstractmethod
+    def transition(self, job_id: str, from_status: Sequence[str], **fields: Any) -> bool:
+        """Merge ``fields`` only if the job's status is one of ``from_status``."""
+
+    @abc.abstractmethod
+    def recent(self, limit: int) -> List[Dict[str, Any]]: ...
+
+    @abc.abstractmethod
+    def request_cancel(self, job_id: str) -> None: ...
+
+    @abc.abstractmethod
+    def cancel_requested(self, job_id: str) -> bool: ...
+
+
+class MemoryJobStore(JobStore):
+    """In-process records; the oldest finished jobs are dropped beyond ``max_jobs``."""
+
+    def __init__(self, max_jobs: int = 200) -> None:
+        self.max_jobs = max_jobs
+        self._jobs: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._cancel: set = set()
+        self._lock = threading.Lock()
+
+    def put(self, job: Dict[str, Any]) -> None:
+        with self._lock:
+            self._jobs[job["id"]] = job
+            over = len(self._jobs) - self.max_jobs
+            if over > 0:
+                finished = [i for i, j in self._jobs.items() if j["status"] in FINISHED]
+                for old_id in finished[:over]:
+                    del self._jobs[old_id]
+                    self._cancel.discard(old_id)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id] = {**self._jobs[job_id], **fields}
+
+    def transition(self, job_id: str, from_status: Sequence[str], **fields: Any) -> bool:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] not in from_status:
+                return False
+            self._jobs[job_id] = {**job, **fields}
+            return True
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(j) for j in reversed(self._jobs.values())][:limit]
+
+    def request_cancel(self, job_id: str) -> None:
+        with self._lock:
+            self._cancel.add(job_id)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return job_id in self._cancel
+
+
+# KEYS[1] job hash; ARGV[1] ttl, ARGV[2] "|<json status>|..." or "*" for any, then field/value
+# pairs. Fields are JSON-encoded, so the status field holds e.g. '"queued"'.
+_TRANSITION_LUA = """
+local status = redis.call('HGET', KEYS[1], 'status')
+if not status then return 0 end
+if ARGV[2] ~= '*' and not string.find(ARGV[2], '|' .. status .. '|', 1, true) then return 0 end
+redis.call('HSET', KEYS[1], unpack(ARGV, 3))
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+# KEYS[1] processing list, KEYS[2] queue; moves the id back only if it was still claimed
+_REQUEUE_LUA = """
+if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+  redis.call('RPUSH', KEYS[2], ARGV[1])
+  return 1
+end
+return 0
+"""
+
+
+class RedisJobStore(JobStore):
+    """Records shared by every API worker and ``python -m app.services.jobs`` consumers.
+
+    Each job is a hash of JSON-encoded fields, so progress updates only write the fields
+    they change and status changes go through a Lua compare-and-set. Consumers claim ids
+    with BLMOVE into a processing list and keep a heartbeat key alive while running;
+    :meth:`requeue_stale` puts back jobs whose consumer died (Redis >= 6.2).
+    """
+
+    def __init__(
+        self,
+        url: str,
+        prefix: str = "draftdiff:jobs:",
+        max_jobs: int = 200,
+        ttl: int = 7 * 86400,
+        stale_after: float = 60.0,
+    ) -> None:
+        import redis
+
+        self.redis = redis.Redis.from_url(url)
+        self.prefix = prefix
+        self.max_jobs = max_jobs
+        self.ttl = ttl
+        self.stale_after = stale_after
+        self.queue_key = prefix + "queue"
+        self.processing_key = prefix + "processing"
+        self._index = prefix + "index"
+        self._transition = self.redis.register_script(_TRANSITION_LUA)
+        self._requeue = self.redis.register_script(_REQUEUE_LUA)
+
+    def _key(self, job_id: str) -> str:
+        return self.prefix + job_id
+
+    def _heartbeat_key(self, job_id: str) -> str:
+        return self.prefix + "heartbeat:" + job_id
+
+    @staticmethod
+    def _decode(raw: Dict[bytes, bytes]) -> Optional[Dict[str, Any]]:
+        if not raw:
+            return None
+        return {k.decode("utf-8"): json.loads(v) for k, v in raw.items()}
+
+    def _set_fields(self, job_id: str, from_status: Optional[Sequence[str]], fields: Any) -> bool:
+        allowed = (
+            "*" if from_status is None else "|" + "|".join(json.dumps(s) for s in from_status) + "|"
+        )
+        args: List[Any] = [self.ttl, allowed]
+        for name, value in fields.items():
+            args += [name, json.dumps(value, default=str)]
+        return bool(self._transition(keys=[self._key(job_id)], args=args))
+
+    def put(self, job: Dict[str, Any]) -> None:
+        pipe = self.redis.pipeline()
+        pipe.hset(
+            self._key(job["id"]),
+            mapping={k: json.dumps(v, default=str) for k, v in job.items()},
+        )
+        pipe.expire(self._key(job["id"]), self.ttl)
+        pipe.zadd(self._index, {job["id"]: job["submitted_at"]})
+        pipe.zremrangebyrank(self._index, 0, -self.max_jobs - 1)
+        pipe.execute()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return self._decode(self.redis.hgetall(self._key(job_id)))
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        if fields:
+            self._set_fields(job_id, None, fields)
+
+    def transition(self, job_id: str, from_status: Sequence[str], **fields: Any) -> bool:
+        return self._set_fields(job_id, from_status, fields)
+
+    def recent(self, limit: int) -> List[Dict[str, Any]]:
+        ids = [i.decode("utf-8") for i in self.redis.zrevrange(self._index, 0, limit - 1)]
+        pipe = self.redis.pipeline()
+        for job_id in ids:
+            pipe.hgetall(self._key(job_id))
+        jobs = [self._decode(raw) for raw in pipe.execute()] if ids else []
+        return [job for job in jobs if job is not None]
+
+    def request_cancel(self, job_id: str) -> None:
+        # Separate key, so the cancel flag never races the worker's field writes
+        self.redis.set(self.prefix + "cancel:" + job_id, 1, ex=self.ttl)
+
+    def cancel_requested(self, job_id: str) -> bool:
+        return bool(self.redis.exists(self.prefix + "cancel:" + job_id))
+
+    def push(self, job_id: str) -> None:
+        self.redis.rpush(self.queue_key, job_id)
+
+    def claim(self, timeout: float) -> Optional[str]:
+        """Move the next queued id to the processing list and start its heartbeat."""
+        item = self.redis.blmove(self.queue_key, self.processing_key, timeout)
+        if item is None:
+            return None
+        job_id = item.decode("utf-8")
+        self.beat(job_id)
+        return job_id
+
+    def beat(self, job_id: str) -> None:
+        self.redis.set(self._heartbeat_key(job_id), 1, px=int(self.stale_after * 1000))
+
+    def release(self, job_id: str) -> None:
+        pipe = self.redis.pipeline()
+        pipe.lrem(self.processing_key, 1, job_id)
+        pipe.delete(self._heartbeat_key(job_id))
+        pipe.execute()
+
+    def requeue_stale(self) -> List[str]:
+        """Put claimed jobs whose heartbeat expired back on the queue (their consumer died);
+        finished or vanished ones are just dropped from the processing list."""
+        requeued: List[str] = []
+        for raw in self.redis.lrange(self.processing_key, 0, -1):
+            job_id = raw.decode("utf-8")
+            if self.redis.exists(self._heartbeat_key(job_id)):
+                continue
+            job = self.get(job_id)
+            if job is None or job["status"] in FINISHED:
+                self.redis.lrem(self.processing_key, 1, job_id)
+                continue
+            # Reset first: a consumer that pops a job still marked running would drop it
+            self.transition(
+                job_id,
+                ("running",),
+                status="queued",
+                started_at=None,
+                requeued=int(job.get("requeued") or 0) + 1,
+            )
+            if self._requeue(keys=[self.processing_key, self.queue_key], args=[job_id]):
+                logger.warning("Requeued job %s after its consumer stopped heartbeating", job_id)
+                requeued.append(job_id)
+        return requeued
+
+
+class JobQueue:
+    """Runs registered job kinds on ``workers`` background threads.
+
+    With the in-memory store jobs go straight to a thread pool in this process. With Redis
+    they are pushed to a shared list and any process running a consumer (API workers with
+    JOB_WORKERS > 0, or ``python -m app.services.jobs``) picks them up; a job whose consumer
+    dies is requeued once its heartbeat goes stale. Cancellation is cooperative: a running
+    job stops at its next stage boundary.
+    """
+
+    def __init__(self, store: JobStore, workers: int = 1) -> None:
+        self.store = store
+        self.workers = workers
+        self.handlers: Dict[str, Handler] = {}
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._consumers: List[threading.Thread] = []
+        self._stopping = threading.Event()
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self.handlers[kind] = handler
+
+    @property
+    def shared(self) -> bool:
+        return isinstance(self.store, RedisJobStore)
+
+    def start(self) -> None:
+        if self.workers <= 0 or self._pool is not None or self._consumers:
+            return
+        self._stopping.clear()
+        if not self.shared:
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="job")
+            return
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._consume, name=f"job-{i}", daemon=True)
+            thread.start()
+            self._consumers.append(thread)
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._pool is not None:
+            # Queued jobs are dropped with the in-memory store; a running one finishes
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+        self._consumers = []
+
+    def submit(self, kind: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        if kind not in self.handlers:
+            raise HTTPException(status_code=422, detail=f"Unknown job kind {kind!r}")
+        if not self.shared and self._pool is None:
+            raise HTTPException(status_code=503, detail="Job workers are not running")
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "params": params,
+            "status": "queued",
+            "submitted_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "stages": {},
+            "result": None,
+            "error": None,
+        }
+        self.store.put(job)
+        if isinstance(self.store, RedisJobStore):
+            # Consumers may live in other processes, so a shared queue accepts jobs regardless
+            self.store.push(job["id"])
+        else:
+            assert self._pool is not None
+            self._pool.submit(self.run, job["id"])
+        return job
+
+    def get(self, job_id: str) -> Dict[str, Any]:
+        job = self.store.get(job_id)
+        if job is None:
+            raise HTTPException(status_code=404, detail=f"Job {job_id} not found")
+        return job
+
+    def recent(self, limit: int = 50) -> List[Dict[str, Any]]:
+        return self.store.recent(limit)
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        job = self.get(job_id)
+        if job["status"] in FINISHED:
+            raise HTTPException(status_code=409, detail=f"Job {job_id} already {job['status']}")
+        self.store.request_cancel(job_id)
+        # Loses to a worker that already moved it to running; that one sees the flag instead
+        self.store.transition(job_id, ("queued",), status="cancelled", finished_at=time.time())
+        return self.get(job_id)
+
+    def _consume(self) -> None:
+        store = self.store
+        assert isinstance(store, RedisJobStore)
+        next_reap = 0.0
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() >= next_reap:
+                    store.requeue_stale()
+                    next_reap = time.monotonic() + store.stale_after
+                job_id = store.claim(timeout=1)
+            except Exception:
+                logger.warning("Job queue pop failed; retrying", exc_info=True)
+                self._stopping.wait(5)
+                continue
+            if job_id is None:
+                continue
+            done = threading.Event()
+            beat = threading.Thread(target=self._heartbeat, args=(store, job_id, done), daemon=True)
+            beat.start()
+            try:
+                self.run(job_id)
+            finally:
+                done.set()
+                beat.join()
+                store.release(job_id)
+
+    @staticmethod
+    def _heartbeat(store: RedisJobStore, job_id: str, done: threading.Event) -> None:
+        while not done.wait(store.stale_after / 3):
+            try:
+                store.beat(job_id)
+            except Exception:
+                logger.warning("Heartbeat for job %s failed", job_id, exc_info=True)
+
+    def run(self, job_id: str) -> None:
+        job = self.store.get(job_id)
+        if job is None:
+            return
+        if self.store.cancel_requested(job_id):
+            self.store.transition(job_id, ("queued",), status="cancelled", finished_at=time.time())
+            return
+        # Compare-and-set: a concurrent cancel, or another consumer, may have claimed it
+        if not self.store.transition(job_id, ("queued",), status="running", started_at=time.time()):
+            return
+        try:
+            result = self.handlers[job["kind"]](job["params"], JobContext(self.store, job_id))
+        except JobCancelled:
+            self._finish(job_id, status="cancelled")
+        except Exception as exc:
+            logger.error("Job %s (%s) failed", job_id, job["kind"], exc_info=True)
+            self._finish(
+                job_id,
+                status="failed",
+                error=f"{type(exc).__name__}: {exc}",
+                traceback=traceback.format_exc(limit=5),
+            )
+        else:
+            self._finish(job_id, status="succeeded", result=result)
+
+    def _finish(self, job_id: str, **fields: Any) -> None:
+        if not self.store.transition(job_id, ("running",), finished_at=time.time(), **fields):
+            logger.warning("Job %s was requeued while running; dropping its result", job_id)
+
+
+def run_pipeline_job(params: Dict[str, Any], context: JobContext) -> Dict[str, Any]:
+    """collect -> parse -> lane_wr -> featurize -> train (src/pipelines/train_pipeline.py),
+    with data and model locations taken from settings rather than the request."""
+    ensure_ml_on_path()
+    from src.cli.collect_and_build import CollectionConfig
+    from src.pipelines.artifact_cache import ArtifactCache
+    from src.pipelines.train_pipeline import PipelineConfig, build_stages, run_pipeline
+
+    work_dir = Path(settings.job_work_dir) / "pipeline"
+    collection = None
+    if params.get("collect"):
+        c = params["collect"]
+        collection = CollectionConfig(
+            api_key=settings.riot_api_key or "",
+            game_name=c["game_name"],
+            tag_line=c["tag_line"],
+            platform=settings.riot_platform,
+            region=settings.riot_region,
+            queue=c.get("queue"),
+            count=c.get("count", 50),
+            raw_dir=Path(settings.job_work_dir) / "raw",
+            static_dir=Path(settings.static_data_dir),
+            with_timeline=bool(c.get("with_timeline")),
+            base_url=settings.riot_base_url,
+        )
+    config = PipelineConfig(
+        work_dir=work_dir,
+        collect=collection,
+        matches=[Path(settings.job_matches_path)] if settings.job_matches_path else [],
+        champion_table_dir=Path(settings.champion_table_dir),
+        champ_info_path=Path(settings.champ_info_path),
+        pair_matrix_dir=Path(settings.pair_matrix_dir),
+        train=bool(params.get("train", True)),
+        registry=Path(settings.model_registry_dir),
+        patch=params.get("patch"),
+        calibration=params.get("calibration", "isotonic"),
+    )
+    stages: Dict[str, Dict[str, Any]] = {
+        s.name: {"status": "pending"} for s in build_stages(config)
+    }
+    context.update(stages=stages, current_stage=None, progress=0.0)
+
+    def progress(stage: str, status: str, info: Dict[str, Any]) -> None:
+        if status == "running":
+            context.checkpoint()
+        stages[stage] = {"status": status, **info}
+        done = sum(s["status"] in ("done", "skipped", "cached") for s in stages.values())
+        context.update(
+            stages=dict(stages), current_stage=stage, progress=round(done / len(stages), 3)
+        )
+
+    cache = None
+    if settings.job_cache_max_gb > 0:
+        cache = ArtifactCache(
+            Path(settings.job_work_dir) / "cache",
+            max_bytes=int(settings.job_cache_max_gb * (1 << 30)),
+        )
+    return run_pipeline(config, force=params.get("force") or (), progress=progress, cache=cache)
+
+
+def _build_store() -> JobStore:
+    if settings.job_backend == "redis":
+        try:
+            return RedisJobStore(
+                settings.redis_url,
+                max_jobs=settings.job_max_history,
+                stale_after=settings.job_stale_after,
+            )
+        except ImportError:
+            logger.warning("redis package not installed; falling back to in-process jobs")
+    return MemoryJobStore(max_jobs=settings.job_max_history)
+
+
+job_queue = JobQueue(_build_store(), workers=settings.job_workers)
+job_queue.register("pipeline", run_pipeline_job)
+
+
+if __name__ == "__main__":
+    # Dedicated consumer for JOB_BACKEND=redis (run from backend/: python -m app.services.jobs)
+    logging.basicConfig(level=logging.INFO)
+    if not job_queue.shared:
+        raise SystemExit("JOB_BACKEND=redis is required for a standalone job worker")
+    job_queue.workers = max(1, job_queue.workers)
+    job_queue.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        job_queue.stop()
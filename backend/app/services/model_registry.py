@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import logging
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from ..core.ml import ensure_ml_on_path
+
+ensure_ml_on_path()
+
+from src.train.model_registry import (  # noqa: E402
+    MANIFEST_FILE,
+    RegistryEntry,
+    read_manifest,
+    resolve_entry,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRegistry:
+    """Per-patch models listed in ``{root}/manifest.json``, loaded on first use.
+
+    The native export is loaded when the entry has one, else the joblib bundle. Loaded
+    models are kept in LRU order and evicted once their combined on-disk bundle size
+    exceeds ``memory_budget`` bytes; the most recently used model is always kept, so a single
+    oversized model still serves. ``refresh`` re-reads the manifest when it changes.
+    """
+
+    def __init__(
+        self, root: Path, memory_budget: int, loader: Callable[[Path, RegistryEntry], Any]
+    ) -> None:
+        self.root = Path(root)
+        self.memory_budget = memory_budget
+        self.loader = loader
+        self._entries: List[RegistryEntry] = []
+        self._manifest_mtime: Optional[int] = None
+        self._refreshed = False
+        self._models: "OrderedDict[str, Any]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # One lock per model id so concurrent requests for a cold model load it once
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+    @property
+    def active(self) -> bool:
+        if not self._refreshed:
+            self.refresh()
+        return bool(self._entries)
+
+    def refresh(self) -> bool:
+        """Re-read the manifest if its mtime changed; True when the model list changed."""
+        path = self.root / MANIFEST_FILE
+        try:
+            mtime: Optional[int] = path.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        with self._lock:
+            self._refreshed = True
+            if mtime == self._manifest_mtime:
+                return False
+            try:
+                entries = read_manifest(self.root) if mtime is not None else []
+            except Exception:
+                logger.exception("Failed to read model manifest %s; keeping current list", path)
+                return False
+            self._manifest_mtime = mtime
+            self._entries = entries
+            # Drop models that were replaced or removed from the manifest
+            live = {e.model_id for e in entries}
+            for model_id in [m for m in self._models if m not in live]:
+                self._drop(model_id)
+        logger.info("Model registry lists %d model(s)", len(entries))
+        return True
+
+    def _drop(self, model_id: str) -> None:
+        model = self._models.pop(model_id)
+        self._bytes -= model.size
+
+    def resolve(self, patch: Optional[str]) -> Optional[RegistryEntry]:
+        if not self._refreshed:
+            self.refresh()
+        return resolve_entry(self._entries, patch)
+
+    def get(self, patch: Optional[str]) -> Optional[Any]:
+        """The model serving ``patch`` (loading it if needed), or None if none resolves or loads."""
+        entry = self.resolve(patch)
+        if entry is None:
+            return None
+        with self._lock:
+            model = self._models.get(entry.model_id)
+            if model is not None:
+                self._models.move_to_end(entry.model_id)
+                return model
+            load_lock = self._load_locks.setdefault(entry.model_id, threading.Lock())
+        with load_lock:
+            with self._lock:
+                model = self._models.get(entry.model_id)
+            if model is None:
+                try:
+                    model = self.loader(self.root / (entry.native_path or entry.path), entry)
+                except Exception:
+                    logger.exception("Failed to load model %s from %s", entry.model_id, entry.path)
+                    return None
+                with self._lock:
+                    self._models[entry.model_id] = model
+                    self._bytes += model.size
+                    self._evict()
+                logger.info("Loaded model %s (patch %s)", entry.model_id, entry.patch or "global")
+        return model
+
+    def _evict(self) -> None:
+        while self._bytes > self.memory_budget and len(self._models) > 1:
+            model_id = next(iter(self._models))
+            self._drop(model_id)
+            logger.info("Evicted model %s from memory", model_id)
+
+    def loaded(self) -> List[str]:
+        with self._lock:
+            return list(self._models)
@@ -1,31 +1,226 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+import asyncio
+import hashlib
+import logging
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
 
 from ..core.config import settings
+from ..core.ml import ensure_ml_on_path
+from .feature_service import build_feature_matrix, get_feature_sources
+from .model_registry import ModelRegistry, RegistryEntry
+
+ensure_ml_on_path()
+
+from src.train.calibration import apply_calibration  # noqa: E402
+from src.train.native_model import NativePredictor  # noqa: E402
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class LoadedModel:
+    pipeline: Any
+    feature_names: List[str]
+    version: str
+    path: str
+    mtime_ns: int
+    size: int
+    # Registry entry this model was loaded from (None for the single MODEL_PATH model)
+    model_id: Optional[str] = None
+    patch: Optional[str] = None
+    # Piecewise-linear {"method", "x", "y"} map from raw to calibrated probability
+    calibration: Optional[Dict[str, Any]] = None
 
 
-_MODEL = None
+# Swapped by reference only: in-flight predictions keep the LoadedModel they started with
+_MODEL: Optional[LoadedModel] = None
 _MODEL_VERSION = "0.0.1-stub"
+_RELOAD_LOCK = threading.Lock()
 
 
-def _load_model_if_needed() -> None:
+def _file_digest(path: Path) -> str:
+    h = hashlib.sha1()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()[:12]
+
+
+def load_model(path: Path, entry: Optional[RegistryEntry] = None) -> LoadedModel:
+    """Load a model written by train_lightgbm.train_model.
+
+    A ``.txt`` path is the native LightGBM export (scored without sklearn); anything else is
+    the ``{"pipeline", "feature_names"}`` joblib bundle.
+    """
+    stat = path.stat()
+    if path.suffix == ".txt":
+        predictor = NativePredictor(path)
+        bundle = {
+            "pipeline": predictor,
+            "feature_names": predictor.feature_names,
+            "model_version": predictor.model_version,
+            "calibration": predictor.calibration,
+        }
+    else:
+        from joblib import load
+
+        bundle = load(path)
+    return LoadedModel(
+        pipeline=bundle["pipeline"],
+        feature_names=list(bundle["feature_names"]),
+        version=str(bundle.get("model_version") or f"lgbm-{_file_digest(path)}"),
+        path=str(path),
+        mtime_ns=stat.st_mtime_ns,
+        size=stat.st_size,
+        model_id=entry.model_id if entry is not None else None,
+        patch=entry.patch if entry is not None else None,
+        calibration=bundle.get("calibration"),
+    )
+
+
+# Per-patch models from MODEL_REGISTRY_DIR; when its manifest lists any, they take
+# precedence over MODEL_PATH, which stays the fallback for patches nothing resolves to
+registry = ModelRegistry(
+    Path(settings.model_registry_dir),
+    memory_budget=int(settings.model_cache_mb * 1024 * 1024),
+    loader=load_model,
+)
+
+
+def reload_model_if_changed() -> bool:
+    """(Re)load MODEL_PATH when its mtime/size differ from the serving model; True on swap.
+
+    A file that fails to load (e.g. still being written) leaves the current model in place
+    and is retried on the next check.
+    """
     global _MODEL
-    if _MODEL is not None:
-        return
-    # TODO: Replace with real joblib load
-    # from joblib import load
-    # _MODEL = load(settings.model_path)
-    _MODEL = "stub-model"
+    path = Path(settings.model_path)
+    with _RELOAD_LOCK:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        current = _MODEL
+        if current is not None and (current.mtime_ns, current.size) == (
+            stat.st_mtime_ns,
+            stat.st_size,
+        ):
+            return False
+        try:
+            loaded = load_model(path)
+        except Exception:
+            logger.exception("Failed to load model from %s; keeping current model", path)
+            return False
+        _MODEL = loaded
+        logger.info("Serving model %s from %s", loaded.version, loaded.path)
+        return True
 
 
-def predict_win_probability(features: Dict) -> Tuple[float, Dict]:
+def _load_model_if_needed() -> None:
+    if _MODEL is None:
+        reload_model_if_changed()
+
+
+def warm_up() -> None:
+    """Load the model and feature tables ahead of the first request."""
+    registry.refresh()
     _load_model_if_needed()
-    # TODO: Replace with real feature extraction and model prediction
-    # probability = float(_MODEL.predict_proba([vector])[0][1])
-    # Temporary deterministic placeholder based on champions count
+    get_feature_sources()
+
+
+async def watch_model_file(interval: float) -> None:
+    while True:
+        await asyncio.sleep(interval)
+        await asyncio.to_thread(reload_model_if_changed)
+        await asyncio.to_thread(registry.refresh)
+
+
+def current_model() -> Optional[LoadedModel]:
+    return _MODEL
+
+
+def _stub_probability(features: Dict) -> float:
+    # Deterministic placeholder used until a trained model is present at MODEL_PATH
     champions = features.get("champions", [])
     base = 0.5
     adjustment = min(len(champions) * 0.01, 0.1)
-    probability = max(0.0, min(1.0, base + (adjustment if features.get("blue_side") else -adjustment)))
-    return probability, {"model_version": _MODEL_VERSION, "used_model_path": settings.model_path}
+    return max(0.0, min(1.0, base + (adjustment if features.get("blue_side") else -adjustment)))
+
+
+def get_model(patch: Optional[str] = None) -> Optional[LoadedModel]:
+    """The registry model for ``patch`` if one resolves, else the MODEL_PATH model."""
+    if registry.active:
+        model = registry.get(patch)
+        if model is not None:
+            return model
+    _load_model_if_needed()
+    return _MODEL
+
+
+def model_details(model: LoadedModel) -> Dict:
+    """Identifies the model that served a request (for response ``details``)."""
+    return {
+        "model_version": model.version,
+        "used_model_path": model.path,
+        "model_id": model.model_id or model.version,
+        "model_patch": model.patch,
+        "calibration": model.calibration["method"] if model.calibration else None,
+    }
+
+
+def score_frame(model: LoadedModel, frame: pd.DataFrame) -> np.ndarray:
+    """Calibrated blue-win probabilities for a feature frame; columns the model lacks are
+    NaN-filled."""
+    raw = model.pipeline.predict_proba(frame.reindex(columns=model.feature_names))[:, 1]
+    return apply_calibration(model.calibration, raw, clip=settings.calibration_clip)
+
+
+def predict_blue_win_proba(model: LoadedModel, payloads: List[Dict]) -> List[float]:
+    X = build_feature_matrix(payloads, model.feature_names)
+    if isinstance(model.pipeline, NativePredictor):
+        # Already in feature order; skip the DataFrame round trip
+        proba = apply_calibration(
+            model.calibration, model.pipeline.predict(X), clip=settings.calibration_clip
+        )
+        return [float(p) for p in proba]
+    proba = score_frame(model, pd.DataFrame(X, columns=model.feature_names))
+    return [float(p) for p in proba]
+
+
+def predict_win_probabilities(payloads: List[Dict]) -> List[Tuple[float, Dict]]:
+    """Score many drafts with a single ``predict_proba`` call.
+
+    Probabilities are for the requester's side: blue-win when ``blue_side`` else red-win.
+    """
+    # Each patch resolves to its own model; drafts sharing a model are scored together
+    models = {patch: get_model(patch) for patch in {p.get("patch") for p in payloads}}
+    groups: Dict[Optional[str], List[int]] = {}
+    for i, payload in enumerate(payloads):
+        model = models[payload.get("patch")]
+        groups.setdefault((model.model_id or model.path) if model else None, []).append(i)
+
+    results: List[Tuple[float, Dict]] = [(0.0, {})] * len(payloads)
+    for indices in groups.values():
+        batch = [payloads[i] for i in indices]
+        model = models[batch[0].get("patch")]
+        if model is None:
+            details = {"model_version": _MODEL_VERSION, "used_model_path": settings.model_path}
+            for i, payload in zip(indices, batch):
+                results[i] = (_stub_probability(payload), dict(details))
+            continue
+        details = model_details(model)
+        for i, payload, p_blue in zip(indices, batch, predict_blue_win_proba(model, batch)):
+            probability = p_blue if payload.get("blue_side", True) else 1.0 - p_blue
+            results[i] = (probability, {**details, "blue_win_probability": p_blue})
+    return results
+
+
+def predict_win_probability(features: Dict) -> Tuple[float, Dict]:
+    return predict_win_probabilities([features])[0]
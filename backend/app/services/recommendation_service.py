@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from fastapi import HTTPException
+
+from ..core.ml import ensure_ml_on_path
+from .feature_service import get_feature_sources
+from .prediction_service import get_model, model_details, score_frame
+
+ensure_ml_on_path()
+
+from src.data.schemas import DraftContext  # noqa: E402
+from src.features.recommend import candidate_feature_frame  # noqa: E402
+
+
+def recommend_champions(
+    draft: DraftContext,
+    role: str,
+    enemy_team: Dict[str, str],
+    bans: List[str],
+    top_k: Optional[int] = None,
+) -> Tuple[List[Dict], Dict]:
+    """Rank every legal champion for the open ``role`` with a single model call."""
+    model = get_model(draft.patch)
+    if model is None:
+        raise HTTPException(status_code=503, detail="No trained model is loaded")
+    sources = get_feature_sources()
+    try:
+        candidates, frame = candidate_feature_frame(
+            draft,
+            role,
+            enemy_team,
+            sources.champion_tables.for_patch(draft.patch),
+            sources.lane_index,
+            bans=bans,
+            pair_matrices=sources.pair_matrices.for_patch(draft.patch),
+        )
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from exc
+
+    details = {**model_details(model), "n_candidates": len(candidates)}
+    if not candidates:
+        return [], details
+
+    p_blue = score_frame(model, frame)
+    proba = p_blue if draft.blue_side else 1.0 - p_blue
+    order = np.argsort(-proba, kind="stable")
+    if top_k is not None:
+        order = order[:top_k]
+    ranked = [
+        {"champion": candidates[i], "win_probability": float(proba[i])} for i in order
+    ]
+    return ranked, details
@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import pandas as pd
+
+from src.features.featurize import as_champion_table
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description=(
+            "Convert champ_info.parquet into a memory-mappable per-patch ChampionTable bundle"
+        )
+    )
+    parser.add_argument(
+        "--champ-info", type=Path, required=True, help="Path to champ_info.parquet"
+    )
+    parser.add_argument(
+        "--patch", required=True, help="Patch the attributes belong to (e.g. 14.10)"
+    )
+    parser.add_argument(
+        "--output-root",
+        type=Path,
+        default=Path("ml/artifacts/champion_table"),
+        help="Bundles are written to <output-root>/<patch>/",
+    )
+    args = parser.parse_args()
+
+    champ_info = pd.read_parquet(args.champ_info)
+    if "champion" in champ_info.columns:
+        champ_info = champ_info.set_index("champion")
+    table = as_champion_table(champ_info, version=args.patch)
+    path = table.save_versioned(args.output_root)
+    print({"champions": len(table), "columns": len(table.columns), "output": str(path)})
+
+
+if __name__ == "__main__":
+    main()
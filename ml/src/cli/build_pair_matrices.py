@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+import numpy as np
+import pyarrow.dataset as ds
+
+from src.features.matchup_features import DEFAULT_PRIOR_STRENGTH, ROLES
+from src.features.pair_features import PairCounts, role_id_matrix
+from src.utils.jsonio import parse_jsonish
+
+MATCH_COLUMNS = ["patch", "blue_win", "blue_team", "red_team"]
+
+
+def _teams(column: Any) -> List[Dict[str, str]]:
+    # Struct columns arrive as dicts; object columns may hold JSON strings
+    return [t if isinstance(t, dict) else (parse_jsonish(t) or {}) for t in column.to_pylist()]
+
+
+def iter_batches(
+    paths: Iterable[Path], batch_size: int
+) -> Iterator[Tuple[List[str], np.ndarray, List[Dict], List[Dict]]]:
+    for path in paths:
+        dataset = ds.dataset(str(path), format="parquet")
+        for batch in dataset.to_batches(columns=MATCH_COLUMNS, batch_size=batch_size):
+            if batch.num_rows == 0:
+                continue
+            yield (
+                [str(p) for p in batch.column("patch").to_pylist()],
+                np.asarray(batch.column("blue_win").to_pylist(), dtype=bool),
+                _teams(batch.column("blue_team")),
+                _teams(batch.column("red_team")),
+            )
+
+
+def build_pair_matrices(
+    paths: List[Path],
+    output_root: Path,
+    prior_strength: float = DEFAULT_PRIOR_STRENGTH,
+    batch_size: int = 65_536,
+) -> Dict[str, Any]:
+    """Write ``output_root/<patch>/`` PairMatrices bundles from matches parquet files.
+
+    Two streaming passes: the first collects the champion vocabulary (team columns only),
+    the second accumulates per-patch pair counts, so memory is bounded by the tensors.
+    """
+    champions = set()
+    for _, _, blue, red in iter_batches(paths, batch_size):
+        for team in (*blue, *red):
+            champions.update(c for c in (team.get(r) for r in ROLES) if c)
+    vocab = sorted(champions)
+
+    counts: Dict[str, PairCounts] = {}
+    for patches, wins, blue, red in iter_batches(paths, batch_size):
+        by_patch: Dict[str, List[int]] = {}
+        for i, patch in enumerate(patches):
+            by_patch.setdefault(patch, []).append(i)
+        for patch, rows in by_patch.items():
+            acc = counts.get(patch)
+            if acc is None:
+                acc = counts[patch] = PairCounts(vocab)
+            acc.add(
+                role_id_matrix([blue[i] for i in rows], acc.row_of, len(vocab)),
+                role_id_matrix([red[i] for i in rows], acc.row_of, len(vocab)),
+                wins[rows],
+            )
+
+    written = {}
+    for patch, acc in sorted(counts.items()):
+        matrices = acc.finalize(version=patch, prior_strength=prior_strength)
+        matrices.save(Path(output_root) / patch)
+        written[patch] = acc.matches
+    return {"champions": len(vocab), "matches_by_patch": written, "output_root": str(output_root)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Build per-patch champion synergy/counter tensors from matches.parquet"
+    )
+    parser.add_argument(
+        "--matches",
+        type=Path,
+        required=True,
+        nargs="+",
+        help="matches.parquet file(s) or directories of parquet parts",
+    )
+    parser.add_argument(
+        "--output-root",
+        type=Path,
+        default=Path("ml/artifacts/pair_matrices"),
+        help="Bundles are written to <output-root>/<patch>/",
+    )
+    parser.add_argument(
+        "--prior-strength",
+        type=float,
+        default=DEFAULT_PRIOR_STRENGTH,
+        help="Pseudo-games of champion-level prior mixed into each pair",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=65_536, help="Rows read per parquet batch"
+    )
+    args = parser.parse_args()
+    print(
+        build_pair_matrices(
+            args.matches,
+            args.output_root,
+            prior_strength=args.prior_strength,
+            batch_size=args.batch_size,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
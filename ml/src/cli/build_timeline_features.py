@@ -0,0 +1,174 @@
+from __future__ import annotations
+
+import argparse
+import os
+import shutil
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.data.raw_store import RawEntry, RawMatchStore
+from src.etl.match_table import records_to_table
+from src.etl.parse_match import parse_match_to_record
+from src.etl.parse_timeline import (
+    TIMELINE_FEATURES_SCHEMA,
+    parse_timeline_stream,
+    participant_roles,
+)
+
+# (patch, [(match_id, match entry, timeline entry)])
+WorkUnit = Tuple[str, List[Tuple[str, RawEntry, RawEntry]]]
+
+# Per-worker store opened by _init_worker so each task only pickles its index entries
+_STORE: Optional[RawMatchStore] = None
+
+
+def _init_worker(raw_dir: str) -> None:
+    global _STORE
+    _STORE = RawMatchStore(Path(raw_dir))
+
+
+def _parse_unit(unit: WorkUnit) -> Tuple[str, pa.Table, int]:
+    """Timeline features for one chunk of a patch; returns (patch, table, failed count).
+
+    Match payloads (needed for roles and champions) are small and decoded whole; timelines
+    are stream-parsed straight out of the zstd frame.
+    """
+    patch, items = unit
+    assert _STORE is not None
+    matches = dict(_STORE.read((match_id, m) for match_id, m, _ in items))
+    records: List[Dict[str, Any]] = []
+    failed = 0
+    for match_id, stream in _STORE.stream((match_id, t) for match_id, _, t in items):
+        match = matches[match_id]
+        try:
+            record = parse_match_to_record(match)
+            record.update(parse_timeline_stream(stream, participant_roles(match)))
+        except Exception:
+            failed += 1
+            continue
+        records.append(record)
+    return patch, records_to_table(records, schema=TIMELINE_FEATURES_SCHEMA), failed
+
+
+def iter_work_units(
+    store: RawMatchStore, patches: List[str], chunk_size: int
+) -> Iterator[WorkUnit]:
+    """Chunks of matches that have both a match and a timeline record, in timeline order."""
+    for patch in patches:
+        match_entries = dict(store.entries(patch, kind="match"))
+        items = [
+            (match_id, match_entries[match_id], entry)
+            for match_id, entry in store.entries(patch, kind="timeline")
+            if match_id in match_entries
+        ]
+        for i in range(0, len(items), chunk_size):
+            yield patch, items[i : i + chunk_size]
+
+
+def build_timeline_features(
+    raw_dir: Path,
+    output_dir: Path,
+    patches: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 200,
+    row_group_size: int = 50_000,
+) -> Dict[str, Any]:
+    """Write ``output_dir/<patch>/part-0.parquet`` with one TIMELINE_FEATURES_SCHEMA row per
+    match that has a stored timeline (``--with-timeline`` crawls).
+
+    Same execution model as reparse_matches: chunks run on a process pool with at most two
+    per worker in flight, tables are appended per patch, and the dataset is swapped in
+    when complete.
+    """
+    store = RawMatchStore(raw_dir)
+    patches = patches or store.patches()
+    workers = workers or os.cpu_count() or 1
+
+    tmp_dir = output_dir.with_name(output_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    writers: Dict[str, pq.ParquetWriter] = {}
+    rows: Dict[str, int] = {}
+    failed = 0
+
+    def write(patch: str, table: pa.Table) -> None:
+        writer = writers.get(patch)
+        if writer is None:
+            part_dir = tmp_dir / patch
+            part_dir.mkdir(parents=True, exist_ok=True)
+            writer = pq.ParquetWriter(part_dir / "part-0.parquet", TIMELINE_FEATURES_SCHEMA)
+            writers[patch] = writer
+        writer.write_table(table, row_group_size=row_group_size)
+        rows[patch] = rows.get(patch, 0) + table.num_rows
+
+    units = iter_work_units(store, patches, chunk_size)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(str(raw_dir),)
+        ) as pool:
+            pending: Set[Future] = set()
+            for unit in units:
+                pending.add(pool.submit(_parse_unit, unit))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        patch, table, n_failed = fut.result()
+                        write(patch, table)
+                        failed += n_failed
+            for fut in pending:
+                patch, table, n_failed = fut.result()
+                write(patch, table)
+                failed += n_failed
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_dir, output_dir)
+    return {
+        "rows": sum(rows.values()),
+        "rows_by_patch": dict(sorted(rows.items())),
+        "failed": failed,
+        "workers": workers,
+        "output_dir": str(output_dir),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Extract 10/15-minute lane diffs and first objectives from stored timelines"
+    )
+    parser.add_argument(
+        "--raw-dir", type=Path, default=Path("ml/data/raw"), help="Raw match store root"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("ml/data/processed/timeline_features"),
+        help="Output dataset, one directory per patch (read with pd.read_parquet(dir))",
+    )
+    parser.add_argument("--patch", action="append", default=None, help="Only these patches")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=200, help="Matches per work unit")
+    parser.add_argument("--row-group-size", type=int, default=50_000)
+    args = parser.parse_args()
+    print(
+        build_timeline_features(
+            args.raw_dir,
+            args.output_dir,
+            patches=args.patch,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            row_group_size=args.row_group_size,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
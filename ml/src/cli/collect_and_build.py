@@ -2,7 +2,6 @@ from __future__ import annotations
 
 import argparse
 import asyncio
-import json
 import os
 from dataclasses import dataclass
 from pathlib import Path
@@ -10,6 +9,8 @@ from typing import Any, Dict, List, Optional
 
 import pandas as pd
 
+from src.data.ddragon import StaticDataRegistry
+from src.data.raw_store import BackgroundWriter, RawMatchStore
 from src.data.riot_fetch import RiotClient
 from src.etl.parse_match import parse_match_to_record
 
@@ -27,46 +28,56 @@ class CollectionConfig:
     concurrency: int = 5
     output_parquet: Path = Path("ml/data/processed/matches.parquet")
     raw_dir: Path = Path("ml/data/raw")
+    static_dir: Path = Path("ml/data/static")
     with_timeline: bool = False
+    # Replaces both routing hosts, e.g. a local mock server
+    base_url: Optional[str] = None
 
 
 async def collect_matches(config: CollectionConfig) -> pd.DataFrame:
-    client = RiotClient(api_key=config.api_key, platform=config.platform, region=config.region)
-
-    account = await client.account_by_riot_id(config.game_name, config.tag_line)
-    puuid = account["puuid"]
-
-    match_ids = await client.matches_by_puuid(
-        puuid=puuid, start=config.start, count=config.count, queue=config.queue
-    )
-
-    semaphore = asyncio.Semaphore(config.concurrency)
-    records: List[Dict[str, Any]] = []
-
-    async def fetch_one(match_id: str) -> None:
-        async with semaphore:
-            match = await client.match(match_id)
-            record = parse_match_to_record(match)
-            patch = record.get("patch") or "unknown"
-            patch_dir = (config.raw_dir / patch)
-            patch_dir.mkdir(parents=True, exist_ok=True)
-            # Save raw match JSON
-            with (patch_dir / f"{match_id}.json").open("w", encoding="utf-8") as f:
-                json.dump(match, f, ensure_ascii=False)
-            # Optionally save timeline JSON
-            if config.with_timeline:
-                timeline = await client.match_timeline(match_id)
-                with (patch_dir / f"{match_id}.timeline.json").open("w", encoding="utf-8") as f:
-                    json.dump(timeline, f, ensure_ascii=False)
-            records.append({
-                "match_id": record["match_id"],
-                "patch": record["patch"],
-                "blue_win": record["blue_win"],
-                "blue_team": record["blue_team"],
-                "red_team": record["red_team"],
-            })
-
-    await asyncio.gather(*(fetch_one(m) for m in match_ids))
+    async with RiotClient(
+        api_key=config.api_key,
+        platform=config.platform,
+        region=config.region,
+        base_url=config.base_url,
+    ) as client:
+        account = await client.account_by_riot_id(config.game_name, config.tag_line)
+        puuid = account["puuid"]
+
+        match_ids = await client.matches_by_puuid(
+            puuid=puuid, start=config.start, count=config.count, queue=config.queue
+        )
+
+        # Champion id index so bans are parsed to champion keys without further requests
+        static = await StaticDataRegistry(config.static_dir, http=client.http).get()
+        champions = static.champion_index
+
+        semaphore = asyncio.Semaphore(config.concurrency)
+        records: List[Dict[str, Any]] = []
+        raw = BackgroundWriter(RawMatchStore(config.raw_dir))
+
+        async def fetch_one(match_id: str) -> None:
+            async with semaphore:
+                match = await client.match(match_id)
+                record = parse_match_to_record(match, champions=champions)
+                patch = record.get("patch") or "unknown"
+                # Raw payloads are compressed and appended on the store's writer thread
+                raw.submit(match_id, match, patch)
+                if config.with_timeline:
+                    timeline = await client.match_timeline(match_id)
+                    raw.submit(match_id, timeline, patch, kind="timeline")
+                records.append({
+                    "match_id": record["match_id"],
+                    "patch": record["patch"],
+                    "blue_win": record["blue_win"],
+                    "blue_team": record["blue_team"],
+                    "red_team": record["red_team"],
+                })
+
+        try:
+            await asyncio.gather(*(fetch_one(m) for m in match_ids))
+        finally:
+            await asyncio.to_thread(raw.close)
 
     df = pd.DataFrame.from_records(records)
     return df
@@ -94,7 +105,13 @@ def parse_args() -> CollectionConfig:
         "--raw-dir",
         type=Path,
         default=Path("ml/data/raw"),
-        help="Directory to store raw match JSON under {patch}/",
+        help="Raw match store root (zstd segments + index under {patch}/)",
+    )
+    parser.add_argument(
+        "--static-dir",
+        type=Path,
+        default=Path("ml/data/static"),
+        help="DDragon snapshot directory (reused offline when versions.json is unreachable)",
     )
     parser.add_argument(
         "--with-timeline",
@@ -120,6 +137,7 @@ def parse_args() -> CollectionConfig:
         concurrency=args.concurrency,
         output_parquet=args.output_parquet,
         raw_dir=args.raw_dir,
+        static_dir=args.static_dir,
         with_timeline=bool(args.with_timeline),
     )
 
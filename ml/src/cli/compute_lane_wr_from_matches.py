@@ -1,75 +1,424 @@
 from __future__ import annotations
 
 import argparse
-from collections import defaultdict
+import json
+import os
 from pathlib import Path
-from typing import Dict, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Union
 
 import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
 
+from src.data.ddragon import version_key
+from src.features.matchup_features import (
+    DEFAULT_PRIOR_STRENGTH,
+    champion_role_winrates,
+    matchup_prior,
+)
+from src.pipelines.artifact_cache import ArtifactCache, cached_stage, use_cache
 from src.utils.jsonio import parse_jsonish
 
 
 ROLES = ["top", "jg", "mid", "adc", "sup"]
+KEY_COLUMNS = ["patch", "role", "blue", "red"]
+COUNT_COLUMNS = KEY_COLUMNS + ["n", "wins"]
+MATCH_COLUMNS = ["patch", "blue_win", "blue_team", "red_team"]
+# Lane-phase outcomes: a lane counts as a blue "win" when {role}_{outcome} > 0 in the
+# timeline features table (build_timeline_features); "blue_win" is the full-game result
+OUTCOMES = ["blue_win"] + [f"{stat}_diff_{m}" for m in (10, 15) for stat in ("gold", "xp", "cs")]
 
 
-def compute_lane_wr(matches: pd.DataFrame) -> pd.DataFrame:
-    counts: Dict[Tuple[str, str, str, str], int] = defaultdict(int)
-    wins: Dict[Tuple[str, str, str, str], int] = defaultdict(int)
+def outcome_columns(outcome: str) -> List[str]:
+    if outcome not in OUTCOMES:
+        raise ValueError(f"Unknown outcome {outcome!r}; expected one of {OUTCOMES}")
+    if outcome == "blue_win":
+        return MATCH_COLUMNS
+    return ["patch", "blue_team", "red_team", *(f"{role}_{outcome}" for role in ROLES)]
 
-    for _, row in matches.iterrows():
-        patch = str(row["patch"])
-        blue_team = row["blue_team"]
-        red_team = row["red_team"]
-        # Handle JSON-serialized dicts
-        blue_team = parse_jsonish(blue_team)
-        red_team = parse_jsonish(red_team)
 
-        blue_win = bool(row["blue_win"])
+def _empty_counts() -> pd.DataFrame:
+    return pd.DataFrame(
+        {c: pd.Series(dtype="int64" if c in ("n", "wins") else object) for c in COUNT_COLUMNS}
+    )
+
+
+def _role_champions(column: Any, role: str) -> pd.Series:
+    """Champion per row for ``role`` from a struct (parquet) or dict/JSON-string team column."""
+    if isinstance(column, (pa.ChunkedArray, pa.Array)) and pa.types.is_struct(column.type):
+        if role not in {f.name for f in column.type}:
+            return pd.Series([None] * len(column), dtype=object)
+        values = column.combine_chunks() if isinstance(column, pa.ChunkedArray) else column
+        return values.field(role).to_pandas()
+    if isinstance(column, (pa.ChunkedArray, pa.Array)):
+        column = column.to_pandas()
+    teams = [parse_jsonish(t) for t in column]
+    return pd.Series([t.get(role) if isinstance(t, dict) else None for t in teams], dtype=object)
+
+
+def lane_counts_from_columns(
+    patch: pd.Series,
+    blue_win: Union[pd.Series, Mapping[str, pd.Series]],
+    blue_team: Any,
+    red_team: Any,
+) -> pd.DataFrame:
+    """(patch, role, blue, red) -> n, wins for one batch of matches, via one groupby.
+
+    ``blue_win`` is one result per match, or a role -> blue-minus-red diff mapping for
+    lane-phase outcomes, where NaN and tied lanes are not counted.
+    """
+    patch = patch.astype(str).reset_index(drop=True)
+    if not isinstance(blue_win, Mapping):
+        win = blue_win.astype(bool).astype("int64").reset_index(drop=True)
+    frames = []
+    for role in ROLES:
+        blue = _role_champions(blue_team, role)
+        red = _role_champions(red_team, role)
+        # Missing or empty champions on either side do not count towards the lane
+        present = (blue.fillna("").astype(str) != "") & (red.fillna("").astype(str) != "")
+        if isinstance(blue_win, Mapping):
+            diff = blue_win[role].astype("float64").reset_index(drop=True)
+            present &= diff.notna() & (diff != 0)
+            win = (diff > 0).astype("int64")
+        if not present.any():
+            continue
+        frames.append(
+            pd.DataFrame(
+                {
+                    "patch": patch[present].to_numpy(),
+                    "role": role,
+                    "blue": blue[present].astype(str).to_numpy(),
+                    "red": red[present].astype(str).to_numpy(),
+                    "wins": win[present].to_numpy(),
+                }
+            )
+        )
+    if not frames:
+        return _empty_counts()
+    lanes = pd.concat(frames, ignore_index=True)
+    return lanes.groupby(KEY_COLUMNS, sort=False)["wins"].agg(n="size", wins="sum").reset_index()
+
+
+def merge_counts(parts: Iterable[pd.DataFrame]) -> pd.DataFrame:
+    """Sum (n, wins) over any number of count frames with the same keys."""
+    frames = [p[COUNT_COLUMNS] for p in parts if p is not None and len(p)]
+    if not frames:
+        return _empty_counts()
+    merged = pd.concat(frames, ignore_index=True)
+    return merged.groupby(KEY_COLUMNS, sort=False)[["n", "wins"]].sum().reset_index()
+
+
+def _patch_order(patches: Iterable[str]) -> List[str]:
+    # Numeric patch order ("14.10" after "14.9"); unparsable labels sort first, by name
+    return sorted(set(patches), key=lambda p: (version_key(p), p))
+
+
+def backoff_counts(
+    counts: pd.DataFrame,
+    backoff_patches: int = 2,
+    backoff_decay: float = 0.5,
+    min_n: int = 20,
+) -> pd.DataFrame:
+    """Add ``n_eff``/``wins_eff``: own counts plus decayed counts from earlier patches.
+
+    A pair with fewer than ``min_n`` games on a patch borrows ``backoff_decay ** k`` of its
+    counts from the patch ``k`` releases before (k <= ``backoff_patches``). Pairs seen only
+    on those earlier patches get rows with ``n = 0``. Later patches are never used, so a
+    patch's estimates do not depend on data from after it.
+    """
+    order = _patch_order(counts["patch"])
+    frames = [counts[COUNT_COLUMNS].assign(n_eff=counts["n"], wins_eff=counts["wins"])]
+    for k in range(1, backoff_patches + 1):
+        shifted = dict(zip(order[:-k], order[k:]))
+        moved = counts[counts["patch"].isin(shifted.keys())]
+        if moved.empty:
+            continue
+        weight = backoff_decay**k
+        frames.append(
+            moved[KEY_COLUMNS].assign(
+                patch=moved["patch"].map(shifted),
+                n=0,
+                wins=0,
+                n_eff=moved["n"] * weight,
+                wins_eff=moved["wins"] * weight,
+            )
+        )
+    pooled = (
+        pd.concat(frames, ignore_index=True)
+        .groupby(KEY_COLUMNS, sort=False)[["n", "wins", "n_eff", "wins_eff"]]
+        .sum()
+        .reset_index()
+    )
+    enough = pooled["n"] >= min_n
+    pooled.loc[enough, "n_eff"] = pooled.loc[enough, "n"]
+    pooled.loc[enough, "wins_eff"] = pooled.loc[enough, "wins"]
+    # Only patches with data of their own are emitted
+    return pooled[pooled["patch"].isin(set(counts["patch"]))].reset_index(drop=True)
 
-        for role in ROLES:
-            b = blue_team.get(role)
-            r = red_team.get(role)
-            if not b or not r:
+
+def finalize_lane_wr(
+    counts: pd.DataFrame,
+    prior_strength: float = DEFAULT_PRIOR_STRENGTH,
+    backoff_patches: int = 2,
+    backoff_decay: float = 0.5,
+    min_n: int = 20,
+) -> pd.DataFrame:
+    """Smoothed lane table from raw (n, wins) counts.
+
+    ``wr_blue = (wins_eff + k * prior) / (n_eff + k)`` where the prior comes from both
+    champions' role-level win rates on the patch (see ``matchup_prior``) and ``k`` is
+    ``prior_strength``. ``wr_raw`` keeps the unsmoothed rate (NaN when ``n == 0``);
+    ``wr_champ_blue``/``wr_champ_red`` keep the champion-role rates behind ``prior``, so
+    LaneWinrateIndex builds the unseen-pair fallback from the same smoothing.
+    """
+    if counts.empty:
+        return pd.DataFrame(
+            columns=[
+                *COUNT_COLUMNS,
+                "n_eff",
+                "wins_eff",
+                "wr_champ_blue",
+                "wr_champ_red",
+                "prior",
+                "wr_raw",
+                "wr_blue",
+            ]
+        )
+    out = backoff_counts(counts, backoff_patches, backoff_decay, min_n)
+    out["n"] = out["n"].astype("int64")
+    out["wins"] = out["wins"].astype("int64")
+
+    champs = champion_role_winrates(
+        out.assign(n=out["n_eff"], wins=out["wins_eff"])[[*KEY_COLUMNS, "n", "wins"]],
+        prior_strength=prior_strength,
+    ).set_index(["patch", "role", "champion"])["wr"]
+    wr_b = champs.reindex(pd.MultiIndex.from_frame(out[["patch", "role", "blue"]])).to_numpy()
+    wr_r = champs.reindex(pd.MultiIndex.from_frame(out[["patch", "role", "red"]])).to_numpy()
+    out["wr_champ_blue"] = wr_b
+    out["wr_champ_red"] = wr_r
+    out["prior"] = matchup_prior(wr_b, wr_r)
+    out["wr_raw"] = out["wins"] / out["n"].where(out["n"] > 0)
+    out["wr_blue"] = (out["wins_eff"] + prior_strength * out["prior"]) / (
+        out["n_eff"] + prior_strength
+    )
+    return out.sort_values(KEY_COLUMNS, kind="stable").reset_index(drop=True)
+
+
+@cached_stage("lane_wr", code=(champion_role_winrates,))
+def compute_lane_wr(matches: pd.DataFrame, **smoothing: Any) -> pd.DataFrame:
+    """Smoothed lane win rates from an in-memory frame (``smoothing``: finalize_lane_wr args)."""
+    counts = lane_counts_from_columns(
+        matches["patch"], matches["blue_win"], matches["blue_team"], matches["red_team"]
+    )
+    return finalize_lane_wr(counts, **smoothing)
+
+
+def iter_lane_counts(
+    paths: Iterable[Path], batch_size: int = 65_536, outcome: str = "blue_win"
+) -> Iterator[pd.DataFrame]:
+    """Per-batch counts for parquet files/directories, reading ``batch_size`` rows at a time."""
+    columns = outcome_columns(outcome)
+    for path in paths:
+        dataset = ds.dataset(str(path), format="parquet")
+        for batch in dataset.to_batches(columns=columns, batch_size=batch_size):
+            if batch.num_rows == 0:
                 continue
-            key = (patch, role, str(b), str(r))
-            counts[key] += 1
-            if blue_win:
-                wins[key] += 1
-
-    records = []
-    for key, n in counts.items():
-        w = wins.get(key, 0)
-        patch, role, blue, red = key
-        wr_blue = w / n
-        records.append({
-            "patch": patch,
-            "role": role,
-            "blue": blue,
-            "red": red,
-            "n": n,
-            "wr_blue": wr_blue,
-        })
-    df = pd.DataFrame.from_records(records)
-    return df
+            if outcome == "blue_win":
+                result: Any = batch.column("blue_win").to_pandas()
+            else:
+                result = {role: batch.column(f"{role}_{outcome}").to_pandas() for role in ROLES}
+            yield lane_counts_from_columns(
+                batch.column("patch").to_pandas(),
+                result,
+                batch.column("blue_team"),
+                batch.column("red_team"),
+            )
+
+
+@cached_stage("lane_counts", ignore=("batch_size", "merge_every"))
+def compute_lane_counts_streaming(
+    paths: Iterable[Path],
+    batch_size: int = 65_536,
+    merge_every: int = 16,
+    outcome: str = "blue_win",
+) -> pd.DataFrame:
+    """Counts over arbitrarily large inputs; memory is bounded by distinct lane keys.
+
+    With an artifact cache enabled, unchanged inputs (same parquet footers) reuse the counts.
+    """
+    total: Optional[pd.DataFrame] = None
+    pending: List[pd.DataFrame] = []
+    for counts in iter_lane_counts(paths, batch_size=batch_size, outcome=outcome):
+        pending.append(counts)
+        if len(pending) >= merge_every:
+            total = merge_counts([total, *pending])
+            pending = []
+    return merge_counts([total, *pending])
+
+
+def _file_signature(path: Path) -> List[int]:
+    stat = path.stat()
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+def _input_files(paths: Iterable[Path], exclude: Path) -> List[Path]:
+    files: List[Path] = []
+    for path in paths:
+        if path.is_dir():
+            files.extend(sorted(p for p in path.rglob("*.parquet") if p.is_file()))
+        else:
+            files.append(path)
+    # The output may live in the same directory as the matches
+    return [f for f in files if f.resolve() != exclude.resolve()]
+
+
+def update_lane_wr(
+    paths: Iterable[Path],
+    output: Path,
+    state_path: Optional[Path] = None,
+    batch_size: int = 65_536,
+    outcome: str = "blue_win",
+    **smoothing: Any,
+) -> Dict[str, Any]:
+    """Fold parquet files not seen before into the counts stored in ``output``.
+
+    ``state_path`` (default ``<output>.state.json``) records each ingested file's size and
+    mtime. Only unseen files are read; a seen file that changed raises, because its old
+    rows cannot be subtracted — recompute without ``--incremental`` in that case.
+    ``outcome`` picks what a blue "win" is (see OUTCOMES); the table is then a lane-phase
+    prior with the same columns, usable anywhere a lane_wr table is.
+    """
+    outcome_columns(outcome)
+    state_path = state_path or output.with_name(output.name + ".state.json")
+    state: Dict[str, Any] = {"files": {}, "outcome": outcome}
+    if state_path.exists() and output.exists():
+        state = json.loads(state_path.read_text(encoding="utf-8"))
+    if state.get("outcome", "blue_win") != outcome:
+        raise SystemExit(
+            f"{output} counts {state.get('outcome', 'blue_win')!r}, not {outcome!r}; "
+            "rerun without --incremental"
+        )
+    seen: Dict[str, List[int]] = state.get("files", {})
+
+    new_files: List[Path] = []
+    for path in _input_files(paths, exclude=output):
+        key = str(path.resolve())
+        signature = _file_signature(path)
+        if key in seen:
+            if seen[key] != signature:
+                raise SystemExit(
+                    f"{path} changed since it was counted; rerun without --incremental"
+                )
+            continue
+        new_files.append(path)
+        seen[key] = signature
+
+    base = pd.read_parquet(output) if output.exists() and state_path.exists() else None
+    if base is not None and "wins" not in base.columns:
+        raise SystemExit(f"{output} has no wins column; rerun without --incremental")
+    counts = merge_counts(
+        [base, compute_lane_counts_streaming(new_files, batch_size=batch_size, outcome=outcome)]
+    )
+    # Smoothing and backoff are recomputed from the merged raw counts, which is cheap
+    out = finalize_lane_wr(counts, **smoothing)
+    _write_atomic(out, output)
+    tmp_state = state_path.with_name(state_path.name + ".tmp")
+    tmp_state.write_text(
+        json.dumps({"files": seen, "outcome": outcome}, indent=2), encoding="utf-8"
+    )
+    os.replace(tmp_state, state_path)
+    return {"rows": int(len(out)), "new_files": len(new_files), "output": str(output)}
+
+
+def _write_atomic(df: pd.DataFrame, output: Path) -> None:
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp = output.with_name(output.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, output)
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(
         description="Compute per-role lane matchup win rates (blue vs red) from matches.parquet"
     )
-    parser.add_argument("--matches", type=Path, required=True, help="Path to matches.parquet")
+    parser.add_argument(
+        "--matches",
+        type=Path,
+        required=True,
+        nargs="+",
+        help="matches.parquet file(s) or directories of parquet parts",
+    )
     parser.add_argument("--output", type=Path, required=True, help="Path to write lane_wr.parquet")
+    parser.add_argument(
+        "--batch-size", type=int, default=65_536, help="Rows read per parquet batch"
+    )
+    parser.add_argument(
+        "--outcome",
+        choices=OUTCOMES,
+        default="blue_win",
+        help="What counts as a blue lane win: the game result, or a lane diff at 10/15 minutes "
+        "(pass the build_timeline_features output as --matches)",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only count files not ingested before and add them to the counts in --output",
+    )
+    parser.add_argument(
+        "--state",
+        type=Path,
+        default=None,
+        help="Ingested-files state (default: <output>.state.json)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Artifact cache: reuse counts for inputs whose parquet footers are unchanged",
+    )
+    parser.add_argument(
+        "--cache-max-gb", type=float, default=20.0, help="LRU size bound of --cache-dir"
+    )
+    parser.add_argument(
+        "--prior-strength",
+        type=float,
+        default=DEFAULT_PRIOR_STRENGTH,
+        help="Pseudo-games of champion-level prior mixed into each lane win rate",
+    )
+    parser.add_argument(
+        "--backoff-patches", type=int, default=2, help="Earlier patches a sparse pair may borrow"
+    )
+    parser.add_argument(
+        "--backoff-decay", type=float, default=0.5, help="Weight per patch of distance"
+    )
+    parser.add_argument(
+        "--min-n", type=int, default=20, help="Games on the patch itself that disable backoff"
+    )
     args = parser.parse_args()
+    smoothing = {
+        "prior_strength": args.prior_strength,
+        "backoff_patches": args.backoff_patches,
+        "backoff_decay": args.backoff_decay,
+        "min_n": args.min_n,
+    }
 
-    mdf = pd.read_parquet(args.matches)
-    out = compute_lane_wr(mdf)
-    args.output.parent.mkdir(parents=True, exist_ok=True)
-    out.to_parquet(args.output, index=False)
-    print({"rows": int(len(out)), "output": str(args.output)})
+    if args.cache_dir is not None:
+        use_cache(ArtifactCache(args.cache_dir, max_bytes=int(args.cache_max_gb * (1 << 30))))
+    state = args.state or args.output.with_name(args.output.name + ".state.json")
+    if not args.incremental and state.exists():
+        # A full run recounts everything and records the inputs for later incremental runs
+        state.unlink()
+    print(
+        update_lane_wr(
+            args.matches,
+            args.output,
+            state,
+            batch_size=args.batch_size,
+            outcome=args.outcome,
+            **smoothing,
+        )
+    )
 
 
 if __name__ == "__main__":
     main()
-
-
@@ -0,0 +1,381 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sqlite3
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlsplit
+
+import pyarrow.parquet as pq
+
+from src.data.ddragon import StaticDataRegistry
+from src.data.raw_store import BackgroundWriter, RawMatchStore
+from src.data.riot_fetch import RiotClient
+from src.etl.match_table import records_to_table
+from src.etl.parse_match import parse_match_to_record
+
+
+@dataclass
+class CrawlConfig:
+    api_key: str
+    seed_puuids: List[str] = field(default_factory=list)
+    seed_riot_ids: List[str] = field(default_factory=list)  # "GameName#TAG"
+    platform: str = "na1"
+    region: str = "americas"
+    base_url: Optional[str] = None  # local mock server instead of the Riot hosts
+    queue: Optional[int] = 420
+    matches_per_player: int = 20
+    max_matches: Optional[int] = None
+    state_dir: Path = Path("ml/data/crawl")
+    output_dir: Path = Path("ml/data/processed/matches")
+    raw_dir: Path = Path("ml/data/raw")
+    static_dir: Path = Path("ml/data/static")
+    with_timeline: bool = False
+    row_group_size: int = 5000
+    min_concurrency: int = 1
+    max_concurrency: int = 32
+
+
+class CrawlState:
+    """Persistent crawl frontier and seen-set (SQLite).
+
+    Match status moves queued -> fetched -> done; "done" is only set in the same
+    transaction that registers the parquet part holding the match, so a killed run never
+    loses or double-writes rows. Players move queued -> expanded.
+    """
+
+    def __init__(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Part flushes run in a worker thread, but never concurrently with other state calls
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.executescript(
+            """
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS players (
+                puuid TEXT PRIMARY KEY, status TEXT NOT NULL DEFAULT 'queued');
+            CREATE TABLE IF NOT EXISTS matches (
+                match_id TEXT PRIMARY KEY, status TEXT NOT NULL DEFAULT 'queued', part INTEGER);
+            CREATE INDEX IF NOT EXISTS matches_status ON matches(status);
+            CREATE TABLE IF NOT EXISTS parts (seq INTEGER PRIMARY KEY, rows INTEGER NOT NULL);
+            """
+        )
+        self.db.commit()
+
+    def add_players(self, puuids: Iterable[str]) -> None:
+        self.db.executemany(
+            "INSERT OR IGNORE INTO players(puuid) VALUES (?)", [(p,) for p in puuids if p]
+        )
+        self.db.commit()
+
+    def next_player(self) -> Optional[str]:
+        row = self.db.execute(
+            "SELECT puuid FROM players WHERE status = 'queued' ORDER BY rowid LIMIT 1"
+        ).fetchone()
+        return row[0] if row else None
+
+    def mark_player_expanded(self, puuid: str) -> None:
+        self.db.execute("UPDATE players SET status = 'expanded' WHERE puuid = ?", (puuid,))
+        self.db.commit()
+
+    def add_matches(self, match_ids: Iterable[str]) -> None:
+        self.db.executemany(
+            "INSERT OR IGNORE INTO matches(match_id) VALUES (?)", [(m,) for m in match_ids]
+        )
+        self.db.commit()
+
+    def claim_matches(self, limit: int) -> List[str]:
+        ids = [
+            r[0]
+            for r in self.db.execute(
+                "SELECT match_id FROM matches WHERE status = 'queued' ORDER BY rowid LIMIT ?",
+                (limit,),
+            )
+        ]
+        self.db.executemany(
+            "UPDATE matches SET status = 'fetched' WHERE match_id = ?", [(m,) for m in ids]
+        )
+        self.db.commit()
+        return ids
+
+    def mark_failed(self, match_id: str) -> None:
+        self.db.execute("UPDATE matches SET status = 'failed' WHERE match_id = ?", (match_id,))
+        self.db.commit()
+
+    def next_part_seq(self) -> int:
+        row = self.db.execute("SELECT COALESCE(MAX(seq), 0) FROM parts").fetchone()
+        return int(row[0]) + 1
+
+    def commit_part(self, seq: int, match_ids: List[str]) -> None:
+        with self.db:
+            self.db.execute("INSERT INTO parts(seq, rows) VALUES (?, ?)", (seq, len(match_ids)))
+            self.db.executemany(
+                "UPDATE matches SET status = 'done', part = ? WHERE match_id = ?",
+                [(seq, m) for m in match_ids],
+            )
+
+    def count(self, status: str) -> int:
+        row = self.db.execute(
+            "SELECT COUNT(*) FROM matches WHERE status = ?", (status,)
+        ).fetchone()
+        return int(row[0])
+
+    def recover(self, output_dir: Path) -> None:
+        """Finish or roll back whatever a killed run left behind."""
+        for (seq,) in self.db.execute("SELECT seq FROM parts").fetchall():
+            final, tmp = part_paths(output_dir, seq)
+            if final.exists():
+                continue
+            if tmp.exists():
+                os.replace(tmp, final)
+                continue
+            with self.db:
+                self.db.execute(
+                    "UPDATE matches SET status = 'queued', part = NULL WHERE part = ?", (seq,)
+                )
+                self.db.execute("DELETE FROM parts WHERE seq = ?", (seq,))
+        for stray in output_dir.glob("*.parquet.tmp"):
+            stray.unlink()
+        self.db.execute("UPDATE matches SET status = 'queued' WHERE status = 'fetched'")
+        self.db.commit()
+
+    def close(self) -> None:
+        self.db.close()
+
+
+def part_paths(output_dir: Path, seq: int) -> tuple[Path, Path]:
+    final = output_dir / f"part-{seq:06d}.parquet"
+    return final, final.with_name(final.name + ".tmp")
+
+
+class PartWriter:
+    """Buffers parsed records and writes them as row-group-sized parquet part files.
+
+    With ``raw`` set, pending raw payloads are flushed before a part is committed so a
+    match is never marked done while its raw JSON is still only in memory.
+    """
+
+    def __init__(
+        self,
+        output_dir: Path,
+        state: CrawlState,
+        row_group_size: int,
+        raw: Optional[BackgroundWriter] = None,
+    ) -> None:
+        self.output_dir = output_dir
+        self.state = state
+        self.row_group_size = row_group_size
+        self.raw = raw
+        self.buffer: List[Dict[str, Any]] = []
+        self.rows_written = 0
+        output_dir.mkdir(parents=True, exist_ok=True)
+
+    def add(self, record: Dict[str, Any]) -> None:
+        self.buffer.append(record)
+
+    @property
+    def full(self) -> bool:
+        return len(self.buffer) >= self.row_group_size
+
+    def flush(self) -> None:
+        if not self.buffer:
+            return
+        records, self.buffer = self.buffer, []
+        if self.raw is not None:
+            self.raw.flush()
+        seq = self.state.next_part_seq()
+        final, tmp = part_paths(self.output_dir, seq)
+        pq.write_table(records_to_table(records), tmp, row_group_size=self.row_group_size)
+        self.state.commit_part(seq, [r["match_id"] for r in records])
+        os.replace(tmp, final)
+        self.rows_written += len(records)
+
+
+class AdaptiveConcurrency:
+    """AIMD concurrency limit driven by the rate limiter's remaining headroom."""
+
+    def __init__(self, minimum: int, maximum: int, initial: Optional[int] = None) -> None:
+        self.minimum = max(1, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial or self.minimum))
+        self.active = 0
+        self._cond = asyncio.Condition()
+
+    async def __aenter__(self) -> "AdaptiveConcurrency":
+        async with self._cond:
+            await self._cond.wait_for(lambda: self.active < self.limit)
+            self.active += 1
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        async with self._cond:
+            self.active -= 1
+            self._cond.notify_all()
+
+    async def observe(self, headroom: float, low: float = 0.1, high: float = 0.5) -> None:
+        if headroom >= high:
+            self.limit = min(self.maximum, self.limit + 1)
+        elif headroom <= low:
+            self.limit = max(self.minimum, self.limit // 2)
+        async with self._cond:
+            self._cond.notify_all()
+
+
+async def crawl(config: CrawlConfig) -> Dict[str, Any]:
+    """Snowball-sample matches from seed players through match participants."""
+    state = CrawlState(config.state_dir / "state.sqlite")
+    state.recover(config.output_dir)
+    raw = BackgroundWriter(RawMatchStore(config.raw_dir))
+    writer = PartWriter(config.output_dir, state, config.row_group_size, raw=raw)
+    concurrency = AdaptiveConcurrency(config.min_concurrency, config.max_concurrency)
+
+    async with RiotClient(
+        api_key=config.api_key,
+        platform=config.platform,
+        region=config.region,
+        base_url=config.base_url,
+        max_connections=config.max_concurrency,
+    ) as client:
+        host = urlsplit(client.region_base).netloc
+        seeds = list(config.seed_puuids)
+        for riot_id in config.seed_riot_ids:
+            game_name, _, tag_line = riot_id.partition("#")
+            seeds.append((await client.account_by_riot_id(game_name, tag_line))["puuid"])
+        state.add_players(seeds)
+
+        static = await StaticDataRegistry(config.static_dir, http=client.http).get()
+        champions = static.champion_index
+
+        async def fetch_one(match_id: str) -> None:
+            async with concurrency:
+                try:
+                    match = await client.match(match_id)
+                    timeline = (
+                        await client.match_timeline(match_id) if config.with_timeline else None
+                    )
+                except RuntimeError:
+                    state.mark_failed(match_id)
+                    return
+                finally:
+                    await concurrency.observe(client.http.limiter.headroom(host))
+            record = parse_match_to_record(match, champions=champions)
+            patch = record.get("patch") or "unknown"
+            raw.submit(match_id, match, patch)
+            if timeline is not None:
+                raw.submit(match_id, timeline, patch, kind="timeline")
+            state.add_players(match.get("metadata", {}).get("participants", []))
+            writer.add(record)
+
+        try:
+            while True:
+                done = state.count("done") + len(writer.buffer)
+                budget = None if config.max_matches is None else config.max_matches - done
+                if budget is not None and budget <= 0:
+                    break
+                batch = state.claim_matches(min(budget or 10**9, concurrency.maximum * 4))
+                if not batch:
+                    puuid = state.next_player()
+                    if puuid is None:
+                        break  # frontier exhausted
+                    try:
+                        ids = await client.matches_by_puuid(
+                            puuid=puuid, count=config.matches_per_player, queue=config.queue
+                        )
+                    except RuntimeError:
+                        ids = []
+                    state.add_matches(ids)
+                    state.mark_player_expanded(puuid)
+                    continue
+                await asyncio.gather(*(fetch_one(m) for m in batch))
+                if writer.full:
+                    await asyncio.to_thread(writer.flush)
+        finally:
+            writer.flush()
+            raw.close()
+            summary = {
+                "matches_done": state.count("done"),
+                "matches_queued": state.count("queued"),
+                "matches_failed": state.count("failed"),
+                "rows_written_this_run": writer.rows_written,
+                "concurrency": concurrency.limit,
+                "output_dir": str(config.output_dir),
+            }
+            state.close()
+    return summary
+
+
+def parse_args() -> CrawlConfig:
+    parser = argparse.ArgumentParser(
+        description="Resumable snowball crawler: seed players -> their matches -> participants"
+    )
+    parser.add_argument("--seed-puuid", action="append", default=[], help="Seed PUUID (repeatable)")
+    parser.add_argument(
+        "--seed-riot-id", action="append", default=[], help="Seed Riot ID as Name#TAG (repeatable)"
+    )
+    parser.add_argument("--api-key", required=False, help="Riot API key (or set RIOT_API_KEY)")
+    parser.add_argument("--platform", default="na1", help="Platform routing (default: na1)")
+    parser.add_argument("--region", default="americas", help="Region routing (default: americas)")
+    parser.add_argument("--base-url", default=None, help="Override Riot hosts (mock server)")
+    parser.add_argument("--queue", type=int, default=420, help="Queue ID (default: 420 SoloQ)")
+    parser.add_argument(
+        "--matches-per-player", type=int, default=20, help="Match ids pulled per expanded player"
+    )
+    parser.add_argument(
+        "--max-matches", type=int, default=None, help="Stop after this many matches"
+    )
+    parser.add_argument(
+        "--state-dir", type=Path, default=Path("ml/data/crawl"), help="Checkpoint directory"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("ml/data/processed/matches"),
+        help="Directory of parquet part files (read with pd.read_parquet(dir))",
+    )
+    parser.add_argument(
+        "--raw-dir", type=Path, default=Path("ml/data/raw"), help="Raw match store root"
+    )
+    parser.add_argument("--static-dir", type=Path, default=Path("ml/data/static"))
+    parser.add_argument("--with-timeline", action="store_true", help="Also fetch timelines")
+    parser.add_argument(
+        "--row-group-size", type=int, default=5000, help="Rows per flushed parquet part"
+    )
+    parser.add_argument("--min-concurrency", type=int, default=1)
+    parser.add_argument("--max-concurrency", type=int, default=32)
+
+    args = parser.parse_args()
+    api_key = args.api_key or os.getenv("RIOT_API_KEY")
+    if not api_key:
+        raise SystemExit("RIOT_API_KEY is required (pass --api-key or set env var)")
+    if not args.seed_puuid and not args.seed_riot_id:
+        raise SystemExit("Pass at least one --seed-puuid or --seed-riot-id (ignored on resume)")
+
+    return CrawlConfig(
+        api_key=api_key,
+        seed_puuids=args.seed_puuid,
+        seed_riot_ids=args.seed_riot_id,
+        platform=args.platform,
+        region=args.region,
+        base_url=args.base_url,
+        queue=args.queue,
+        matches_per_player=args.matches_per_player,
+        max_matches=args.max_matches,
+        state_dir=args.state_dir,
+        output_dir=args.output_dir,
+        raw_dir=args.raw_dir,
+        static_dir=args.static_dir,
+        with_timeline=bool(args.with_timeline),
+        row_group_size=args.row_group_size,
+        min_concurrency=args.min_concurrency,
+        max_concurrency=args.max_concurrency,
+    )
+
+
+def main_sync() -> None:
+    print(asyncio.run(crawl(parse_args())))
+
+
+if __name__ == "__main__":
+    main_sync()
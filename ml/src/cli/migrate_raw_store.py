@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Optional
+
+from src.data.raw_store import BackgroundWriter, RawMatchStore
+
+TIMELINE_SUFFIX = ".timeline.json"
+
+
+def migrate(
+    src: Path, dest: Path, delete: bool = False, patch: Optional[str] = None
+) -> Dict[str, int]:
+    """Move ``{src}/{patch}/{match_id}[.timeline].json`` files into a RawMatchStore at ``dest``.
+
+    Payloads already in the store are skipped, so an interrupted migration can be re-run.
+    Source files are only deleted (``delete=True``) after the store has been flushed.
+    """
+    counts = {"migrated": 0, "skipped": 0, "deleted": 0}
+    store = RawMatchStore(dest)
+    migrated = []
+    with BackgroundWriter(store) as writer:
+        patch_dirs = [src / patch] if patch else sorted(p for p in src.iterdir() if p.is_dir())
+        for patch_dir in patch_dirs:
+            for path in sorted(patch_dir.glob("*.json")):
+                if path.name.endswith(TIMELINE_SUFFIX):
+                    match_id, kind = path.name[: -len(TIMELINE_SUFFIX)], "timeline"
+                else:
+                    match_id, kind = path.stem, "match"
+                if store.contains(match_id, kind=kind, patch=patch_dir.name):
+                    counts["skipped"] += 1
+                else:
+                    with path.open("r", encoding="utf-8") as f:
+                        writer.submit(match_id, json.load(f), patch_dir.name, kind=kind)
+                    counts["migrated"] += 1
+                migrated.append(path)
+        writer.flush()
+    if delete:
+        for path in migrated:
+            path.unlink()
+            counts["deleted"] += 1
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Migrate per-match raw JSON files into the compressed raw match store"
+    )
+    parser.add_argument("--src", type=Path, default=Path("ml/data/raw"), help="Legacy raw JSON dir")
+    parser.add_argument(
+        "--dest", type=Path, default=None, help="Raw store root (default: same as --src)"
+    )
+    parser.add_argument("--patch", default=None, help="Only migrate this patch directory")
+    parser.add_argument(
+        "--delete", action="store_true", help="Delete JSON files once they are in the store"
+    )
+    args = parser.parse_args()
+    print(migrate(args.src, args.dest or args.src, delete=args.delete, patch=args.patch))
+
+
+if __name__ == "__main__":
+    main()
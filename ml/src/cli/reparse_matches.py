@@ -0,0 +1,178 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import shutil
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from src.data.ddragon import ChampionIndex, StaticDataRegistry
+from src.data.raw_store import RawEntry, RawMatchStore
+from src.etl.match_table import MATCH_RECORD_SCHEMA, records_to_table
+from src.etl.parse_match import parse_match_to_record
+
+WorkUnit = Tuple[str, List[Tuple[str, RawEntry]]]
+
+# Per-worker state set by _init_worker so each task only pickles its index entries
+_STORE: Optional[RawMatchStore] = None
+_CHAMPIONS: Optional[ChampionIndex] = None
+
+
+def _init_worker(raw_dir: str, champions: Optional[ChampionIndex]) -> None:
+    global _STORE, _CHAMPIONS
+    _STORE = RawMatchStore(Path(raw_dir))
+    _CHAMPIONS = champions
+
+
+def _parse_unit(unit: WorkUnit) -> Tuple[str, pa.Table, int]:
+    """Parse one chunk of a patch; returns (patch, table, failed count)."""
+    patch, entries = unit
+    assert _STORE is not None
+    records: List[Dict[str, Any]] = []
+    failed = 0
+    for _, match in _STORE.read(entries):
+        try:
+            record = parse_match_to_record(match, champions=_CHAMPIONS)
+        except Exception:
+            failed += 1
+            continue
+        if record.get("match_id"):
+            records.append(record)
+        else:
+            failed += 1
+    return patch, records_to_table(records, schema=MATCH_RECORD_SCHEMA), failed
+
+
+def iter_work_units(
+    store: RawMatchStore, patches: List[str], chunk_size: int
+) -> Iterator[WorkUnit]:
+    for patch in patches:
+        entries = store.entries(patch)
+        for i in range(0, len(entries), chunk_size):
+            yield patch, entries[i : i + chunk_size]
+
+
+def load_champion_index(static_dir: Path) -> Optional[ChampionIndex]:
+    registry = StaticDataRegistry(static_dir)
+    static = registry.load_snapshot()
+    if static is None:
+        try:
+            static = asyncio.run(registry.get())
+        except Exception:
+            return None  # bans stay numeric ids
+    return static.champion_index
+
+
+def reparse(
+    raw_dir: Path,
+    output_dir: Path,
+    static_dir: Path = Path("ml/data/static"),
+    patches: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    chunk_size: int = 500,
+    row_group_size: int = 50_000,
+) -> Dict[str, Any]:
+    """Re-parse every raw match into ``output_dir/<patch>/part-0.parquet``.
+
+    Chunks of ``chunk_size`` index entries are parsed on a process pool; at most two chunks
+    per worker are in flight, and finished tables are appended to one ParquetWriter per patch,
+    so memory stays bounded regardless of the archive size. The dataset is built next to
+    ``output_dir`` and swapped in when complete.
+    """
+    store = RawMatchStore(raw_dir)
+    patches = patches or store.patches()
+    workers = workers or os.cpu_count() or 1
+    champions = load_champion_index(static_dir)
+
+    tmp_dir = output_dir.with_name(output_dir.name + ".tmp")
+    if tmp_dir.exists():
+        shutil.rmtree(tmp_dir)
+    writers: Dict[str, pq.ParquetWriter] = {}
+    rows: Dict[str, int] = {}
+    failed = 0
+
+    def write(patch: str, table: pa.Table) -> None:
+        writer = writers.get(patch)
+        if writer is None:
+            # Plain "{patch}/" directories: a hive "patch=" key would clash with the patch column
+            part_dir = tmp_dir / patch
+            part_dir.mkdir(parents=True, exist_ok=True)
+            writer = pq.ParquetWriter(part_dir / "part-0.parquet", MATCH_RECORD_SCHEMA)
+            writers[patch] = writer
+        writer.write_table(table, row_group_size=row_group_size)
+        rows[patch] = rows.get(patch, 0) + table.num_rows
+
+    units = iter_work_units(store, patches, chunk_size)
+    try:
+        with ProcessPoolExecutor(
+            max_workers=workers, initializer=_init_worker, initargs=(str(raw_dir), champions)
+        ) as pool:
+            pending: Set[Future] = set()
+            for unit in units:
+                pending.add(pool.submit(_parse_unit, unit))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        patch, table, n_failed = fut.result()
+                        write(patch, table)
+                        failed += n_failed
+            for fut in pending:
+                patch, table, n_failed = fut.result()
+                write(patch, table)
+                failed += n_failed
+    finally:
+        for writer in writers.values():
+            writer.close()
+
+    if output_dir.exists():
+        shutil.rmtree(output_dir)
+    tmp_dir.mkdir(parents=True, exist_ok=True)
+    os.replace(tmp_dir, output_dir)
+    return {
+        "rows": sum(rows.values()),
+        "rows_by_patch": dict(sorted(rows.items())),
+        "failed": failed,
+        "workers": workers,
+        "output_dir": str(output_dir),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Re-parse the raw match store into a patch-partitioned MatchRecord dataset"
+    )
+    parser.add_argument(
+        "--raw-dir", type=Path, default=Path("ml/data/raw"), help="Raw match store root"
+    )
+    parser.add_argument(
+        "--output-dir",
+        type=Path,
+        default=Path("ml/data/processed/match_records"),
+        help="Output dataset, one directory per patch (read with pd.read_parquet(dir))",
+    )
+    parser.add_argument("--static-dir", type=Path, default=Path("ml/data/static"))
+    parser.add_argument("--patch", action="append", default=None, help="Only these patches")
+    parser.add_argument("--workers", type=int, default=None, help="Processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Matches per work unit")
+    parser.add_argument("--row-group-size", type=int, default=50_000)
+    args = parser.parse_args()
+    print(
+        reparse(
+            args.raw_dir,
+            args.output_dir,
+            static_dir=args.static_dir,
+            patches=args.patch,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            row_group_size=args.row_group_size,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
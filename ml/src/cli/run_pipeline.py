@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import argparse
+import os
+from pathlib import Path
+from typing import Any, Dict
+
+from src.cli.collect_and_build import CollectionConfig
+from src.features.matchup_features import DEFAULT_PRIOR_STRENGTH
+from src.pipelines.artifact_cache import ArtifactCache
+from src.pipelines.train_pipeline import STAGE_NAMES, PipelineConfig, plan_pipeline, run_pipeline
+
+
+def _print_progress(stage: str, status: str, info: Dict[str, Any]) -> None:
+    detail = f" ({info['seconds']}s)" if status in ("done", "cached") else ""
+    error = f": {info['error']}" if status == "failed" else ""
+    print(f"[{stage}] {status}{detail}{error}", flush=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Run collect -> parse -> lane_wr -> featurize -> train, skipping stages "
+        "whose inputs are unchanged since the last run in --work-dir"
+    )
+    parser.add_argument(
+        "--work-dir",
+        type=Path,
+        default=Path("ml/artifacts/pipeline"),
+        help="Stage outputs and the content-hash state live here",
+    )
+    parser.add_argument(
+        "--matches",
+        type=Path,
+        nargs="*",
+        default=[],
+        help="Existing matches.parquet file(s) or directories merged into the parsed table",
+    )
+    collect = parser.add_argument_group("collection (optional; needs RIOT_API_KEY)")
+    collect.add_argument("--game-name", default=None, help="Collect this Riot ID's recent matches")
+    collect.add_argument("--tag-line", default=None)
+    collect.add_argument("--api-key", default=None, help="Riot API key (or set RIOT_API_KEY)")
+    collect.add_argument("--platform", default="na1")
+    collect.add_argument("--region", default="americas")
+    collect.add_argument("--queue", type=int, default=420)
+    collect.add_argument("--count", type=int, default=50)
+    collect.add_argument("--concurrency", type=int, default=5)
+    collect.add_argument("--raw-dir", type=Path, default=Path("ml/data/raw"))
+    collect.add_argument("--static-dir", type=Path, default=Path("ml/data/static"))
+    collect.add_argument("--with-timeline", action="store_true")
+
+    parser.add_argument("--champion-table-dir", type=Path, default=None)
+    parser.add_argument("--champ-info", type=Path, default=None, help="champ_info.parquet")
+    parser.add_argument("--pair-matrix-dir", type=Path, default=None)
+    parser.add_argument("--prior-strength", type=float, default=DEFAULT_PRIOR_STRENGTH)
+    parser.add_argument("--backoff-patches", type=int, default=2)
+    parser.add_argument("--backoff-decay", type=float, default=0.5)
+    parser.add_argument("--min-n", type=int, default=20)
+
+    parser.add_argument("--no-train", action="store_true", help="Stop after featurize")
+    parser.add_argument("--output", type=Path, default=None, help="Path to write model.joblib")
+    parser.add_argument("--registry", type=Path, default=None, help="Model registry directory")
+    parser.add_argument("--patch", default=None, help="Train only on this patch")
+    parser.add_argument("--calibration", choices=["isotonic", "platt", "none"], default="isotonic")
+    parser.add_argument(
+        "--force",
+        action="append",
+        choices=[*STAGE_NAMES, "all"],
+        default=[],
+        help="Rerun this stage even if its inputs are unchanged (repeatable)",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=None,
+        help="Content-addressed artifact cache shared across work dirs and parameter sweeps",
+    )
+    parser.add_argument("--cache-max-gb", type=float, default=20.0, help="LRU size bound")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print which stages would be skipped, restored from the cache or recomputed",
+    )
+    args = parser.parse_args()
+
+    collection = None
+    if args.game_name or args.tag_line:
+        api_key = args.api_key or os.getenv("RIOT_API_KEY")
+        if not (args.game_name and args.tag_line):
+            parser.error("--game-name and --tag-line go together")
+        if not api_key:
+            raise SystemExit("RIOT_API_KEY is required to collect (pass --api-key or set env var)")
+        collection = CollectionConfig(
+            api_key=api_key,
+            game_name=args.game_name,
+            tag_line=args.tag_line,
+            platform=args.platform,
+            region=args.region,
+            queue=args.queue,
+            count=args.count,
+            concurrency=args.concurrency,
+            raw_dir=args.raw_dir,
+            static_dir=args.static_dir,
+            with_timeline=bool(args.with_timeline),
+        )
+    if collection is None and not args.matches:
+        parser.error("pass --matches and/or --game-name/--tag-line")
+    if not args.no_train and args.output is None and args.registry is None:
+        parser.error("pass --output and/or --registry (or --no-train)")
+
+    config = PipelineConfig(
+        work_dir=args.work_dir,
+        collect=collection,
+        matches=args.matches,
+        champion_table_dir=args.champion_table_dir,
+        champ_info_path=args.champ_info,
+        pair_matrix_dir=args.pair_matrix_dir,
+        smoothing={
+            "prior_strength": args.prior_strength,
+            "backoff_patches": args.backoff_patches,
+            "backoff_decay": args.backoff_decay,
+            "min_n": args.min_n,
+        },
+        train=not args.no_train,
+        output_model=args.output,
+        registry=args.registry,
+        patch=args.patch,
+        calibration=None if args.calibration == "none" else args.calibration,
+    )
+    cache = (
+        ArtifactCache(args.cache_dir, max_bytes=int(args.cache_max_gb * (1 << 30)))
+        if args.cache_dir
+        else None
+    )
+    if args.dry_run:
+        for stage, step in plan_pipeline(config, force=args.force, cache=cache).items():
+            print(f"[{stage}] {step['action']}: {step['reason']}")
+        return
+    print(run_pipeline(config, force=args.force, progress=_print_progress, cache=cache))
+
+
+if __name__ == "__main__":
+    main()
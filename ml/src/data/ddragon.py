@@ -0,0 +1,193 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .riot_http import RiotHttpClient
+
+DDRAGON_BASE = "https://ddragon.leagueoflegends.com"
+CHAMPION_FILE = "champion.json"
+RUNES_FILE = "runesReforged.json"
+
+
+def version_key(version: str) -> Tuple[int, ...]:
+    parts = []
+    for p in version.split("."):
+        if not p.isdigit():
+            return ()
+        parts.append(int(p))
+    return tuple(parts)
+
+
+@dataclass
+class ChampionIndex:
+    """id <-> key <-> name lookups for one DDragon version.
+
+    ``id`` is Riot's numeric championId (bans, mastery), ``key`` the string id used as
+    ``championName`` in match-v5 and as the champ_info index ("MonkeyKing"), ``name`` the
+    display name ("Wukong").
+    """
+
+    key_by_id: Dict[int, str] = field(default_factory=dict)
+    id_by_key: Dict[str, int] = field(default_factory=dict)
+    name_by_key: Dict[str, str] = field(default_factory=dict)
+    key_by_name: Dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_champion_json(cls, payload: Dict[str, Any]) -> "ChampionIndex":
+        index = cls()
+        for key, champ in (payload.get("data") or {}).items():
+            try:
+                champ_id = int(champ.get("key"))
+            except (TypeError, ValueError):
+                continue
+            name = champ.get("name") or key
+            index.key_by_id[champ_id] = key
+            index.id_by_key[key] = champ_id
+            index.name_by_key[key] = name
+            index.key_by_name[name.lower()] = key
+            index.key_by_name[key.lower()] = key
+        return index
+
+    def key_for_id(self, champion_id: Any) -> Optional[str]:
+        try:
+            return self.key_by_id.get(int(champion_id))
+        except (TypeError, ValueError):
+            return None
+
+    def resolve(self, value: Any) -> Optional[str]:
+        """Champion key for a numeric id, key or display name (case-insensitive)."""
+        if isinstance(value, int) or (isinstance(value, str) and value.lstrip("-").isdigit()):
+            return self.key_for_id(value)
+        if isinstance(value, str):
+            if value in self.id_by_key:
+                return value
+            return self.key_by_name.get(value.lower())
+        return None
+
+
+@dataclass
+class StaticData:
+    version: str
+    champions: Dict[str, Any]
+    runes: List[Any]
+    champion_index: ChampionIndex
+
+
+class StaticDataRegistry:
+    """Loads DDragon champion/rune data once per version and indexes it.
+
+    Every version fetched is snapshotted under ``snapshot_dir/{version}/`` so later runs (or
+    offline ones) start from disk. ``pinned_version`` skips the versions.json lookup.
+    """
+
+    def __init__(
+        self,
+        snapshot_dir: Optional[Path] = None,
+        http: Optional[RiotHttpClient] = None,
+        pinned_version: Optional[str] = None,
+        version_ttl: float = 3600.0,
+    ) -> None:
+        self.snapshot_dir = Path(snapshot_dir) if snapshot_dir else None
+        self.http = http
+        self.pinned_version = pinned_version
+        self.version_ttl = version_ttl
+        self._versions: Dict[str, StaticData] = {}
+        self._latest: Optional[Tuple[float, str]] = None
+        self._lock = asyncio.Lock()
+
+    # ------------------------------------------------------------------ disk
+    def snapshot_versions(self) -> List[str]:
+        if self.snapshot_dir is None or not self.snapshot_dir.exists():
+            return []
+        versions = [
+            p.name
+            for p in self.snapshot_dir.iterdir()
+            if (p / CHAMPION_FILE).exists() and (p / RUNES_FILE).exists() and version_key(p.name)
+        ]
+        return sorted(versions, key=version_key, reverse=True)
+
+    def load_snapshot(self, version: Optional[str] = None) -> Optional[StaticData]:
+        """Load ``version`` (default: newest on disk) without touching the network."""
+        version = version or self.pinned_version or next(iter(self.snapshot_versions()), None)
+        if version is None:
+            return None
+        if version in self._versions:
+            return self._versions[version]
+        if self.snapshot_dir is None:
+            return None
+        base = self.snapshot_dir / version
+        try:
+            champions = json.loads((base / CHAMPION_FILE).read_text(encoding="utf-8"))
+            runes = json.loads((base / RUNES_FILE).read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        return self._remember(version, champions, runes)
+
+    def _write_snapshot(self, version: str, champions: Any, runes: Any) -> None:
+        if self.snapshot_dir is None:
+            return
+        base = self.snapshot_dir / version
+        base.mkdir(parents=True, exist_ok=True)
+        for name, payload in ((CHAMPION_FILE, champions), (RUNES_FILE, runes)):
+            tmp = base / f"{name}.tmp"
+            tmp.write_text(json.dumps(payload, ensure_ascii=False), encoding="utf-8")
+            os.replace(tmp, base / name)
+
+    def _remember(self, version: str, champions: Dict[str, Any], runes: List[Any]) -> StaticData:
+        data = StaticData(
+            version=version,
+            champions=champions,
+            runes=runes,
+            champion_index=ChampionIndex.from_champion_json(champions),
+        )
+        self._versions[version] = data
+        return data
+
+    # --------------------------------------------------------------- network
+    def _client(self) -> RiotHttpClient:
+        if self.http is None:
+            self.http = RiotHttpClient(api_key=None)
+        return self.http
+
+    async def latest_version(self) -> str:
+        if self.pinned_version:
+            return self.pinned_version
+        now = time.monotonic()
+        if self._latest is not None and now - self._latest[0] < self.version_ttl:
+            return self._latest[1]
+        versions = await self._client().get_public_json(f"{DDRAGON_BASE}/api/versions.json")
+        self._latest = (now, versions[0])
+        return versions[0]
+
+    async def get(self, version: Optional[str] = None) -> StaticData:
+        """Static data for ``version`` (default latest): memory, then disk, then DDragon.
+
+        If the latest version cannot be resolved (offline), the newest snapshot is used.
+        """
+        if version is None:
+            try:
+                version = await self.latest_version()
+            except Exception:
+                snapshot = self.load_snapshot()
+                if snapshot is None:
+                    raise
+                return snapshot
+        cached = self._versions.get(version) or self.load_snapshot(version)
+        if cached is not None:
+            return cached
+        async with self._lock:
+            if version in self._versions:
+                return self._versions[version]
+            base = f"{DDRAGON_BASE}/cdn/{version}/data/en_US"
+            champions, runes = await asyncio.gather(
+                self._client().get_public_json(f"{base}/{CHAMPION_FILE}"),
+                self._client().get_public_json(f"{base}/{RUNES_FILE}"),
+            )
+            await asyncio.to_thread(self._write_snapshot, version, champions, runes)
+            return self._remember(version, champions, runes)
@@ -0,0 +1,341 @@
+from __future__ import annotations
+
+import json
+import os
+import queue
+import struct
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, IO, Iterable, Iterator, List, Optional, Tuple
+
+import zstandard
+
+SEGMENT_PREFIX = "seg-"
+SEGMENT_SUFFIX = ".zst"
+INDEX_FILE = "index.tsv"
+DEFAULT_SEGMENT_BYTES = 256 * 1024 * 1024
+
+# Record header: compressed frame length, key length; followed by the key and the zstd frame
+_HEADER = struct.Struct(">IH")
+
+
+@dataclass(frozen=True)
+class RawEntry:
+    patch: str
+    segment: int
+    offset: int  # start of the zstd frame
+    length: int
+
+
+def _segment_name(seq: int) -> str:
+    return f"{SEGMENT_PREFIX}{seq:06d}{SEGMENT_SUFFIX}"
+
+
+def _record_key(match_id: str, kind: str) -> str:
+    return f"{kind}:{match_id}"
+
+
+def _parse_index_line(line: str, patch: str) -> Optional[Tuple[str, RawEntry]]:
+    # Every line is written with its newline, so one without it is torn by a crash
+    if not line.endswith("\n"):
+        return None
+    parts = line[:-1].split("\t")
+    if len(parts) != 4:
+        return None
+    key, seg, off, length = parts
+    try:
+        return key, RawEntry(patch, int(seg), int(off), int(length))
+    except ValueError:
+        return None
+
+
+def _trim_partial_line(path: Path) -> None:
+    """Cut a file back to its last newline, so appends never land on a torn line."""
+    with path.open("r+b") as f:
+        end = pos = f.seek(0, os.SEEK_END)
+        cut = 0
+        while pos > 0:
+            step = min(1 << 16, pos)
+            f.seek(pos - step)
+            newline = f.read(step).rfind(b"\n")
+            if newline >= 0:
+                cut = pos - step + newline + 1
+                break
+            pos -= step
+        if cut != end:
+            f.truncate(cut)
+
+
+class RawMatchStore:
+    """Append-only raw match/timeline store: ``{root}/{patch}/seg-NNNNNN.zst`` + ``index.tsv``.
+
+    Each payload is its own zstd frame, length-prefixed inside the segment, so single matches
+    are read with one seek and a patch streams segment by segment. The index line is written
+    after the data; index lines without their newline are ignored, and reopening a patch for
+    writes cuts the index back to its last complete line and truncates any unindexed segment
+    tail, so a crash never leaves a half-written record visible. ``put`` calls are serialized
+    by a lock; use :class:`BackgroundWriter` to take compression and disk I/O off the event
+    loop.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        segment_bytes: int = DEFAULT_SEGMENT_BYTES,
+        level: int = 3,
+    ) -> None:
+        self.root = Path(root)
+        self.segment_bytes = segment_bytes
+        self._compressor = zstandard.ZstdCompressor(level=level)
+        self._lock = threading.Lock()
+        self._entries: Dict[str, RawEntry] = {}
+        self._loaded: set[str] = set()
+        self._writers: Dict[str, Tuple[int, IO[bytes], IO[str]]] = {}
+
+    # ----------------------------------------------------------------- index
+    def patches(self) -> List[str]:
+        if not self.root.exists():
+            return []
+        return sorted(p.name for p in self.root.iterdir() if (p / INDEX_FILE).exists())
+
+    def _load_patch(self, patch: str) -> None:
+        if patch in self._loaded:
+            return
+        path = self.root / patch / INDEX_FILE
+        if path.exists():
+            with path.open("r", encoding="utf-8", newline="\n") as f:
+                for line in f:
+                    parsed = _parse_index_line(line, patch)
+                    if parsed is not None:
+                        self._entries[parsed[0]] = parsed[1]
+        self._loaded.add(patch)
+
+    def _load_all(self) -> None:
+        for patch in self.patches():
+            self._load_patch(patch)
+
+    def _locate(self, match_id: str, kind: str, patch: Optional[str]) -> Optional[RawEntry]:
+        key = _record_key(match_id, kind)
+        with self._lock:
+            if patch is not None:
+                self._load_patch(patch)
+            elif key not in self._entries:
+                self._load_all()
+            entry = self._entries.get(key)
+        if entry is None or (patch is not None and entry.patch != patch):
+            return None
+        return entry
+
+    def contains(self, match_id: str, kind: str = "match", patch: Optional[str] = None) -> bool:
+        return self._locate(match_id, kind, patch) is not None
+
+    # ----------------------------------------------------------------- write
+    def _writer_for(self, patch: str) -> Tuple[int, IO[bytes], IO[str]]:
+        writer = self._writers.get(patch)
+        if writer is not None:
+            return writer
+        self._load_patch(patch)
+        base = self.root / patch
+        base.mkdir(parents=True, exist_ok=True)
+        segments = sorted(
+            int(p.name[len(SEGMENT_PREFIX) : -len(SEGMENT_SUFFIX)])
+            for p in base.glob(f"{SEGMENT_PREFIX}*{SEGMENT_SUFFIX}")
+        )
+        seq = segments[-1] if segments else 1
+        # Drop bytes past the last indexed record (written before a crash, never indexed)
+        end = max(
+            (
+                e.offset + e.length
+                for e in self._entries.values()
+                if e.patch == patch and e.segment == seq
+            ),
+            default=0,
+        )
+        seg = open(base / _segment_name(seq), "ab")
+        if seg.tell() != end:
+            seg.truncate(end)
+            seg.seek(end)
+        index_path = base / INDEX_FILE
+        if index_path.exists():
+            _trim_partial_line(index_path)
+        index = open(index_path, "a", encoding="utf-8", newline="\n")
+        self._writers[patch] = writer = (seq, seg, index)
+        return writer
+
+    def put(self, match_id: str, payload: Any, patch: str, kind: str = "match") -> RawEntry:
+        """Compress and append one payload; a repeated ``(match_id, kind)`` supersedes the old
+        one."""
+        patch = patch or "unknown"
+        key = _record_key(match_id, kind)
+        key_bytes = key.encode("utf-8")
+        data = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            # ZstdCompressor instances are not thread-safe
+            frame = self._compressor.compress(data)
+            seq, seg, index = self._writer_for(patch)
+            if seg.tell() >= self.segment_bytes:
+                seg.close()
+                seq += 1
+                seg = open(self.root / patch / _segment_name(seq), "ab")
+                self._writers[patch] = (seq, seg, index)
+            seg.write(_HEADER.pack(len(frame), len(key_bytes)))
+            seg.write(key_bytes)
+            offset = seg.tell()
+            seg.write(frame)
+            seg.flush()
+            index.write(f"{key}\t{seq}\t{offset}\t{len(frame)}\n")
+            index.flush()
+            entry = self._entries[key] = RawEntry(patch, seq, offset, len(frame))
+        return entry
+
+    def flush(self, sync: bool = False) -> None:
+        with self._lock:
+            for _, seg, index in self._writers.values():
+                seg.flush()
+                index.flush()
+                if sync:
+                    os.fsync(seg.fileno())
+                    os.fsync(index.fileno())
+
+    def close(self) -> None:
+        self.flush(sync=True)
+        with self._lock:
+            for _, seg, index in self._writers.values():
+                seg.close()
+                index.close()
+            self._writers.clear()
+
+    def __enter__(self) -> "RawMatchStore":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+    # ------------------------------------------------------------------ read
+    def _read_frame(self, f: IO[bytes], entry: RawEntry) -> Any:
+        f.seek(entry.offset)
+        raw = zstandard.ZstdDecompressor().decompress(f.read(entry.length))
+        return json.loads(raw)
+
+    def get(self, match_id: str, kind: str = "match", patch: Optional[str] = None) -> Optional[Any]:
+        """One payload by match id (``patch`` narrows the index scan), or None if absent."""
+        entry = self._locate(match_id, kind, patch)
+        if entry is None:
+            return None
+        with open(self.root / entry.patch / _segment_name(entry.segment), "rb") as f:
+            return self._read_frame(f, entry)
+
+    def entries(self, patch: str, kind: str = "match") -> List[Tuple[str, RawEntry]]:
+        """``(match_id, entry)`` pairs of a patch in on-disk order; picklable work units."""
+        prefix = f"{kind}:"
+        with self._lock:
+            self._load_patch(patch)
+            found = [
+                (key[len(prefix) :], e)
+                for key, e in self._entries.items()
+                if e.patch == patch and key.startswith(prefix)
+            ]
+        found.sort(key=lambda item: (item[1].segment, item[1].offset))
+        return found
+
+    def _seek(
+        self, entries: Iterable[Tuple[str, RawEntry]]
+    ) -> Iterator[Tuple[str, RawEntry, IO[bytes]]]:
+        """Segment file positioned at each entry's frame, keeping one file open at a time."""
+        f: Optional[IO[bytes]] = None
+        current: Optional[Tuple[str, int]] = None
+        try:
+            for match_id, entry in entries:
+                if (entry.patch, entry.segment) != current:
+                    if f is not None:
+                        f.close()
+                    f = open(self.root / entry.patch / _segment_name(entry.segment), "rb")
+                    current = (entry.patch, entry.segment)
+                f.seek(entry.offset)
+                yield match_id, entry, f
+        finally:
+            if f is not None:
+                f.close()
+
+    def read(self, entries: Iterable[Tuple[str, RawEntry]]) -> Iterator[Tuple[str, Any]]:
+        """Decode ``entries`` in order, keeping one segment file open at a time."""
+        decompressor = zstandard.ZstdDecompressor()
+        for match_id, entry, f in self._seek(entries):
+            yield match_id, json.loads(decompressor.decompress(f.read(entry.length)))
+
+    def stream(self, entries: Iterable[Tuple[str, RawEntry]]) -> Iterator[Tuple[str, IO[bytes]]]:
+        """Like :meth:`read`, but yield each payload as a decompressing byte stream for
+        incremental JSON parsing (timelines). A stream is only valid until the next item."""
+        decompressor = zstandard.ZstdDecompressor()
+        for match_id, _, f in self._seek(entries):
+            # Each record is one zstd frame, so the reader stops at the record's end
+            with decompressor.stream_reader(f, read_across_frames=False, closefd=False) as reader:
+                yield match_id, reader
+
+    def iter_patch(self, patch: str, kind: str = "match") -> Iterator[Tuple[str, Any]]:
+        """Stream ``(match_id, payload)`` for a patch in write order."""
+        return self.read(self.entries(patch, kind))
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._load_all()
+            return len(self._entries)
+
+
+class BackgroundWriter:
+    """Runs :meth:`RawMatchStore.put` on a dedicated thread.
+
+    ``submit`` only enqueues, blocking when ``max_pending`` payloads are waiting so a slow
+    disk applies backpressure instead of growing memory. ``flush`` waits for the queue to
+    drain; errors from the writer thread are re-raised on the next ``submit``/``flush``.
+    """
+
+    _STOP = object()
+
+    def __init__(self, store: RawMatchStore, max_pending: int = 1024) -> None:
+        self.store = store
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_pending)
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._run, name="raw-store-writer", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            try:
+                if item is self._STOP:
+                    return
+                if self._error is None:
+                    self.store.put(*item)
+            except BaseException as exc:  # surfaced to the producer
+                self._error = exc
+            finally:
+                self._queue.task_done()
+
+    def _raise_pending(self) -> None:
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def submit(self, match_id: str, payload: Any, patch: str, kind: str = "match") -> None:
+        self._raise_pending()
+        self._queue.put((match_id, payload, patch, kind))
+
+    def flush(self) -> None:
+        self._queue.join()
+        self.store.flush()
+        self._raise_pending()
+
+    def close(self) -> None:
+        if self._thread.is_alive():
+            self._queue.put(self._STOP)
+            self._thread.join()
+        self.store.close()
+        self._raise_pending()
+
+    def __enter__(self) -> "BackgroundWriter":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
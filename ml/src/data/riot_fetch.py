@@ -1,10 +1,10 @@
 from __future__ import annotations
 
-import asyncio
 from typing import Any, Dict, List, Optional
 
-import httpx
-from pydantic import BaseModel
+from pydantic import BaseModel, PrivateAttr
+
+from .riot_http import RiotHttpClient
 
 
 class RiotClient(BaseModel):
@@ -12,41 +12,51 @@ class RiotClient(BaseModel):
     platform: str = "na1"
     region: str = "americas"
     timeout: float = 15.0
+    max_connections: int = 50
+    # Replaces both routing hosts, e.g. http://127.0.0.1:9000 for a local mock server
+    base_url: Optional[str] = None
+
+    _http: Optional[RiotHttpClient] = PrivateAttr(default=None)
 
     @property
     def platform_base(self) -> str:
-        return f"https://{self.platform}.api.riotgames.com"
+        return self.base_url or f"https://{self.platform}.api.riotgames.com"
 
     @property
     def region_base(self) -> str:
-        return f"https://{self.region}.api.riotgames.com"
-
-    async def _request(self, method: str, url: str, params: Optional[Dict[str, Any]] = None) -> Any:
-        headers = {"X-Riot-Token": self.api_key}
-        retries = 3
-        backoff = 0.8
-        for attempt in range(retries):
-            try:
-                async with httpx.AsyncClient(timeout=self.timeout) as client:
-                    r = await client.request(method, url, params=params, headers=headers)
-                if r.status_code == 429:
-                    retry_after = float(r.headers.get("Retry-After", backoff * (2 ** attempt)))
-                    await asyncio.sleep(retry_after)
-                    continue
-                if 200 <= r.status_code < 300:
-                    return r.json()
-                if 500 <= r.status_code < 600:
-                    await asyncio.sleep(backoff * (2 ** attempt))
-                    continue
-                raise RuntimeError(f"Riot error {r.status_code}: {r.text}")
-            except (httpx.RequestError, httpx.TimeoutException):
-                await asyncio.sleep(backoff * (2 ** attempt))
-                continue
-        raise RuntimeError("Upstream request failed after retries")
+        return self.base_url or f"https://{self.region}.api.riotgames.com"
+
+    @property
+    def http(self) -> RiotHttpClient:
+        """Shared pooled, rate-limited HTTP client for every call made by this RiotClient."""
+        if self._http is None:
+            self._http = RiotHttpClient(
+                api_key=self.api_key, timeout=self.timeout, max_connections=self.max_connections
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+
+    async def __aenter__(self) -> "RiotClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def _request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        endpoint: Optional[str] = None,
+    ) -> Any:
+        return await self.http.request(method, url, params=params, endpoint=endpoint)
 
     async def account_by_riot_id(self, game_name: str, tag_line: str) -> Dict[str, Any]:
         url = f"{self.region_base}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}"
-        return await self._request("GET", url)
+        return await self._request("GET", url, endpoint="account-v1.by-riot-id")
 
     # Regional routing
     async def matches_by_puuid(self, puuid: str, start: int = 0, count: int = 20, queue: Optional[int] = None) -> List[str]:
@@ -54,23 +64,23 @@ class RiotClient(BaseModel):
         if queue is not None:
             params["queue"] = queue
         url = f"{self.region_base}/lol/match/v5/matches/by-puuid/{puuid}/ids"
-        return await self._request("GET", url, params=params)
+        return await self._request("GET", url, params=params, endpoint="match-v5.ids-by-puuid")
 
     async def match(self, match_id: str) -> Dict[str, Any]:
         url = f"{self.region_base}/lol/match/v5/matches/{match_id}"
-        return await self._request("GET", url)
+        return await self._request("GET", url, endpoint="match-v5.match")
 
     async def match_timeline(self, match_id: str) -> Dict[str, Any]:
         url = f"{self.region_base}/lol/match/v5/matches/{match_id}/timeline"
-        return await self._request("GET", url)
+        return await self._request("GET", url, endpoint="match-v5.timeline")
 
     # Platform routing
     async def summoner_by_puuid(self, puuid: str) -> Dict[str, Any]:
         url = f"{self.platform_base}/lol/summoner/v4/summoners/by-puuid/{puuid}"
-        return await self._request("GET", url)
+        return await self._request("GET", url, endpoint="summoner-v4.by-puuid")
 
     async def league_entries_by_summoner(self, encrypted_summoner_id: str) -> List[Dict[str, Any]]:
         url = f"{self.platform_base}/lol/league/v4/entries/by-summoner/{encrypted_summoner_id}"
-        return await self._request("GET", url)
+        return await self._request("GET", url, endpoint="league-v4.entries-by-summoner")
 
 
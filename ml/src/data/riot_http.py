@@ -0,0 +1,275 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+from urllib.parse import urlsplit
+
+import httpx
+
+# Development-key application limits, used until the first response reports the real ones
+DEFAULT_APP_RATE_LIMIT = "20:1,100:120"
+
+
+class RiotApiError(RuntimeError):
+    def __init__(self, status_code: int, detail: str) -> None:
+        super().__init__(f"Riot error {status_code}: {detail}")
+        self.status_code = status_code
+        self.detail = detail
+
+
+def parse_rate_limit(header: Optional[str]) -> List[Tuple[int, float]]:
+    """Parse ``"20:1,100:120"`` into ``[(20, 1.0), (100, 120.0)]`` (count, window seconds)."""
+    limits: List[Tuple[int, float]] = []
+    for part in (header or "").split(","):
+        count, _, window = part.strip().partition(":")
+        try:
+            limits.append((int(count), float(window)))
+        except ValueError:
+            continue
+    return limits
+
+
+# Slack added to each window so requests landing right at a boundary are not counted twice
+_WINDOW_MARGIN = 0.05
+
+
+class TokenBucket:
+    """Riot-style bucket: ``limit`` tokens per window, refilled all at once ``window`` seconds
+    after the window's first request (continuous refill would overshoot Riot's fixed windows)."""
+
+    def __init__(self, limit: int, window: float) -> None:
+        self.limit = limit
+        self.window = window
+        self.tokens = float(limit)
+        self.window_start: Optional[float] = None
+
+    def _refill(self, now: float) -> None:
+        if (
+            self.window_start is not None
+            and now >= self.window_start + self.window + _WINDOW_MARGIN
+        ):
+            self.tokens = float(self.limit)
+            self.window_start = None
+
+    def wait_time(self, now: float) -> float:
+        self._refill(now)
+        if self.tokens >= 1.0 or self.window_start is None:
+            return 0.0
+        return self.window_start + self.window + _WINDOW_MARGIN - now
+
+    def consume(self, now: float) -> None:
+        self._refill(now)
+        if self.window_start is None:
+            self.window_start = now
+        self.tokens -= 1.0
+
+    def sync_count(self, used: int, now: float) -> None:
+        # The server's view of usage wins when it is stricter than ours
+        self._refill(now)
+        if used > 0 and self.window_start is None:
+            self.window_start = now
+        self.tokens = min(self.tokens, float(self.limit - used))
+
+    def fraction_left(self, now: float) -> float:
+        self._refill(now)
+        return max(0.0, self.tokens) / self.limit
+
+
+class RateLimitGroup:
+    """All windows of one Riot limit scope (the app on a host, or one method on a host)."""
+
+    def __init__(self, limits: Optional[List[Tuple[int, float]]] = None) -> None:
+        self.buckets: Dict[Tuple[int, float], TokenBucket] = {}
+        self.blocked_until = 0.0
+        if limits:
+            self.configure(limits)
+
+    def configure(self, limits: List[Tuple[int, float]]) -> None:
+        buckets = {}
+        for limit, window in limits:
+            key = (limit, window)
+            buckets[key] = self.buckets.get(key) or TokenBucket(limit, window)
+        self.buckets = buckets
+
+    def wait_time(self, now: float) -> float:
+        wait = max(0.0, self.blocked_until - now)
+        for bucket in self.buckets.values():
+            wait = max(wait, bucket.wait_time(now))
+        return wait
+
+    def consume(self, now: float) -> None:
+        for bucket in self.buckets.values():
+            bucket.consume(now)
+
+    def observe(self, limit_header: Optional[str], count_header: Optional[str], now: float) -> None:
+        limits = parse_rate_limit(limit_header)
+        if limits and set(limits) != set(self.buckets):
+            self.configure(limits)
+        for limit, window in limits:
+            for used, used_window in parse_rate_limit(count_header):
+                if used_window == window:
+                    self.buckets[(limit, window)].sync_count(used, now)
+
+    def block(self, seconds: float, now: float) -> None:
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+    def headroom(self, now: float) -> float:
+        if now < self.blocked_until:
+            return 0.0
+        return min((b.fraction_left(now) for b in self.buckets.values()), default=1.0)
+
+
+class RateLimiter:
+    """Per-host application buckets and per-(host, method) buckets, seeded from the
+    ``X-App-Rate-Limit`` / ``X-Method-Rate-Limit`` response headers."""
+
+    def __init__(self, default_app_limit: str = DEFAULT_APP_RATE_LIMIT) -> None:
+        self.default_app_limits = parse_rate_limit(default_app_limit)
+        self.app: Dict[str, RateLimitGroup] = {}
+        self.method: Dict[Tuple[str, str], RateLimitGroup] = {}
+
+    def _groups(self, host: str, endpoint: str) -> Tuple[RateLimitGroup, RateLimitGroup]:
+        app = self.app.get(host)
+        if app is None:
+            app = self.app[host] = RateLimitGroup(self.default_app_limits)
+        method = self.method.get((host, endpoint))
+        if method is None:
+            method = self.method[(host, endpoint)] = RateLimitGroup()
+        return app, method
+
+    async def acquire(self, host: str, endpoint: str) -> None:
+        groups = self._groups(host, endpoint)
+        while True:
+            now = time.monotonic()
+            wait = max(g.wait_time(now) for g in groups)
+            if wait <= 0:
+                for g in groups:
+                    g.consume(now)
+                return
+            await asyncio.sleep(wait)
+
+    def observe(self, host: str, endpoint: str, response: httpx.Response) -> None:
+        now = time.monotonic()
+        app, method = self._groups(host, endpoint)
+        headers = response.headers
+        app.observe(headers.get("X-App-Rate-Limit"), headers.get("X-App-Rate-Limit-Count"), now)
+        method.observe(
+            headers.get("X-Method-Rate-Limit"), headers.get("X-Method-Rate-Limit-Count"), now
+        )
+        if response.status_code == 429:
+            retry_after = _retry_after(headers, default=1.0)
+            limit_type = (headers.get("X-Rate-Limit-Type") or "").lower()
+            if limit_type == "application":
+                app.block(retry_after, now)
+            elif limit_type == "method":
+                method.block(retry_after, now)
+
+    def headroom(self, host: Optional[str] = None) -> float:
+        """Fraction (0..1) of the tightest application bucket still available."""
+        now = time.monotonic()
+        groups = [self.app[host]] if host in self.app else list(self.app.values())
+        return min((g.headroom(now) for g in groups), default=1.0)
+
+
+def _retry_after(headers: Mapping[str, str], default: float) -> float:
+    try:
+        return float(headers.get("Retry-After", default))
+    except (TypeError, ValueError):
+        return default
+
+
+class RiotHttpClient:
+    """Connection-pooled Riot API client with proactive rate limiting.
+
+    One instance should be shared per process/event loop: the underlying
+    ``httpx.AsyncClient`` keeps TLS connections alive across calls. Pass ``transport`` (e.g.
+    ``httpx.MockTransport``) or point the callers' base URLs at a local mock server in tests.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str],
+        timeout: float = 15.0,
+        max_connections: int = 50,
+        retries: int = 3,
+        backoff: float = 0.8,
+        limiter: Optional[RateLimiter] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ) -> None:
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff = backoff
+        self.limiter = limiter or RateLimiter()
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+                transport=self.transport,
+            )
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def __aenter__(self) -> "RiotHttpClient":
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.aclose()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: Optional[Dict[str, Any]] = None,
+        endpoint: Optional[str] = None,
+    ) -> Any:
+        """Rate-limited Riot API call returning parsed JSON; raises RiotApiError on failure."""
+        if not self.api_key:
+            raise RiotApiError(500, "RIOT_API_KEY is not configured")
+        host = urlsplit(url).netloc
+        endpoint = endpoint or urlsplit(url).path
+        headers = {"X-Riot-Token": self.api_key}
+        last_exc: Optional[Exception] = None
+        for attempt in range(self.retries):
+            await self.limiter.acquire(host, endpoint)
+            try:
+                r = await self._get_client().request(method, url, params=params, headers=headers)
+            except (httpx.RequestError, httpx.TimeoutException) as exc:
+                last_exc = exc
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+                continue
+            self.limiter.observe(host, endpoint, r)
+            if r.status_code == 429:
+                # App/method 429s already blocked the matching buckets; service 429s did not
+                limit_type = (r.headers.get("X-Rate-Limit-Type") or "").lower()
+                if limit_type not in ("application", "method"):
+                    await asyncio.sleep(_retry_after(r.headers, self.backoff * (2 ** attempt)))
+                continue
+            if 200 <= r.status_code < 300:
+                return r.json()
+            if 500 <= r.status_code < 600:
+                await asyncio.sleep(self.backoff * (2 ** attempt))
+                continue
+            raise RiotApiError(r.status_code, r.text)
+        if last_exc:
+            raise RiotApiError(502, f"Upstream error: {last_exc}")
+        raise RiotApiError(502, "Upstream request failed after retries")
+
+    async def get_public_json(self, url: str) -> Any:
+        """Unauthenticated GET on the shared pool (DDragon); no Riot token is sent."""
+        r = await self._get_client().get(url)
+        r.raise_for_status()
+        return r.json()
@@ -0,0 +1,80 @@
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable
+
+import pyarrow as pa
+
+ROLES = ["top", "jg", "mid", "adc", "sup"]
+
+# Fixed struct types so part files written at different times share one schema
+TEAM_TYPE = pa.struct([(role, pa.string()) for role in ROLES])
+
+MATCHES_V1_SCHEMA = pa.schema(
+    [
+        ("match_id", pa.string()),
+        ("patch", pa.string()),
+        ("blue_win", pa.bool_()),
+        ("blue_team", TEAM_TYPE),
+        ("red_team", TEAM_TYPE),
+    ]
+)
+
+TEAM_RUNES_TYPE = pa.struct([(role, pa.struct([("keystone", pa.string())])) for role in ROLES])
+TEAM_SUMMONERS_TYPE = pa.struct([(role, pa.list_(pa.string())) for role in ROLES])
+
+# Full MatchRecord shape (src/data/schemas.py), as produced by parse_match_to_record
+MATCH_RECORD_SCHEMA = pa.schema(
+    list(MATCHES_V1_SCHEMA)
+    + [
+        ("blue_runes", TEAM_RUNES_TYPE),
+        ("red_runes", TEAM_RUNES_TYPE),
+        ("blue_summoners", TEAM_SUMMONERS_TYPE),
+        ("red_summoners", TEAM_SUMMONERS_TYPE),
+        ("bans_blue", pa.list_(pa.string())),
+        ("bans_red", pa.list_(pa.string())),
+        ("region", pa.string()),
+        ("queue", pa.int32()),
+    ]
+)
+
+
+
+def records_to_table(
+    records: Iterable[Dict[str, Any]], schema: pa.Schema = MATCHES_V1_SCHEMA
+) -> pa.Table:
+    """Records from parse_match_to_record as an Arrow table; keys outside ``schema`` are dropped."""
+    return pa.Table.from_pylist(list(records), schema=schema)
+
+
+def _conform_array(array: pa.Array, type_: pa.DataType) -> pa.Array:
+    if pa.types.is_struct(type_) and pa.types.is_struct(array.type):
+        # Match struct fields by name: pandas writes dict columns with fields sorted
+        children = dict(zip((f.name for f in array.type), array.flatten()))
+        return pa.StructArray.from_arrays(
+            [
+                (
+                    _conform_array(children[f.name], f.type)
+                    if f.name in children
+                    else pa.nulls(len(array), f.type)
+                )
+                for f in type_
+            ],
+            fields=list(type_),
+            mask=array.is_null(),
+        )
+    return array.cast(type_)
+
+
+def conform_table(table: pa.Table, schema: pa.Schema = MATCHES_V1_SCHEMA) -> pa.Table:
+    """``table`` with ``schema``'s column types; struct fields are matched by name and fields
+    the table lacks are null (a cast matches them by position)."""
+    return pa.Table.from_arrays(
+        [
+            pa.chunked_array(
+                [_conform_array(chunk, f.type) for chunk in table.column(f.name).chunks],
+                type=f.type,
+            )
+            for f in schema
+        ],
+        schema=schema,
+    )
@@ -2,6 +2,7 @@ from __future__ import annotations
 
 from typing import Any, Dict, List, Optional, Tuple
 
+from ..data.ddragon import ChampionIndex
 from ..utils.roles import normalize_role
 
 ROLES = ["top", "jg", "mid", "adc", "sup"]
@@ -25,7 +26,18 @@ def _extract_keystone(participant: Dict[str, Any]) -> Optional[int]:
     return None
 
 
-def parse_match_to_record(match: Dict[str, Any]) -> Dict[str, Any]:
+def _ban_ids(bans: List[Dict[str, Any]], champions: Optional[ChampionIndex]) -> List[str]:
+    ids = [b.get("championId") for b in bans if b.get("championId") is not None]
+    if champions is None:
+        return [str(i) for i in ids]
+    # championId -1 is an empty ban slot; unknown ids are kept as their numeric string
+    return [champions.key_for_id(i) or str(i) for i in ids if int(i) >= 0]
+
+
+def parse_match_to_record(
+    match: Dict[str, Any], champions: Optional[ChampionIndex] = None
+) -> Dict[str, Any]:
+    """Normalize a match-v5 payload; with ``champions`` the bans are champion keys, not ids."""
     info = match.get("info", {})
     teams_info = {t.get("teamId"): t for t in info.get("teams", [])}
     blue_win = bool(teams_info.get(100, {}).get("win", False))
@@ -66,7 +78,7 @@ def parse_match_to_record(match: Dict[str, Any]) -> Dict[str, Any]:
     bans_red: List[str] = []
     for tid, t in teams_info.items():
         bans = t.get("bans", []) or []
-        ids = [str(b.get("championId")) for b in bans if b.get("championId") is not None]
+        ids = _ban_ids(bans, champions)
         if tid == 100:
             bans_blue = ids
         elif tid == 200:
@@ -84,6 +96,9 @@ def parse_match_to_record(match: Dict[str, Any]) -> Dict[str, Any]:
         "red_summoners": red_summ,
         "bans_blue": bans_blue,
         "bans_red": bans_red,
+        # Platform the match was played on (e.g. "na1"), the only region match-v5 reports
+        "region": (info.get("platformId") or "").lower() or None,
+        "queue": info.get("queueId"),
     }
 
 
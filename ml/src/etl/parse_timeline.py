@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+from typing import IO, Any, Dict, Iterable, Optional, Tuple
+
+import ijson
+import pyarrow as pa
+
+from ..utils.roles import normalize_role
+from .match_table import MATCHES_V1_SCHEMA
+
+ROLES = ["top", "jg", "mid", "adc", "sup"]
+SIDES = {100: "blue", 200: "red"}
+MINUTES = (10, 15)
+STATS = ("gold", "xp", "cs")
+# first_{name} -> True when blue got it, False for red, None if nobody did by the last of
+# MINUTES (parsing stops there, so these are lane-phase objectives; baron spawns later)
+OBJECTIVES = ("blood", "tower", "dragon", "herald")
+_MONSTERS = {"DRAGON": "dragon", "RIFTHERALD": "herald"}
+
+
+def timeline_columns() -> Dict[str, str]:
+    """Feature column -> kind ("diff" or "first"), in output order."""
+    columns: Dict[str, str] = {}
+    for minute in MINUTES:
+        for role in ROLES:
+            for stat in STATS:
+                columns[f"{role}_{stat}_diff_{minute}"] = "diff"
+        for stat in STATS:
+            columns[f"{stat}_diff_{minute}"] = "diff"
+    for name in OBJECTIVES:
+        columns[f"first_{name}"] = "first"
+    return columns
+
+
+# Timeline features keyed by match_id; the teams are carried so lane-phase outcomes can be
+# counted like full-game wins (compute_lane_wr_from_matches --outcome)
+TIMELINE_FEATURES_SCHEMA = pa.schema(
+    list(MATCHES_V1_SCHEMA)
+    + [
+        (name, pa.float32() if kind == "diff" else pa.bool_())
+        for name, kind in timeline_columns().items()
+    ]
+)
+
+
+def participant_roles(match: Dict[str, Any]) -> Dict[int, Tuple[str, str]]:
+    """participantId -> (side, role) from the match-v5 payload; the timeline has no roles."""
+    roles: Dict[int, Tuple[str, str]] = {}
+    taken = set()
+    for p in match.get("info", {}).get("participants", []):
+        side = SIDES.get(p.get("teamId"))
+        role = normalize_role(p.get("teamPosition"), p.get("individualPosition"))
+        pid = p.get("participantId")
+        if side is None or role not in ROLES or pid is None or (side, role) in taken:
+            continue
+        taken.add((side, role))
+        roles[int(pid)] = (side, role)
+    return roles
+
+
+def _frame_stats(
+    frame: Dict[str, Any], roles: Dict[int, Tuple[str, str]], minute: int
+) -> Dict[str, float]:
+    totals = {side: {stat: 0.0 for stat in STATS} for side in ("blue", "red")}
+    lanes: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for key, pf in (frame.get("participantFrames") or {}).items():
+        slot = roles.get(int(pf.get("participantId", key)))
+        if slot is None:
+            continue
+        side, role = slot
+        values = {
+            "gold": float(pf.get("totalGold", 0)),
+            "xp": float(pf.get("xp", 0)),
+            "cs": float(pf.get("minionsKilled", 0)) + float(pf.get("jungleMinionsKilled", 0)),
+        }
+        lanes.setdefault(role, {})[side] = values
+        for stat in STATS:
+            totals[side][stat] += values[stat]
+    out: Dict[str, float] = {}
+    for role, sides in lanes.items():
+        if "blue" in sides and "red" in sides:
+            for stat in STATS:
+                out[f"{role}_{stat}_diff_{minute}"] = sides["blue"][stat] - sides["red"][stat]
+    for stat in STATS:
+        out[f"{stat}_diff_{minute}"] = totals["blue"][stat] - totals["red"][stat]
+    return out
+
+
+def _first_objective(
+    event: Dict[str, Any], roles: Dict[int, Tuple[str, str]]
+) -> Optional[Tuple[str, bool]]:
+    kind = event.get("type")
+    if kind == "CHAMPION_KILL":
+        victim = roles.get(int(event.get("victimId") or 0))
+        # Executions have killerId 0; the victim's side still decides who got first blood
+        return ("blood", victim[0] == "red") if victim is not None else None
+    if kind == "BUILDING_KILL" and event.get("buildingType") == "TOWER_BUILDING":
+        # teamId is the side that lost the tower
+        return ("tower", event.get("teamId") == 200) if event.get("teamId") in SIDES else None
+    if kind == "ELITE_MONSTER_KILL":
+        name = _MONSTERS.get(event.get("monsterType"))
+        if name is not None and event.get("killerTeamId") in SIDES:
+            return name, event.get("killerTeamId") == 100
+    return None
+
+
+def parse_timeline_frames(
+    frames: Iterable[Dict[str, Any]], roles: Dict[int, Tuple[str, str]]
+) -> Dict[str, Any]:
+    """Lane/team diffs (blue minus red) at MINUTES and first objectives from timeline frames.
+
+    Diffs come from the first frame at or after each minute; games that end earlier leave
+    them out (NaN in the table). Stops consuming ``frames`` after the frame for the last
+    minute, so a streamed payload is not read to the end and first objectives only count
+    events up to that frame.
+    """
+    out: Dict[str, Any] = {}
+    firsts: Dict[str, bool] = {}
+    pending = list(MINUTES)
+    for frame in frames:
+        for event in frame.get("events") or ():
+            hit = _first_objective(event, roles)
+            if hit is not None and hit[0] not in firsts:
+                firsts[hit[0]] = hit[1]
+        timestamp = float(frame.get("timestamp") or 0)
+        while pending and timestamp >= pending[0] * 60_000:
+            out.update(_frame_stats(frame, roles, pending.pop(0)))
+        if not pending:
+            break
+    for name in OBJECTIVES:
+        out[f"first_{name}"] = firsts.get(name)
+    return out
+
+
+def parse_timeline_stream(stream: IO[bytes], roles: Dict[int, Tuple[str, str]]) -> Dict[str, Any]:
+    """:func:`parse_timeline_frames` over a timeline-v5 JSON byte stream, one frame in memory
+    at a time (``json.load`` would materialize every frame's events at once)."""
+    return parse_timeline_frames(ijson.items(stream, "info.frames.item", use_float=True), roles)
@@ -0,0 +1,187 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from ..data.ddragon import version_key
+
+VALUES_FILE = "attributes.npy"
+META_FILE = "meta.json"
+
+
+class ChampionTable:
+    """Champion attributes as one contiguous float32 matrix plus a champion -> row map.
+
+    Row ``missing`` (the last one) is all zeros and stands in for unknown champions, so a
+    gather never needs a membership check. Saved bundles are a directory holding
+    ``attributes.npy`` and ``meta.json``; :meth:`load` memory-maps the matrix, so every
+    process that loads the same bundle shares the page cache instead of a private copy.
+    """
+
+    def __init__(
+        self,
+        champions: Sequence[str],
+        values: np.ndarray,
+        columns: Sequence[str],
+        version: Optional[str] = None,
+    ) -> None:
+        if values.shape != (len(champions) + 1, len(columns)):
+            raise ValueError(
+                f"values shape {values.shape} does not match "
+                f"{len(champions)} champions + missing row x {len(columns)} columns"
+            )
+        self.champions: List[str] = list(champions)
+        self.values = values
+        self.columns: List[str] = list(columns)
+        self.version = version
+        self.row_of: Dict[str, int] = {}
+        for i, champ in enumerate(self.champions):
+            self.row_of.setdefault(champ, i)
+        self._col: Dict[str, int] = {c: i for i, c in enumerate(self.columns)}
+
+    @classmethod
+    def from_frame(
+        cls,
+        champ_info: pd.DataFrame,
+        columns: Sequence[str],
+        version: Optional[str] = None,
+    ) -> "ChampionTable":
+        """Build from a champ_info frame indexed by champion key; absent columns become 0."""
+        body = champ_info.reindex(columns=list(columns), fill_value=0.0).to_numpy(dtype=np.float32)
+        values = np.vstack([body, np.zeros((1, len(columns)), dtype=np.float32)])
+        return cls(
+            [str(c) for c in champ_info.index], np.ascontiguousarray(values), columns, version
+        )
+
+    # ------------------------------------------------------------------ access
+    @property
+    def index(self) -> List[str]:
+        """Champion keys in row order (mirrors ``champ_info.index``)."""
+        return self.champions
+
+    @property
+    def missing(self) -> int:
+        return len(self.champions)
+
+    def __len__(self) -> int:
+        return len(self.champions)
+
+    def __contains__(self, champ: object) -> bool:
+        return champ in self.row_of
+
+    def column(self, name: str) -> int:
+        return self._col[name]
+
+    def row_ids(self, champs: Iterable[Optional[str]]) -> List[int]:
+        missing = self.missing
+        return [self.row_of.get(c, missing) if c else missing for c in champs]
+
+    def team_sums(self, team: Dict[str, str]) -> np.ndarray:
+        """float64 attribute sums over a team's champions, added in dict order."""
+        sums = np.zeros(len(self.columns), dtype=np.float64)
+        for i in self.row_ids(team.values()):
+            sums += self.values[i]
+        return sums
+
+    def to_frame(self) -> pd.DataFrame:
+        return pd.DataFrame(
+            np.asarray(self.values[:-1]),
+            index=pd.Index(self.champions, name="champion"),
+            columns=self.columns,
+        )
+
+    # --------------------------------------------------------------------- I/O
+    def save(self, path: Path) -> Path:
+        """Write the bundle directory atomically (built next to ``path``, then renamed)."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        np.save(tmp / VALUES_FILE, np.ascontiguousarray(self.values, dtype=np.float32))
+        meta = {"version": self.version, "columns": self.columns, "champions": self.champions}
+        (tmp / META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "ChampionTable":
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+        values = np.load(path / VALUES_FILE, mmap_mode="r" if mmap else None)
+        return cls(meta["champions"], values, meta["columns"], meta.get("version"))
+
+    # --------------------------------------------------------- per-patch bundles
+    def save_versioned(self, root: Path) -> Path:
+        """Save under ``root/<version>/``; requires ``version`` (the patch)."""
+        if not self.version:
+            raise ValueError("ChampionTable.version must be set to save a versioned bundle")
+        return self.save(Path(root) / self.version)
+
+    @classmethod
+    def load_versioned(
+        cls, root: Path, patch: Optional[str] = None, mmap: bool = True
+    ) -> Optional["ChampionTable"]:
+        """Bundle for ``patch``, else the newest one not after it (newest overall if None)."""
+        root = Path(root)
+        if not root.exists():
+            return None
+        versions = sorted(
+            (p.name for p in root.iterdir() if (p / META_FILE).exists() and version_key(p.name)),
+            key=version_key,
+        )
+        if patch is not None and version_key(patch):
+            versions = [v for v in versions if version_key(v) <= version_key(patch)]
+        return cls.load(root / versions[-1], mmap=mmap) if versions else None
+
+
+class ChampionTableSet:
+    """Per-patch ChampionTable bundles under ``root/<patch>/``, resolved like
+    PairMatrixSet: a patch without its own bundle uses the newest one not after it (the
+    newest overall when the patch is unknown). Patches older than every bundle use
+    ``default`` (e.g. built from champ_info), else the oldest bundle."""
+
+    def __init__(
+        self, bundles: Dict[str, ChampionTable], default: Optional[ChampionTable] = None
+    ) -> None:
+        self.bundles = bundles
+        self.default = default
+        self._versions = sorted(bundles, key=lambda v: (version_key(v), v))
+
+    @classmethod
+    def load(
+        cls, root: Path, default: Optional[ChampionTable] = None, mmap: bool = True
+    ) -> "ChampionTableSet":
+        root = Path(root)
+        bundles: Dict[str, ChampionTable] = {}
+        if root.exists():
+            for path in root.iterdir():
+                if (path / META_FILE).exists() and version_key(path.name):
+                    bundles[path.name] = ChampionTable.load(path, mmap=mmap)
+        return cls(bundles, default)
+
+    def __len__(self) -> int:
+        return len(self.bundles)
+
+    def for_patch(self, patch: Optional[str]) -> ChampionTable:
+        if patch in self.bundles:
+            return self.bundles[patch]
+        if self._versions:
+            if not (patch and version_key(patch)):
+                return self.bundles[self._versions[-1]]
+            older = [v for v in self._versions if version_key(v) <= version_key(patch)]
+            if older:
+                return self.bundles[older[-1]]
+        if self.default is not None:
+            return self.default
+        if not self._versions:
+            raise ValueError("No champion table bundle or default table")
+        return self.bundles[self._versions[0]]
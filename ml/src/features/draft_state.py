@@ -0,0 +1,105 @@
+from __future__ import annotations
+
+from typing import Dict, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from .champion_table import ChampionTable
+from .featurize import side_features_from_sums
+from .matchup_features import ROLES, LaneWinrateIndex
+from .pair_features import PairMatrices
+
+SIDES = ("blue", "red")
+
+
+class DraftState:
+    """Running per-side attribute sums for a draft that changes one pick at a time.
+
+    ``pick`` adds a single attribute row, so refreshing the side features after each
+    champion-select action is O(attributes) instead of re-summing both teams; lane features
+    are five dict probes and pair features one gather. ``unpick`` re-sums the side's remaining
+    picks (at most four rows) rather than subtracting, so no float residue survives and an
+    emptied side is exactly zero. Features match aggregate_side_features +
+    compute_lane_matchup_features + PairMatrices.features for the same teams.
+    """
+
+    def __init__(
+        self,
+        table: ChampionTable,
+        patch: str,
+        lane_index: Optional[LaneWinrateIndex] = None,
+        pair_matrices: Optional[PairMatrices] = None,
+    ) -> None:
+        self.table = table
+        self.patch = patch
+        self.lane_index = lane_index
+        self.pair_matrices = pair_matrices
+        self.teams: Dict[str, Dict[str, str]] = {side: {} for side in SIDES}
+        self.bans: Set[str] = set()
+        self._sums = {side: np.zeros(len(table.columns), dtype=np.float64) for side in SIDES}
+
+    @staticmethod
+    def _check(side: str, role: str) -> None:
+        if side not in SIDES:
+            raise ValueError(f"Unknown side {side!r}; expected one of {list(SIDES)}")
+        if role not in ROLES:
+            raise ValueError(f"Unknown role {role!r}; expected one of {ROLES}")
+
+    def _row(self, champion: str) -> np.ndarray:
+        return self.table.values[self.table.row_of.get(champion, self.table.missing)]
+
+    def pick(self, side: str, role: str, champion: str) -> None:
+        """Set ``side``'s ``role`` to ``champion``, replacing any previous pick there."""
+        self._check(side, role)
+        picked = {c for team in self.teams.values() for r, c in team.items()}
+        if champion in picked and self.teams[side].get(role) != champion:
+            raise ValueError(f"{champion} is already picked")
+        if champion in self.bans:
+            raise ValueError(f"{champion} is banned")
+        self.unpick(side, role)
+        self.teams[side][role] = champion
+        self._sums[side] += self._row(champion)
+
+    def unpick(self, side: str, role: str) -> Optional[str]:
+        self._check(side, role)
+        champion = self.teams[side].pop(role, None)
+        if champion is not None:
+            # Subtracting would leave ~1e-17 residue, which share/ratio features amplify
+            self._sums[side] = self.table.team_sums(self.teams[side])
+        return champion
+
+    def ban(self, champion: str) -> None:
+        if any(champion in team.values() for team in self.teams.values()):
+            raise ValueError(f"{champion} is already picked")
+        self.bans.add(champion)
+
+    def unban(self, champion: str) -> None:
+        self.bans.discard(champion)
+
+    def recompute(self) -> None:
+        for side in SIDES:
+            self._sums[side] = self.table.team_sums(self.teams[side])
+
+    def features(self) -> Dict[str, float]:
+        side = side_features_from_sums(self._sums["blue"][None, :], self._sums["red"][None, :])
+        features = {k: float(v[0]) for k, v in side.items()}
+        if self.lane_index is not None:
+            features.update(
+                self.lane_index.features(self.teams["blue"], self.teams["red"], self.patch)
+            )
+        if self.pair_matrices is not None:
+            features.update(self.pair_matrices.features(self.teams["blue"], self.teams["red"]))
+        return features
+
+    def feature_frame(self) -> pd.DataFrame:
+        """The current draft as a single model row."""
+        return pd.DataFrame([self.features()])
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "patch": self.patch,
+            "blue_team": dict(self.teams["blue"]),
+            "red_team": dict(self.teams["red"]),
+            "bans": sorted(self.bans),
+        }
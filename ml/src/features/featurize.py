@@ -1,66 +1,97 @@
 from __future__ import annotations
 
-from typing import Dict, List, Tuple
+from typing import Dict, List, Optional, Sequence, Tuple, Union
 import math
 
+import numpy as np
 import pandas as pd
 
+from .champion_table import ChampionTable
 
-ROLES = ["top", "jg", "mid", "adc", "sup"]
 
+ROLES = ["top", "jg", "mid", "adc", "sup"]
 
-def compute_damage_profile(team: Dict[str, str], champ_info: pd.DataFrame) -> Tuple[float, float, float]:
-    ad = ap = true = 0.0
-    for role, champ in team.items():
+# Every champ_info column read by the compute_* functions below
+ATTRIBUTE_COLUMNS = [
+    "ad_weight",
+    "ap_weight",
+    "true_weight",
+    "hard_cc",
+    "soft_cc",
+    "engage",
+    "poke",
+    "siege",
+    "dive",
+    "split",
+    "early",
+    "mid",
+    "late",
+]
+ARCHETYPE_KEYS = ["engage", "poke", "siege", "dive", "split"]
+
+# Every function below takes either the champ_info frame or a prebuilt ChampionTable
+ChampionSource = Union[pd.DataFrame, ChampionTable]
+
+
+def as_champion_table(champ_info: ChampionSource, version: Optional[str] = None) -> ChampionTable:
+    if isinstance(champ_info, ChampionTable):
+        return champ_info
+    return ChampionTable.from_frame(champ_info, ATTRIBUTE_COLUMNS, version=version)
+
+
+def _team_totals(
+    team: Dict[str, str], champ_info: ChampionSource, keys: Sequence[str]
+) -> List[float]:
+    """Sum of each attribute in ``keys`` over the team; unknown champions are skipped."""
+    if isinstance(champ_info, ChampionTable):
+        sums = champ_info.team_sums(team)
+        return [float(sums[champ_info.column(k)]) for k in keys]
+    totals = [0.0] * len(keys)
+    for champ in team.values():
         row = champ_info.loc[champ] if champ in champ_info.index else None
         if row is None:
             continue
-        ad += float(row.get("ad_weight", 0.0))
-        ap += float(row.get("ap_weight", 0.0))
-        true += float(row.get("true_weight", 0.0))
+        for i, k in enumerate(keys):
+            totals[i] += float(row.get(k, 0.0))
+    return totals
+
+
+def compute_damage_profile(
+    team: Dict[str, str], champ_info: ChampionSource
+) -> Tuple[float, float, float]:
+    ad, ap, true = _team_totals(team, champ_info, ["ad_weight", "ap_weight", "true_weight"])
     total = ad + ap + true
     if total == 0:
         return 0.0, 0.0, 0.0
     return ad / total, ap / total, true / total
 
 
-def compute_cc_metrics(team: Dict[str, str], champ_info: pd.DataFrame) -> Dict[str, float]:
-    hard_cc = soft_cc = engage_tools = 0.0
-    for champ in team.values():
-        row = champ_info.loc[champ] if champ in champ_info.index else None
-        if row is None:
-            continue
-        hard_cc += float(row.get("hard_cc", 0.0))
-        soft_cc += float(row.get("soft_cc", 0.0))
-        engage_tools += float(row.get("engage", 0.0))
+def compute_cc_metrics(team: Dict[str, str], champ_info: ChampionSource) -> Dict[str, float]:
+    hard_cc, soft_cc, engage_tools = _team_totals(
+        team, champ_info, ["hard_cc", "soft_cc", "engage"]
+    )
     return {"hard_cc": hard_cc, "soft_cc": soft_cc, "engage_tools": engage_tools}
 
 
-def compute_comp_archetypes(team: Dict[str, str], champ_info: pd.DataFrame) -> Dict[str, float]:
+def compute_comp_archetypes(team: Dict[str, str], champ_info: ChampionSource) -> Dict[str, float]:
     keys = ["engage", "poke", "siege", "dive", "split"]
-    scores = {k: 0.0 for k in keys}
-    for champ in team.values():
-        row = champ_info.loc[champ] if champ in champ_info.index else None
-        if row is None:
-            continue
-        for k in keys:
-            scores[k] += float(row.get(k, 0.0))
-    return scores
+    return dict(zip(keys, _team_totals(team, champ_info, keys)))
 
 
-def compute_scaling(team: Dict[str, str], champ_info: pd.DataFrame) -> Dict[str, float]:
-    early = mid = late = 0.0
-    for champ in team.values():
-        row = champ_info.loc[champ] if champ in champ_info.index else None
-        if row is None:
-            continue
-        early += float(row.get("early", 0.0))
-        mid += float(row.get("mid", 0.0))
-        late += float(row.get("late", 0.0))
+def compute_scaling(team: Dict[str, str], champ_info: ChampionSource) -> Dict[str, float]:
+    early, mid, late = _team_totals(team, champ_info, ["early", "mid", "late"])
     return {"early": early, "mid": mid, "late": late}
 
 
-def aggregate_side_features(blue_team: Dict[str, str], red_team: Dict[str, str], champ_info: pd.DataFrame) -> Dict[str, float]:
+def aggregate_side_features(
+    blue_team: Dict[str, str], red_team: Dict[str, str], champ_info: ChampionSource
+) -> Dict[str, float]:
+    if isinstance(champ_info, ChampionTable):
+        # One gather per side instead of one per feature group
+        blue = champ_info.team_sums(blue_team)[None, :]
+        red = champ_info.team_sums(red_team)[None, :]
+        return {k: float(v[0]) for k, v in side_features_from_sums(blue, red).items()}
+
     # Damage profile
     b_ad, b_ap, b_true = compute_damage_profile(blue_team, champ_info)
     r_ad, r_ap, r_true = compute_damage_profile(red_team, champ_info)
@@ -92,3 +123,105 @@ def aggregate_side_features(blue_team: Dict[str, str], red_team: Dict[str, str],
     return features
 
 
+# ---------------------------------------------------------------------------
+# Batch (columnar) featurization
+# ---------------------------------------------------------------------------
+
+
+def champion_attribute_matrix(champ_info: ChampionSource) -> Tuple[Dict[str, int], np.ndarray]:
+    """Dense [n_champions + 1, len(ATTRIBUTE_COLUMNS)] array plus champion -> row map.
+
+    The trailing row is all zeros and stands in for unknown/missing champions, which the
+    per-row functions skip (adding 0.0 leaves the running sums bit-for-bit unchanged).
+    A ChampionTable is returned as-is (float32, possibly memory-mapped); a frame is copied
+    to float64.
+    """
+    if isinstance(champ_info, ChampionTable):
+        return champ_info.row_of, champ_info.values
+    index: Dict[str, int] = {}
+    for i, champ in enumerate(champ_info.index):
+        index.setdefault(champ, i)
+    attrs = champ_info.reindex(columns=ATTRIBUTE_COLUMNS, fill_value=0.0).to_numpy(dtype=np.float64)
+    attrs = np.vstack([attrs, np.zeros((1, len(ATTRIBUTE_COLUMNS)), dtype=np.float64)])
+    return index, attrs
+
+
+def team_id_matrix(
+    teams: Sequence[Dict[str, str]], index: Dict[str, int], missing: int
+) -> np.ndarray:
+    """Explode role dicts into an [N, width] matrix of champion row ids.
+
+    Slots follow each dict's iteration order (not role order) so the batch sums accumulate
+    in exactly the same order as the per-row functions; absent slots point at ``missing``.
+    """
+    width = max((len(team) for team in teams), default=0)
+    ids = np.full((len(teams), width), missing, dtype=np.int64)
+    for i, team in enumerate(teams):
+        for j, champ in enumerate(team.values()):
+            ids[i, j] = index.get(champ, missing)
+    return ids
+
+
+def _side_sums(ids: np.ndarray, attrs: np.ndarray) -> np.ndarray:
+    sums = np.zeros((ids.shape[0], attrs.shape[1]), dtype=np.float64)
+    for j in range(ids.shape[1]):
+        sums += attrs[ids[:, j]]
+    return sums
+
+
+def _damage_shares(sums: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    ad = sums[:, ATTRIBUTE_COLUMNS.index("ad_weight")]
+    ap = sums[:, ATTRIBUTE_COLUMNS.index("ap_weight")]
+    true = sums[:, ATTRIBUTE_COLUMNS.index("true_weight")]
+    total = ad + ap + true
+    zero = total == 0
+    safe = np.where(zero, 1.0, total)
+    with np.errstate(invalid="ignore"):
+        return (
+            np.where(zero, 0.0, ad / safe),
+            np.where(zero, 0.0, ap / safe),
+            np.where(zero, 0.0, true / safe),
+        )
+
+
+def aggregate_side_features_batch(
+    blue_teams: Sequence[Dict[str, str]],
+    red_teams: Sequence[Dict[str, str]],
+    champ_info: ChampionSource,
+) -> pd.DataFrame:
+    """Vectorized aggregate_side_features over many matches.
+
+    Returns one row per match with the same columns, in the same order, and the same values as
+    calling aggregate_side_features on each (blue, red) pair.
+    """
+    index, attrs = champion_attribute_matrix(champ_info)
+    missing = attrs.shape[0] - 1
+    blue = _side_sums(team_id_matrix(blue_teams, index, missing), attrs)
+    red = _side_sums(team_id_matrix(red_teams, index, missing), attrs)
+    return pd.DataFrame(side_features_from_sums(blue, red))
+
+
+def side_features_from_sums(blue: np.ndarray, red: np.ndarray) -> Dict[str, np.ndarray]:
+    """Blue-minus-red side features from per-side [N, len(ATTRIBUTE_COLUMNS)] attribute sums.
+
+    Either side may be a single [1, A] row, which broadcasts against the other.
+    """
+    col = ATTRIBUTE_COLUMNS.index
+    b_ad, b_ap, b_true = _damage_shares(blue)
+    r_ad, r_ap, r_true = _damage_shares(red)
+    diff = blue - red
+
+    features: Dict[str, np.ndarray] = {
+        "ad_share_diff": b_ad - r_ad,
+        "ap_share_diff": b_ap - r_ap,
+        "true_share_diff": b_true - r_true,
+        "hard_cc_diff": diff[:, col("hard_cc")],
+        "soft_cc_diff": diff[:, col("soft_cc")],
+        "engage_tools_diff": diff[:, col("engage")],
+        "early_diff": diff[:, col("early")],
+        "mid_diff": diff[:, col("mid")],
+        "late_diff": diff[:, col("late")],
+    }
+    for key in ARCHETYPE_KEYS:
+        features[f"{key}_diff"] = diff[:, col(key)]
+    return features
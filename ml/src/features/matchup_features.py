@@ -1,23 +1,222 @@
 from __future__ import annotations
 
-from typing import Dict, Tuple
+from pathlib import Path
+from typing import Dict, Tuple, Union
 
+import numpy as np
 import pandas as pd
 
 ROLES = ["top", "jg", "mid", "adc", "sup"]
+KEY_COLUMNS = ["patch", "role", "blue", "red"]
 
 
 def lane_pair_key(ch_blue: str, ch_red: str, patch: str, role: str) -> Tuple[str, str, str, str]:
     return (patch, role, ch_blue, ch_red)
 
 
+# Pseudo-games of prior used when shrinking win rates (lane pairs and champion-role rates)
+DEFAULT_PRIOR_STRENGTH = 10.0
+PRIOR_CLIP = (0.05, 0.95)
+
+
+def champion_role_winrates(
+    counts: pd.DataFrame, prior_strength: float = DEFAULT_PRIOR_STRENGTH
+) -> pd.DataFrame:
+    """Per (patch, role, champion) win rate over both sides, shrunk toward 0.5.
+
+    ``counts`` has [patch, role, blue, red] plus ``n``/``wins`` (blue wins) columns; pass
+    effective counts to include patch backoff.
+    """
+    n = counts["n"].to_numpy(dtype=np.float64)
+    wins = counts["wins"].to_numpy(dtype=np.float64)
+    sides = pd.DataFrame(
+        {
+            "patch": np.concatenate([counts["patch"].to_numpy(), counts["patch"].to_numpy()]),
+            "role": np.concatenate([counts["role"].to_numpy(), counts["role"].to_numpy()]),
+            "champion": np.concatenate([counts["blue"].to_numpy(), counts["red"].to_numpy()]),
+            "games": np.concatenate([n, n]),
+            "wins": np.concatenate([wins, n - wins]),
+        }
+    )
+    out = sides.groupby(["patch", "role", "champion"], sort=False)[["games", "wins"]].sum()
+    out["wr"] = (out["wins"] + prior_strength * 0.5) / (out["games"] + prior_strength)
+    return out.reset_index()
+
+
+def matchup_prior(wr_blue_champ: np.ndarray, wr_red_champ: np.ndarray) -> np.ndarray:
+    """Prior blue win rate for a lane from each champion's role-level win rate."""
+    return np.clip(0.5 + np.asarray(wr_blue_champ) - np.asarray(wr_red_champ), *PRIOR_CLIP)
+
+
+class LaneWinrateIndex:
+    """Hash index over a lane_wr table keyed by lane_pair_key.
+
+    Scalar lookups are a single dict probe; ``join`` resolves every lane of a matches frame
+    with one merge. Duplicate keys keep the first row, like the boolean-mask lookup did.
+    When the table carries ``n``/``wins`` counts, each lane also gets a ``lane_{role}_n``
+    confidence feature, and a pair missing from the table falls back to the prior built
+    from both champions' role win rates on that patch instead of ``default``. Those rates
+    are read from the ``wr_champ_blue``/``wr_champ_red`` columns finalize_lane_wr writes;
+    older tables without them recompute the rates from ``n``/``wins``.
+    """
+
+    def __init__(self, lane_wr: pd.DataFrame, default: float = 0.5) -> None:
+        self.default = default
+        self.has_counts = {"n", "wins"}.issubset(lane_wr.columns)
+        has_champ_wr = {"wr_champ_blue", "wr_champ_red"}.issubset(lane_wr.columns)
+        columns = [
+            *KEY_COLUMNS,
+            "wr_blue",
+            *(["n", "wins"] if self.has_counts else []),
+            *(["wr_champ_blue", "wr_champ_red"] if has_champ_wr else []),
+        ]
+        if lane_wr.empty:
+            self.table = pd.DataFrame(columns=columns)
+        else:
+            self.table = (
+                lane_wr.drop_duplicates(subset=KEY_COLUMNS, keep="first")[columns]
+                .reset_index(drop=True)
+            )
+        self._wr: Dict[Tuple[str, str, str, str], float] = {
+            lane_pair_key(blue, red, patch, role): float(wr)
+            for patch, role, blue, red, wr in self.table[[*KEY_COLUMNS, "wr_blue"]].itertuples(
+                index=False, name=None
+            )
+        }
+        self._n: Dict[Tuple[str, str, str, str], float] = {}
+        self._champ_wr: Dict[Tuple[str, str, str], float] = {}
+        if self.has_counts and not self.table.empty:
+            self._n = dict(zip(self._wr.keys(), self.table["n"].astype(float)))
+        if has_champ_wr and not self.table.empty:
+            for side in ("blue", "red"):
+                rates = self.table[["patch", "role", side, f"wr_champ_{side}"]].dropna()
+                for patch, role, champ, wr in rates.itertuples(index=False, name=None):
+                    self._champ_wr.setdefault((patch, role, champ), float(wr))
+        elif self.has_counts and not self.table.empty:
+            champs = champion_role_winrates(self.table)[["patch", "role", "champion", "wr"]]
+            self._champ_wr = {
+                (patch, role, champ): float(wr)
+                for patch, role, champ, wr in champs.itertuples(index=False, name=None)
+            }
+
+    @classmethod
+    def from_parquet(cls, path: Path, default: float = 0.5) -> "LaneWinrateIndex":
+        return cls(pd.read_parquet(path), default=default)
+
+    def __len__(self) -> int:
+        return len(self._wr)
+
+    @property
+    def feature_suffixes(self) -> Tuple[str, ...]:
+        return ("blue_wr", "counter_adv", "n") if self.has_counts else ("blue_wr", "counter_adv")
+
+    def _fallback(self, patch: str, role: str, blue: str, red: str) -> float:
+        wr_b = self._champ_wr.get((patch, role, blue))
+        wr_r = self._champ_wr.get((patch, role, red))
+        if wr_b is None or wr_r is None:
+            return self.default
+        return float(matchup_prior(wr_b, wr_r))
+
+    def lookup(self, patch: str, role: str, blue: str, red: str) -> float:
+        wr = self._wr.get(lane_pair_key(blue, red, patch, role))
+        return wr if wr is not None else self._fallback(patch, role, blue, red)
+
+    def lookup_n(self, patch: str, role: str, blue: str, red: str) -> float:
+        """Observed games behind ``lookup`` (0 when the pair was not in the table)."""
+        return self._n.get(lane_pair_key(blue, red, patch, role), 0.0)
+
+    def features(
+        self, blue_team: Dict[str, str], red_team: Dict[str, str], patch: str
+    ) -> Dict[str, float]:
+        features: Dict[str, float] = {}
+        for role in ROLES:
+            b = blue_team.get(role)
+            r = red_team.get(role)
+            if not b or not r:
+                continue
+            wr = self.lookup(patch, role, b, r)
+            features[f"lane_{role}_blue_wr"] = wr
+            features[f"lane_{role}_counter_adv"] = wr - 0.5
+            if self.has_counts:
+                features[f"lane_{role}_n"] = self.lookup_n(patch, role, b, r)
+        return features
+
+    def join(self, matches: pd.DataFrame) -> pd.DataFrame:
+        """Lane features for every row of a [patch, blue_team, red_team] frame.
+
+        Columns match compute_lane_matchup_features; lanes with a missing champion are NaN.
+        """
+        n = len(matches)
+        patches = matches["patch"].tolist()
+        blue_teams = matches["blue_team"].tolist()
+        red_teams = matches["red_team"].tolist()
+
+        lanes = []
+        for role in ROLES:
+            blue = [t.get(role) if isinstance(t, dict) else None for t in blue_teams]
+            red = [t.get(role) if isinstance(t, dict) else None for t in red_teams]
+            valid = [bool(b) and bool(r) for b, r in zip(blue, red)]
+            rows = np.flatnonzero(valid)
+            lanes.append(
+                pd.DataFrame(
+                    {
+                        "row": rows,
+                        "patch": [patches[i] for i in rows],
+                        "role": role,
+                        "blue": [blue[i] for i in rows],
+                        "red": [red[i] for i in rows],
+                    }
+                )
+            )
+        long = pd.concat(lanes, ignore_index=True)
+        merged = long.merge(self.table, on=KEY_COLUMNS, how="left", indicator=True)
+        found = merged["_merge"].to_numpy() == "both"
+        wr = merged["wr_blue"].to_numpy(dtype=np.float64, na_value=np.nan)
+        # Unmatched pairs are rare; resolve them through the same fallback as lookup()
+        missing = np.flatnonzero(~found)
+        wr[missing] = [
+            self._fallback(p, role, b, r)
+            for p, role, b, r in merged.loc[missing, KEY_COLUMNS].itertuples(index=False, name=None)
+        ]
+        counts = None
+        if self.has_counts:
+            counts = np.where(found, merged["n"].to_numpy(dtype=np.float64, na_value=0.0), 0.0)
+
+        out: Dict[str, np.ndarray] = {}
+        roles = merged["role"].to_numpy()
+        rows = merged["row"].to_numpy()
+        for role in ROLES:
+            mask = roles == role
+            if not mask.any():
+                continue
+            col = np.full(n, np.nan)
+            col[rows[mask]] = wr[mask]
+            out[f"lane_{role}_blue_wr"] = col
+            out[f"lane_{role}_counter_adv"] = col - 0.5
+            if counts is not None:
+                n_col = np.full(n, np.nan)
+                n_col[rows[mask]] = counts[mask]
+                out[f"lane_{role}_n"] = n_col
+        return pd.DataFrame(out, index=matches.index)
+
+
 def compute_lane_matchup_features(
-    blue_team: Dict[str, str], red_team: Dict[str, str], patch: str, lane_wr: pd.DataFrame
+    blue_team: Dict[str, str],
+    red_team: Dict[str, str],
+    patch: str,
+    lane_wr: Union[pd.DataFrame, LaneWinrateIndex],
 ) -> Dict[str, float]:
     """
-    lane_wr columns expected: [patch, role, blue, red, wr_blue]
-    wr_blue = empirical win rate for blue champ vs red champ within role+patch.
+    lane_wr columns expected: [patch, role, blue, red, wr_blue] (+ optional n)
+    wr_blue = (smoothed) win rate for blue champ vs red champ within role+patch.
+    Pass a prebuilt LaneWinrateIndex for O(1) lookups and the champion-prior fallback for
+    unseen pairs; a raw DataFrame is scanned per lane and falls back to 0.5.
     """
+    if isinstance(lane_wr, LaneWinrateIndex):
+        return lane_wr.features(blue_team, red_team, patch)
+
+    has_counts = {"n", "wins"}.issubset(lane_wr.columns)
+
     features: Dict[str, float] = {}
     for role in ROLES:
         b = blue_team.get(role)
@@ -31,6 +230,12 @@ def compute_lane_matchup_features(
             wr = float(row.iloc[0]["wr_blue"])  # between 0 and 1
         features[f"lane_{role}_blue_wr"] = wr
         features[f"lane_{role}_counter_adv"] = wr - 0.5
+        if has_counts:
+            features[f"lane_{role}_n"] = 0.0 if row.empty else float(row.iloc[0]["n"])
     return features
 
 
+def as_lane_index(lane_wr: Union[pd.DataFrame, LaneWinrateIndex, None]) -> LaneWinrateIndex:
+    if isinstance(lane_wr, LaneWinrateIndex):
+        return lane_wr
+    return LaneWinrateIndex(lane_wr if lane_wr is not None else pd.DataFrame())
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from itertools import combinations, product
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..data.ddragon import version_key
+from .matchup_features import DEFAULT_PRIOR_STRENGTH, ROLES, matchup_prior
+
+SYNERGY_FILE = "synergy.npy"
+COUNTER_FILE = "counter.npy"
+META_FILE = "meta.json"
+
+# Same-side role pairs (10) and (my role, enemy role) pairs (25), in tensor order
+ALLY_PAIRS: List[Tuple[int, int]] = list(combinations(range(len(ROLES)), 2))
+ENEMY_PAIRS: List[Tuple[int, int]] = list(product(range(len(ROLES)), repeat=2))
+_ALLY_I = np.array([i for i, _ in ALLY_PAIRS])
+_ALLY_J = np.array([j for _, j in ALLY_PAIRS])
+_ENEMY_I = np.array([i for i, _ in ENEMY_PAIRS])
+_ENEMY_J = np.array([j for _, j in ENEMY_PAIRS])
+
+SYNERGY_COLUMNS = [f"syn_{ROLES[i]}_{ROLES[j]}_diff" for i, j in ALLY_PAIRS]
+COUNTER_COLUMNS = [f"ctr_{ROLES[i]}_{ROLES[j]}" for i, j in ENEMY_PAIRS]
+PAIR_COLUMNS = [*SYNERGY_COLUMNS, "synergy_diff", *COUNTER_COLUMNS, "counter_total"]
+
+
+def role_id_matrix(
+    teams: Sequence[Dict[str, str]], row_of: Dict[str, int], missing: int
+) -> np.ndarray:
+    """[N, 5] champion row ids in ROLES order; empty or unknown slots point at ``missing``."""
+    ids = np.full((len(teams), len(ROLES)), missing, dtype=np.int64)
+    for n, team in enumerate(teams):
+        for r, role in enumerate(ROLES):
+            champ = team.get(role) if isinstance(team, dict) else None
+            if champ:
+                ids[n, r] = row_of.get(champ, missing)
+    return ids
+
+
+class PairMatrices:
+    """One patch's pairwise win deltas as dense float32 tensors.
+
+    ``synergy[k, a, b]`` is the smoothed win rate of teams with champion ``a`` in role
+    ``ALLY_PAIRS[k][0]`` and ``b`` in ``ALLY_PAIRS[k][1]``, minus the prior expected from each
+    champion's own role win rate. ``counter[k, a, b]`` is the same for ``a`` in role
+    ``ENEMY_PAIRS[k][0]`` facing ``b`` in the enemy's ``ENEMY_PAIRS[k][1]`` (counted from both
+    sides, so it carries no side bias). The last row/column (``missing``) is zero, like
+    ChampionTable's missing row, so a draft's 10 ally and 25 enemy pairs are each gathered
+    with one fancy index and no membership checks. Bundles are memory-mapped on load.
+    """
+
+    def __init__(
+        self,
+        champions: Sequence[str],
+        synergy: np.ndarray,
+        counter: np.ndarray,
+        version: Optional[str] = None,
+        meta: Optional[Dict] = None,
+    ) -> None:
+        size = len(champions) + 1
+        expected = ((len(ALLY_PAIRS), size, size), (len(ENEMY_PAIRS), size, size))
+        if (synergy.shape, counter.shape) != expected:
+            raise ValueError(
+                f"synergy {synergy.shape} / counter {counter.shape} do not match "
+                f"{len(champions)} champions + missing row"
+            )
+        self.champions: List[str] = list(champions)
+        self.synergy = synergy
+        self.counter = counter
+        self.version = version
+        self.meta = dict(meta or {})
+        self.row_of: Dict[str, int] = {}
+        for i, champ in enumerate(self.champions):
+            self.row_of.setdefault(champ, i)
+
+    @property
+    def missing(self) -> int:
+        return len(self.champions)
+
+    def __len__(self) -> int:
+        return len(self.champions)
+
+    # ------------------------------------------------------------- features
+    def gather(self, blue_ids: np.ndarray, red_ids: np.ndarray) -> Dict[str, np.ndarray]:
+        """Pair features (blue perspective) from [N, 5] role-ordered id matrices."""
+        k_ally = np.arange(len(ALLY_PAIRS))
+        blue_syn = self.synergy[k_ally, blue_ids[:, _ALLY_I], blue_ids[:, _ALLY_J]]
+        red_syn = self.synergy[k_ally, red_ids[:, _ALLY_I], red_ids[:, _ALLY_J]]
+        ctr = self.counter[np.arange(len(ENEMY_PAIRS)), blue_ids[:, _ENEMY_I], red_ids[:, _ENEMY_J]]
+        syn = blue_syn.astype(np.float64) - red_syn
+        ctr = ctr.astype(np.float64)
+        out: Dict[str, np.ndarray] = {name: syn[:, k] for k, name in enumerate(SYNERGY_COLUMNS)}
+        out["synergy_diff"] = syn.sum(axis=1)
+        out.update({name: ctr[:, k] for k, name in enumerate(COUNTER_COLUMNS)})
+        out["counter_total"] = ctr.sum(axis=1)
+        return {name: out[name] for name in PAIR_COLUMNS}
+
+    def features_batch(
+        self, blue_teams: Sequence[Dict[str, str]], red_teams: Sequence[Dict[str, str]]
+    ) -> Dict[str, np.ndarray]:
+        return self.gather(
+            role_id_matrix(blue_teams, self.row_of, self.missing),
+            role_id_matrix(red_teams, self.row_of, self.missing),
+        )
+
+    def features(self, blue_team: Dict[str, str], red_team: Dict[str, str]) -> Dict[str, float]:
+        return {k: float(v[0]) for k, v in self.features_batch([blue_team], [red_team]).items()}
+
+    # ------------------------------------------------------------------ I/O
+    def save(self, path: Path) -> Path:
+        """Write the bundle directory atomically (built next to ``path``, then renamed)."""
+        path = Path(path)
+        tmp = path.with_name(path.name + ".tmp")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        np.save(tmp / SYNERGY_FILE, np.ascontiguousarray(self.synergy, dtype=np.float32))
+        np.save(tmp / COUNTER_FILE, np.ascontiguousarray(self.counter, dtype=np.float32))
+        meta = {
+            **self.meta,
+            "version": self.version,
+            "roles": ROLES,
+            "champions": self.champions,
+        }
+        (tmp / META_FILE).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        if path.exists():
+            shutil.rmtree(path)
+        os.replace(tmp, path)
+        return path
+
+    @classmethod
+    def load(cls, path: Path, mmap: bool = True) -> "PairMatrices":
+        path = Path(path)
+        meta = json.loads((path / META_FILE).read_text(encoding="utf-8"))
+        mode = "r" if mmap else None
+        return cls(
+            meta.pop("champions"),
+            np.load(path / SYNERGY_FILE, mmap_mode=mode),
+            np.load(path / COUNTER_FILE, mmap_mode=mode),
+            version=meta.pop("version", None),
+            meta=meta,
+        )
+
+
+class PairMatrixSet:
+    """Per-patch PairMatrices bundles under ``root/<patch>/``; a patch without its own
+    bundle uses the newest one not after it (the newest overall when the patch is unknown)."""
+
+    def __init__(self, bundles: Dict[str, PairMatrices]) -> None:
+        self.bundles = bundles
+        self._versions = sorted(bundles, key=lambda v: (version_key(v), v))
+
+    @classmethod
+    def load(cls, root: Path, mmap: bool = True) -> "PairMatrixSet":
+        root = Path(root)
+        bundles: Dict[str, PairMatrices] = {}
+        if root.exists():
+            for path in root.iterdir():
+                if (path / META_FILE).exists() and version_key(path.name):
+                    bundles[path.name] = PairMatrices.load(path, mmap=mmap)
+        return cls(bundles)
+
+    def __len__(self) -> int:
+        return len(self.bundles)
+
+    def for_patch(self, patch: Optional[str]) -> Optional[PairMatrices]:
+        if not self._versions:
+            return None
+        if patch in self.bundles:
+            return self.bundles[patch]
+        if patch and version_key(patch):
+            older = [v for v in self._versions if version_key(v) <= version_key(patch)]
+            return self.bundles[older[-1]] if older else None
+        return self.bundles[self._versions[-1]]
+
+    def features(
+        self, blue_team: Dict[str, str], red_team: Dict[str, str], patch: Optional[str]
+    ) -> Dict[str, float]:
+        """Pair features for one draft, or {} when no bundle covers ``patch``."""
+        matrices = self.for_patch(patch)
+        return matrices.features(blue_team, red_team) if matrices is not None else {}
+
+    def features_batch(
+        self,
+        blue_teams: Sequence[Dict[str, str]],
+        red_teams: Sequence[Dict[str, str]],
+        patches: Sequence[str],
+    ) -> Dict[str, np.ndarray]:
+        """Pair features for many drafts, one gather per distinct patch; NaN where no bundle
+        covers a row's patch."""
+        out = {name: np.full(len(patches), np.nan) for name in PAIR_COLUMNS}
+        groups: Dict[str, List[int]] = {}
+        for i, patch in enumerate(patches):
+            groups.setdefault(patch, []).append(i)
+        for patch, rows in groups.items():
+            matrices = self.for_patch(patch)
+            if matrices is None:
+                continue
+            feats = matrices.features_batch(
+                [blue_teams[i] for i in rows], [red_teams[i] for i in rows]
+            )
+            for name, values in feats.items():
+                out[name][rows] = values
+        return out
+
+
+# ---------------------------------------------------------------------------
+# Aggregation (counts -> smoothed deltas)
+# ---------------------------------------------------------------------------
+
+
+class PairCounts:
+    """Running (games, wins) tensors for one patch over a fixed champion vocabulary.
+
+    ``add`` takes role-ordered id matrices for a batch of matches; each side's ally pairs
+    count toward that side's result, and enemy pairs are counted from both perspectives.
+    Counts are accumulated with one ``np.bincount`` per tensor per batch.
+    """
+
+    def __init__(self, champions: Sequence[str]) -> None:
+        self.champions = list(champions)
+        self.row_of = {c: i for i, c in enumerate(self.champions)}
+        size = len(self.champions) + 1
+        self.size = size
+        self.ally_n = np.zeros((len(ALLY_PAIRS), size, size), dtype=np.int64)
+        self.ally_wins = np.zeros_like(self.ally_n)
+        self.enemy_n = np.zeros((len(ENEMY_PAIRS), size, size), dtype=np.int64)
+        self.enemy_wins = np.zeros_like(self.enemy_n)
+        self.role_n = np.zeros((len(ROLES), size), dtype=np.int64)
+        self.role_wins = np.zeros_like(self.role_n)
+        self.matches = 0
+
+    def _bincount(
+        self, target: np.ndarray, flat: np.ndarray, weights: Optional[np.ndarray]
+    ) -> None:
+        target += (
+            np.bincount(flat.ravel(), weights=weights, minlength=target.size)
+            .reshape(target.shape)
+            .astype(np.int64)
+        )
+
+    def add(self, blue_ids: np.ndarray, red_ids: np.ndarray, blue_win: np.ndarray) -> None:
+        size = self.size
+        win = np.asarray(blue_win, dtype=bool)
+        for ids, won in ((blue_ids, win), (red_ids, ~win)):
+            w_ally = np.repeat(won[:, None], len(ALLY_PAIRS), axis=1).astype(np.float64).ravel()
+            flat = (np.arange(len(ALLY_PAIRS)) * size + ids[:, _ALLY_I]) * size + ids[:, _ALLY_J]
+            self._bincount(self.ally_n, flat, None)
+            self._bincount(self.ally_wins, flat, w_ally)
+            w_role = np.repeat(won[:, None], len(ROLES), axis=1).astype(np.float64).ravel()
+            flat = np.arange(len(ROLES)) * size + ids
+            self._bincount(self.role_n, flat, None)
+            self._bincount(self.role_wins, flat, w_role)
+        for mine, theirs, won in ((blue_ids, red_ids, win), (red_ids, blue_ids, ~win)):
+            w = np.repeat(won[:, None], len(ENEMY_PAIRS), axis=1).astype(np.float64).ravel()
+            a, b = mine[:, _ENEMY_I], theirs[:, _ENEMY_J]
+            flat = (np.arange(len(ENEMY_PAIRS)) * size + a) * size + b
+            self._bincount(self.enemy_n, flat, None)
+            self._bincount(self.enemy_wins, flat, w)
+        self.matches += len(win)
+
+    def finalize(
+        self, version: Optional[str] = None, prior_strength: float = DEFAULT_PRIOR_STRENGTH
+    ) -> PairMatrices:
+        """Shrink every pair toward its champion-level prior and keep the delta from it.
+
+        ``wr = (wins + k * prior) / (n + k)`` with ``k = prior_strength``; the prior for a
+        pair is ``matchup_prior`` of the two champions' role win rates (the partner's rate
+        inverted for allies, so two strong champions together expect more than either
+        alone). Those rates leave out the pair's own games, otherwise a frequent pair's
+        result would already be in its prior. Unseen pairs and the missing row come out as
+        exactly 0.
+        """
+        k = prior_strength
+        role_n = self.role_n.astype(np.float64)
+        role_wins = self.role_wins.astype(np.float64)
+
+        def deltas(
+            n: np.ndarray, wins: np.ndarray, pairs: List[Tuple[int, int]], ally: bool
+        ) -> np.ndarray:
+            out = np.zeros(n.shape, dtype=np.float32)
+            for p, (i, j) in enumerate(pairs):
+                # b's result in these games is a's for an ally, the opposite for an enemy
+                b_wins = wins[p] if ally else n[p] - wins[p]
+                wr_a = (role_wins[i][:, None] - wins[p] + k * 0.5) / (role_n[i][:, None] - n[p] + k)
+                wr_b = (role_wins[j][None, :] - b_wins + k * 0.5) / (role_n[j][None, :] - n[p] + k)
+                prior = matchup_prior(wr_a, 1.0 - wr_b if ally else wr_b)
+                wr = (wins[p] + k * prior) / (n[p] + k)
+                out[p] = np.where(n[p] > 0, wr - prior, 0.0)
+            out[:, -1, :] = 0.0
+            out[:, :, -1] = 0.0
+            return out
+
+        return PairMatrices(
+            self.champions,
+            deltas(self.ally_n, self.ally_wins, ALLY_PAIRS, ally=True),
+            deltas(self.enemy_n, self.enemy_wins, ENEMY_PAIRS, ally=False),
+            version=version,
+            meta={"matches": int(self.matches), "prior_strength": float(prior_strength)},
+        )
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..data.schemas import DraftContext
+from .featurize import ChampionSource, champion_attribute_matrix, side_features_from_sums
+from .matchup_features import ROLES, LaneWinrateIndex
+from .pair_features import PairMatrices
+
+
+def legal_candidates(
+    champ_info: ChampionSource,
+    picked: Iterable[str],
+    banned: Iterable[str],
+) -> List[str]:
+    excluded = {c for c in picked if c} | {c for c in banned if c}
+    return [c for c in dict.fromkeys(champ_info.index) if c not in excluded]
+
+
+def candidate_feature_frame(
+    draft: DraftContext,
+    role: str,
+    enemy_team: Dict[str, str],
+    champ_info: ChampionSource,
+    lane_index: LaneWinrateIndex,
+    bans: Iterable[str] = (),
+    pair_matrices: Optional[PairMatrices] = None,
+) -> Tuple[List[str], pd.DataFrame]:
+    """Feature rows for every legal champion in ``role`` of the drafting side.
+
+    ``draft.champions_by_role`` is the drafting side (blue when ``draft.blue_side``). Side
+    sums for the four fixed allies and the enemy team are computed once; each candidate
+    only adds its own attribute row, and only the open role's lane lookup varies.
+    Features are blue-minus-red, matching the training frame. With ``pair_matrices`` the
+    synergy/counter features of every candidate come from one batched gather.
+    """
+    if role not in ROLES:
+        raise ValueError(f"Unknown role {role!r}; expected one of {ROLES}")
+    allies = {r: c for r, c in draft.champions_by_role.items() if r != role and c}
+    picked = [*allies.values(), *enemy_team.values()]
+    candidates = legal_candidates(champ_info, picked, bans)
+
+    index, attrs = champion_attribute_matrix(champ_info)
+    missing = attrs.shape[0] - 1
+
+    def side_sum(team: Dict[str, str]) -> np.ndarray:
+        ids = [index.get(c, missing) for c in team.values()]
+        if not ids:
+            return np.zeros((1, attrs.shape[1]))
+        # Accumulate in float64 like the per-row path, whatever the table's storage dtype
+        return attrs[ids].sum(axis=0, keepdims=True, dtype=np.float64)
+
+    ally_sums = side_sum(allies) + attrs[[index[c] for c in candidates]]
+    enemy_sums = side_sum(enemy_team)
+    if draft.blue_side:
+        side = side_features_from_sums(ally_sums, enemy_sums)
+    else:
+        side = side_features_from_sums(enemy_sums, ally_sums)
+    frame = pd.DataFrame(side, index=pd.Index(candidates, name="champion"))
+
+    for lane_role in ROLES:
+        enemy = enemy_team.get(lane_role)
+        if not enemy:
+            continue
+        if lane_role == role:
+            if draft.blue_side:
+                wr = [lane_index.lookup(draft.patch, role, c, enemy) for c in candidates]
+            else:
+                wr = [lane_index.lookup(draft.patch, role, enemy, c) for c in candidates]
+            pairs = [(c, enemy) if draft.blue_side else (enemy, c) for c in candidates]
+            wr_col = np.asarray(wr, dtype=np.float64)
+        else:
+            ally = allies.get(lane_role)
+            if not ally:
+                continue
+            blue, red = (ally, enemy) if draft.blue_side else (enemy, ally)
+            pairs = [(blue, red)] * len(candidates)
+            wr_col = np.full(len(candidates), lane_index.lookup(draft.patch, lane_role, blue, red))
+        frame[f"lane_{lane_role}_blue_wr"] = wr_col
+        frame[f"lane_{lane_role}_counter_adv"] = wr_col - 0.5
+        if lane_index.has_counts:
+            frame[f"lane_{lane_role}_n"] = np.asarray(
+                [lane_index.lookup_n(draft.patch, lane_role, b, r) for b, r in pairs],
+                dtype=np.float64,
+            )
+    if pair_matrices is not None:
+        ally_teams = [{**allies, role: c} for c in candidates]
+        enemy_teams = [enemy_team] * len(candidates)
+        if draft.blue_side:
+            pair = pair_matrices.features_batch(ally_teams, enemy_teams)
+        else:
+            pair = pair_matrices.features_batch(enemy_teams, ally_teams)
+        for name, values in pair.items():
+            frame[name] = values
+    return candidates, frame
@@ -0,0 +1,420 @@
+from __future__ import annotations
+
+import functools
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import sys
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..features.champion_table import ChampionTable, ChampionTableSet
+from ..features.matchup_features import LaneWinrateIndex
+from ..features.pair_features import PairMatrixSet
+
+# Content-addressed store for stage results: <root>/<key[:2]>/<key>/ holds the artifact
+# (artifact.parquet for frames, artifact.npz for arrays, or the files a DAG stage wrote)
+# plus meta.json. The key hashes the stage name, its code version and fingerprints of
+# every argument, so equal inputs map to the same entry whatever run produced it.
+
+META_FILE = "meta.json"
+
+
+# ---------------------------------------------------------------------------- fingerprints
+def _sha256(*parts: Any) -> str:
+    return hashlib.sha256(
+        json.dumps(parts, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def _sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parquet_fingerprint(path: Path) -> str:
+    """Hash of a parquet file's footer: schema, row counts and per-column-chunk sizes and
+    min/max/null statistics. Only the footer is read, so fingerprinting a large dataset
+    costs a few reads per file; a rewrite with identical statistics and sizes counts as
+    unchanged."""
+    meta = pq.ParquetFile(path).metadata
+    parts: List[Any] = [meta.num_rows, str(meta.schema.to_arrow_schema())]
+    for i in range(meta.num_row_groups):
+        group = meta.row_group(i)
+        parts.append([group.num_rows, group.total_byte_size])
+        for j in range(group.num_columns):
+            col = group.column(j)
+            stats = col.statistics.to_dict() if col.is_stats_set else None
+            parts.append(
+                [col.path_in_schema, col.total_compressed_size, col.total_uncompressed_size, stats]
+            )
+    return _sha256(parts)
+
+
+def path_fingerprint(path: Path, file_hash: Callable[[Path], str] = _sha256_file) -> Optional[str]:
+    """:func:`parquet_fingerprint` for ``.parquet`` files, ``file_hash`` (full content) for
+    anything else; directories combine their files' relative paths and fingerprints. None
+    when ``path`` does not exist."""
+    path = Path(path)
+
+    def one(f: Path) -> str:
+        return parquet_fingerprint(f) if f.suffix == ".parquet" else file_hash(f)
+
+    if path.is_file():
+        return one(path)
+    if not path.is_dir():
+        return None
+    files = sorted(p for p in path.rglob("*") if p.is_file())
+    return _sha256([[f.relative_to(path).as_posix(), one(f)] for f in files])
+
+
+def _arrow_digest(table: pa.Table) -> str:
+    digest = hashlib.sha256()
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    digest.update(sink.getvalue())
+    return digest.hexdigest()
+
+
+@functools.singledispatch
+def fingerprint(value: Any) -> Any:
+    """JSON-able stand-in for a stage argument; equal fingerprints mean equal results.
+
+    Register more types with ``@fingerprint.register``. Unknown types raise TypeError
+    rather than being keyed on something unstable like ``id``.
+    """
+    raise TypeError(f"No fingerprint for {type(value).__name__}; register one to cache it")
+
+
+@fingerprint.register(type(None))
+@fingerprint.register(bool)
+@fingerprint.register(int)
+@fingerprint.register(float)
+@fingerprint.register(str)
+def _(value: Any) -> Any:
+    return value
+
+
+@fingerprint.register(list)
+@fingerprint.register(tuple)
+def _(value: Sequence[Any]) -> Any:
+    return [fingerprint(v) for v in value]
+
+
+@fingerprint.register(dict)
+def _(value: Dict[str, Any]) -> Any:
+    return {str(k): fingerprint(v) for k, v in value.items()}
+
+
+@fingerprint.register(Path)
+def _(value: Path) -> Any:
+    return {"path": path_fingerprint(value)}
+
+
+@fingerprint.register(pd.DataFrame)
+def _(value: pd.DataFrame) -> Any:
+    # Arrow IPC bytes cover struct/dict team columns, which pandas' row hashing rejects
+    return {"frame": _arrow_digest(pa.Table.from_pandas(value, preserve_index=False))}
+
+
+@fingerprint.register(pd.Series)
+def _(value: pd.Series) -> Any:
+    return fingerprint(value.to_frame(name=str(value.name)))
+
+
+@fingerprint.register(np.ndarray)
+def _(value: np.ndarray) -> Any:
+    data = np.ascontiguousarray(value)
+    return {"array": [str(data.dtype), list(data.shape), hashlib.sha256(data).hexdigest()]}
+
+
+@fingerprint.register(ChampionTable)
+def _(value: ChampionTable) -> Any:
+    return [value.champions, value.columns, fingerprint(np.asarray(value.values))]
+
+
+@fingerprint.register(ChampionTableSet)
+def _(value: ChampionTableSet) -> Any:
+    return {
+        "bundles": {version: fingerprint(t) for version, t in value.bundles.items()},
+        "default": fingerprint(value.default) if value.default is not None else None,
+    }
+
+
+@fingerprint.register(LaneWinrateIndex)
+def _(value: LaneWinrateIndex) -> Any:
+    return [value.default, fingerprint(value.table)]
+
+
+@fingerprint.register(PairMatrixSet)
+def _(value: PairMatrixSet) -> Any:
+    return {
+        version: [
+            m.champions,
+            fingerprint(np.asarray(m.synergy)),
+            fingerprint(np.asarray(m.counter)),
+        ]
+        for version, m in sorted(value.bundles.items())
+    }
+
+
+def code_version(fn: Callable[..., Any], code: Sequence[Any] = ()) -> str:
+    """Hash of the source files defining ``fn`` and every function/class/module in ``code``
+    (the helpers whose behaviour the result depends on)."""
+    files = set()
+    for obj in (fn, *code):
+        module = obj if inspect.ismodule(obj) else sys.modules[obj.__module__]
+        files.add(Path(inspect.getfile(module)).resolve())
+    return _sha256([[f.name, _sha256_file(f)] for f in sorted(files)])
+
+
+# --------------------------------------------------------------------------------- store
+@dataclass
+class CacheEntry:
+    key: str
+    path: Path
+    meta: Dict[str, Any]
+
+    @property
+    def size(self) -> int:
+        return int(self.meta.get("bytes", 0))
+
+    @property
+    def last_used(self) -> float:
+        return (self.path / META_FILE).stat().st_mtime
+
+
+class ArtifactCache:
+    """Stage results on disk under ``root``, evicted least-recently-used once their total
+    size exceeds ``max_bytes``. A hit refreshes the entry's meta.json mtime, which is the
+    LRU clock, so several processes can share one cache directory."""
+
+    def __init__(self, root: Path, max_bytes: int = 20 << 30) -> None:
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+
+    def key(self, stage: str, code: str, inputs: Any) -> str:
+        return _sha256({"stage": stage, "code": code, "inputs": inputs})
+
+    def _dir(self, key: str) -> Path:
+        return self.root / key[:2] / key
+
+    def entry(self, key: str) -> Optional[CacheEntry]:
+        path = self._dir(key)
+        meta_path = path / META_FILE
+        if not meta_path.exists():
+            return None
+        return CacheEntry(key, path, json.loads(meta_path.read_text(encoding="utf-8")))
+
+    def __contains__(self, key: str) -> bool:
+        return (self._dir(key) / META_FILE).exists()
+
+    def entries(self) -> Iterator[CacheEntry]:
+        if not self.root.exists():
+            return
+        for meta_path in self.root.glob(f"*/*/{META_FILE}"):
+            entry = self.entry(meta_path.parent.name)
+            if entry is not None:
+                yield entry
+
+    def _touch(self, entry: CacheEntry) -> None:
+        os.utime(entry.path / META_FILE)
+
+    # Values: DataFrame -> parquet, ndarray / dict of ndarrays -> npz
+    def get(self, key: str) -> Any:
+        """The cached value, or None on a miss."""
+        entry = self.entry(key)
+        if entry is None:
+            return None
+        kind = entry.meta.get("kind")
+        if kind == "frame":
+            value: Any = pd.read_parquet(entry.path / "artifact.parquet")
+        elif kind in ("array", "arrays"):
+            with np.load(entry.path / "artifact.npz", allow_pickle=False) as npz:
+                value = npz["array"] if kind == "array" else {k: npz[k] for k in npz.files}
+        else:
+            raise ValueError(f"Cache entry {key} holds {kind!r}, not a value")
+        self._touch(entry)
+        return value
+
+    def put(self, key: str, value: Any, **meta: Any) -> None:
+        def write(tmp: Path) -> str:
+            if isinstance(value, pd.DataFrame):
+                value.to_parquet(tmp / "artifact.parquet", index=False)
+                return "frame"
+            if isinstance(value, np.ndarray):
+                np.savez(tmp / "artifact.npz", array=value)
+                return "array"
+            if isinstance(value, dict) and all(isinstance(v, np.ndarray) for v in value.values()):
+                np.savez(tmp / "artifact.npz", **value)
+                return "arrays"
+            raise TypeError(f"Cannot cache a {type(value).__name__}; return a DataFrame or arrays")
+
+        self._store(key, write, meta)
+
+    def get_files(self, key: str, destination: Path) -> Optional[Dict[str, Any]]:
+        """Copy a :meth:`put_files` entry's files to ``destination``; returns its meta."""
+        entry = self.entry(key)
+        if entry is None or entry.meta.get("kind") != "files":
+            return None
+        destination = Path(destination)
+        destination.parent.mkdir(parents=True, exist_ok=True)
+        source = entry.path / "files" / destination.name
+        tmp = destination.with_name(destination.name + ".tmp")
+        if source.is_dir():
+            shutil.copytree(source, tmp)
+        else:
+            shutil.copy2(source, tmp)
+        if destination.is_dir():
+            shutil.rmtree(destination)
+        os.replace(tmp, destination)
+        self._touch(entry)
+        return entry.meta
+
+    def put_files(self, key: str, source: Path, **meta: Any) -> None:
+        """Store a copy of the file or directory ``source`` (a DAG stage output)."""
+        source = Path(source)
+
+        def write(tmp: Path) -> str:
+            (tmp / "files").mkdir()
+            if source.is_dir():
+                shutil.copytree(source, tmp / "files" / source.name)
+            else:
+                shutil.copy2(source, tmp / "files" / source.name)
+            return "files"
+
+        self._store(key, write, meta)
+
+    def _store(self, key: str, write: Callable[[Path], str], meta: Dict[str, Any]) -> None:
+        path = self._dir(key)
+        if (path / META_FILE).exists():
+            return
+        tmp = path.with_name(f"{key}.tmp{os.getpid()}")
+        if tmp.exists():
+            shutil.rmtree(tmp)
+        tmp.mkdir(parents=True)
+        try:
+            kind = write(tmp)
+            size = sum(f.stat().st_size for f in tmp.rglob("*") if f.is_file())
+            record = {**meta, "kind": kind, "bytes": size, "created_at": time.time()}
+            (tmp / META_FILE).write_text(json.dumps(record, default=str), encoding="utf-8")
+            os.replace(tmp, path)
+        except OSError:
+            # Another process stored the same key first
+            if not (path / META_FILE).exists():
+                raise
+        finally:
+            if tmp.exists():
+                shutil.rmtree(tmp)
+        self.evict()
+
+    def evict(self) -> List[str]:
+        """Drop least-recently-used entries until the cache fits in ``max_bytes``."""
+        entries = sorted(self.entries(), key=lambda e: e.last_used)
+        total = sum(e.size for e in entries)
+        removed: List[str] = []
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(entry.path, ignore_errors=True)
+            total -= entry.size
+            removed.append(entry.key)
+        return removed
+
+    def stats(self) -> Dict[str, Any]:
+        entries = list(self.entries())
+        by_stage: Dict[str, int] = {}
+        for e in entries:
+            by_stage[e.meta.get("stage", "?")] = by_stage.get(e.meta.get("stage", "?"), 0) + 1
+        return {
+            "root": str(self.root),
+            "entries": len(entries),
+            "bytes": sum(e.size for e in entries),
+            "max_bytes": self.max_bytes,
+            "by_stage": by_stage,
+        }
+
+
+# ------------------------------------------------------------------------ stage registry
+_ACTIVE: Optional[ArtifactCache] = None
+
+
+def use_cache(cache: Optional[ArtifactCache]) -> None:
+    """Enable (or with None, disable) caching for every :func:`cached_stage` function."""
+    global _ACTIVE
+    _ACTIVE = cache
+
+
+def active_cache() -> Optional[ArtifactCache]:
+    return _ACTIVE
+
+
+@dataclass
+class CachedStage:
+    name: str
+    fn: Callable[..., Any]
+    code: Tuple[Any, ...]
+    ignore: Tuple[str, ...]
+
+    def key(self, cache: ArtifactCache, args: Sequence[Any], kwargs: Dict[str, Any]) -> str:
+        bound = inspect.signature(self.fn).bind(*args, **kwargs)
+        bound.apply_defaults()
+        inputs = {k: fingerprint(v) for k, v in bound.arguments.items() if k not in self.ignore}
+        return cache.key(self.name, code_version(self.fn, self.code), inputs)
+
+
+STAGES: Dict[str, CachedStage] = {}
+
+
+def cached_stage(
+    name: str, code: Sequence[Any] = (), ignore: Sequence[str] = ()
+) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Register a function whose result is cached while :func:`use_cache` is set.
+
+    The key covers ``name``, :func:`code_version` of the function plus ``code``, and the
+    :func:`fingerprint` of every argument except those in ``ignore`` (knobs like batch
+    sizes that do not change the result). Results must be a DataFrame or arrays. The
+    wrapper's ``plan(*args, **kwargs)`` reports whether a call would be recomputed.
+    """
+
+    def decorate(fn: Callable[..., Any]) -> Callable[..., Any]:
+        stage = CachedStage(name, fn, tuple(code), tuple(ignore))
+        STAGES[name] = stage
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            cache = _ACTIVE
+            if cache is None:
+                return fn(*args, **kwargs)
+            key = stage.key(cache, args, kwargs)
+            value = cache.get(key)
+            if value is None:
+                value = fn(*args, **kwargs)
+                cache.put(key, value, stage=name)
+            return value
+
+        def plan(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+            cache = _ACTIVE
+            if cache is None:
+                return {"stage": name, "key": None, "recompute": True}
+            key = stage.key(cache, args, kwargs)
+            return {"stage": name, "key": key, "recompute": key not in cache}
+
+        wrapper.plan = plan  # type: ignore[attr-defined]
+        wrapper.stage = stage  # type: ignore[attr-defined]
+        return wrapper
+
+    return decorate
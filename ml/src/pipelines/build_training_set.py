@@ -1,35 +1,154 @@
 from __future__ import annotations
 
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, Tuple, Union
 
 import pandas as pd
-from tqdm import tqdm
 
-from ..features.featurize import aggregate_side_features
-from ..features.matchup_features import compute_lane_matchup_features
+from ..features.champion_table import ChampionTable, ChampionTableSet
+from ..features.featurize import (
+    ChampionSource,
+    aggregate_side_features,
+    aggregate_side_features_batch,
+    as_champion_table,
+)
+from ..features.matchup_features import (
+    ROLES,
+    LaneWinrateIndex,
+    as_lane_index,
+    compute_lane_matchup_features,
+)
+from ..features.pair_features import PairMatrixSet
+from .artifact_cache import cached_stage
 
 
+# vectorized and rowwise build the same frame, so they share cache entries
+@cached_stage(
+    "featurize",
+    code=(
+        ChampionTable,
+        aggregate_side_features_batch,
+        compute_lane_matchup_features,
+        PairMatrixSet,
+    ),
+    ignore=("vectorized",),
+)
 def build_training_frame(
     matches: pd.DataFrame,
-    champ_info: pd.DataFrame,
-    lane_wr: pd.DataFrame,
+    champ_info: Union[ChampionSource, ChampionTableSet],
+    lane_wr: Union[pd.DataFrame, LaneWinrateIndex],
+    vectorized: bool = True,
+    pair_matrices: Optional[PairMatrixSet] = None,
 ) -> pd.DataFrame:
     """
     matches: rows with [match_id, patch, blue_win, blue_team, red_team]
-    champ_info: per-champion numeric attributes used by featurize module
-    lane_wr: per-role, per-patch lane matchup winrates
+    champ_info: per-champion numeric attributes used by featurize module (a frame is
+        converted to the float32 ChampionTable that serving uses, so values match exactly),
+        or a ChampionTableSet resolving each row's patch to its own table
+    lane_wr: per-role, per-patch lane matchup winrates (or a prebuilt LaneWinrateIndex)
+    vectorized: build side features column-wise (default); False uses the per-row path
+    pair_matrices: per-patch synergy/counter bundles (build_pair_matrices); adds the
+        PAIR_COLUMNS features, NaN for patches no bundle covers
     """
+    if not isinstance(champ_info, ChampionTableSet):
+        champ_info = as_champion_table(champ_info)
+    if not vectorized:
+        return build_training_frame_rowwise(matches, champ_info, lane_wr, pair_matrices)
+
+    blue_teams = matches["blue_team"].tolist()
+    red_teams = matches["red_team"].tolist()
+    patches = matches["patch"].tolist()
+
+    lane_index = as_lane_index(lane_wr)
+    side = _side_features_batch(blue_teams, red_teams, patches, champ_info)
+    lane = lane_index.join(matches).set_axis(side.index)
+    pair = pd.DataFrame(index=side.index)
+    if pair_matrices is not None:
+        pair = pd.DataFrame(
+            pair_matrices.features_batch(blue_teams, red_teams, patches), index=side.index
+        )
+
+    df = pd.concat([side, lane, pair], axis=1)
+    df["patch"] = patches
+    df["blue_win"] = matches["blue_win"].astype(bool).to_numpy()
+    df["match_id"] = matches["match_id"].to_numpy()
+    first = _first_match_lane_columns(blue_teams, red_teams, lane_index.feature_suffixes)
+    return df[_rowwise_column_order(side.columns, lane.columns, first, pair.columns)]
+
+
+def _side_features_batch(
+    blue_teams: List[Dict[str, str]],
+    red_teams: List[Dict[str, str]],
+    patches: List[str],
+    champ_info: Union[ChampionTable, ChampionTableSet],
+) -> pd.DataFrame:
+    """aggregate_side_features_batch with one gather per distinct champion table."""
+    if not isinstance(champ_info, ChampionTableSet):
+        return aggregate_side_features_batch(blue_teams, red_teams, champ_info)
+    groups: Dict[int, Tuple[ChampionTable, List[int]]] = {}
+    tables = {patch: champ_info.for_patch(patch) for patch in set(patches)}
+    for i, patch in enumerate(patches):
+        table = tables[patch]
+        groups.setdefault(id(table), (table, []))[1].append(i)
+    if not groups:
+        return aggregate_side_features_batch([], [], champ_info.for_patch(None))
+    parts = [
+        aggregate_side_features_batch(
+            [blue_teams[i] for i in rows], [red_teams[i] for i in rows], table
+        ).set_axis(rows)
+        for table, rows in groups.values()
+    ]
+    return pd.concat(parts).sort_index()
+
+
+def _first_match_lane_columns(
+    blue_teams: List[Dict], red_teams: List[Dict], suffixes: Tuple[str, ...]
+) -> List[str]:
+    if not blue_teams:
+        return []
+    b, r = blue_teams[0], red_teams[0]
+    return [
+        f"lane_{role}_{suffix}"
+        for role in ROLES
+        if b.get(role) and r.get(role)
+        for suffix in suffixes
+    ]
+
+
+def _rowwise_column_order(side_cols, lane_cols, first: List[str], pair_cols=()) -> List[str]:
+    # from_records orders columns by first appearance, so lane columns missing from the
+    # first match land after the metadata columns in the per-row frame
+    rest = [c for c in lane_cols if c not in first]
+    return [*side_cols, *first, *pair_cols, "patch", "blue_win", "match_id", *rest]
+
+
+def build_training_frame_rowwise(
+    matches: pd.DataFrame,
+    champ_info: Union[ChampionSource, ChampionTableSet],
+    lane_wr: Union[pd.DataFrame, LaneWinrateIndex],
+    pair_matrices: Optional[PairMatrixSet] = None,
+) -> pd.DataFrame:
+    """Reference per-row implementation, kept for cross-checking the vectorized path."""
+    # Imported here: tqdm is an ML-workspace dependency, and the backend's pipeline jobs
+    # only use the vectorized path
+    from tqdm import tqdm
+
+    lane_wr = as_lane_index(lane_wr)
     records: List[Dict] = []
     for _, row in tqdm(matches.iterrows(), total=len(matches)):
         blue_team = row["blue_team"]
         red_team = row["red_team"]
         patch = row["patch"]
 
-        side_feats = aggregate_side_features(blue_team, red_team, champ_info)
+        table = (
+            champ_info.for_patch(patch) if isinstance(champ_info, ChampionTableSet) else champ_info
+        )
+        side_feats = aggregate_side_features(blue_team, red_team, table)
         lane_feats = compute_lane_matchup_features(blue_team, red_team, patch, lane_wr)
 
         features: Dict = {**side_feats, **lane_feats}
+        if pair_matrices is not None:
+            features.update(pair_matrices.features(blue_team, red_team, patch))
         features["patch"] = patch
         features["blue_win"] = bool(row["blue_win"])
         features["match_id"] = row["match_id"]
@@ -37,8 +156,7 @@ def build_training_frame(
     return pd.DataFrame.from_records(records)
 
 
-def save_parquet(df: pd.DataFrame, path: Path) -> None:
+def save_parquet(df: pd.DataFrame, path: Path, row_group_size: int = 65_536) -> None:
+    # Modest row groups let out-of-core training decode one group at a time
     path.parent.mkdir(parents=True, exist_ok=True)
-    df.to_parquet(path, index=False)
-
-
+    df.to_parquet(path, index=False, row_group_size=row_group_size)
@@ -0,0 +1,300 @@
+from __future__ import annotations
+
+import contextlib
+import hashlib
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: runs on one work_dir are not serialized
+    fcntl = None  # type: ignore[assignment]
+
+from .artifact_cache import ArtifactCache, code_version, path_fingerprint
+
+STATE_FILE = "dag_state.json"
+LOCK_FILE = ".lock"
+
+# progress(stage, status, info) with status "running", "skipped", "cached", "done" or "failed"
+ProgressFn = Callable[[str, str, Dict[str, Any]], None]
+
+
+@dataclass
+class Stage:
+    """One step of a :func:`run_dag` graph.
+
+    ``run`` gets ``{dep: value}`` for the stages in ``deps`` (in-memory results, or
+    ``load(output)`` when a dependency was skipped) and returns this stage's value; ``save``
+    persists it to ``output``. The stage is skipped when its key matches the last successful
+    run and ``output`` still exists, and restored from the artifact cache when any earlier
+    run stored that key. The key covers ``params``, fingerprints of ``inputs`` (footer
+    statistics for parquet, content hashes otherwise), the output hashes of ``deps`` and
+    the source of ``run`` plus ``code`` (see artifact_cache.code_version). ``volatile``
+    stages (e.g. API collection) always run; stages with side effects beyond ``output``
+    (training registers a model) set ``cacheable=False``.
+    """
+
+    name: str
+    run: Callable[[Dict[str, Any]], Any]
+    output: Path
+    save: Callable[[Any, Path], None]
+    load: Callable[[Path], Any]
+    deps: Sequence[str] = ()
+    params: Dict[str, Any] = field(default_factory=dict)
+    inputs: Sequence[Path] = ()
+    volatile: bool = False
+    code: Sequence[Any] = ()
+    cacheable: bool = True
+
+
+class FileHasher:
+    """sha256 of files and directories, reusing digests of files whose size and mtime are
+    unchanged (the same signature compute_lane_wr_from_matches --incremental relies on)."""
+
+    def __init__(self, cache: Optional[Dict[str, List[Any]]] = None) -> None:
+        self.cache: Dict[str, List[Any]] = cache or {}
+
+    def file(self, path: Path) -> str:
+        stat = path.stat()
+        key = str(path.resolve())
+        cached = self.cache.get(key)
+        if cached is not None and cached[:2] == [stat.st_size, stat.st_mtime_ns]:
+            return cached[2]
+        digest = hashlib.sha256()
+        with path.open("rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                digest.update(chunk)
+        self.cache[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def path(self, path: Path) -> Optional[str]:
+        """Digest of a file, or of a directory's relative paths and file digests; None if absent."""
+        path = Path(path)
+        if path.is_file():
+            return self.file(path)
+        if not path.is_dir():
+            return None
+        digest = hashlib.sha256()
+        for f in sorted(p for p in path.rglob("*") if p.is_file()):
+            digest.update(f.relative_to(path).as_posix().encode("utf-8"))
+            digest.update(self.file(f).encode("ascii"))
+        return digest.hexdigest()
+
+
+def stage_key(
+    stage: Stage, input_hashes: Dict[str, Optional[str]], dep_hashes: Dict[str, str]
+) -> str:
+    payload = {
+        "stage": stage.name,
+        "code": code_version(stage.run, stage.code),
+        "params": stage.params,
+        "inputs": input_hashes,
+        "deps": dep_hashes,
+    }
+    return hashlib.sha256(
+        json.dumps(payload, sort_keys=True, default=str).encode("utf-8")
+    ).hexdigest()
+
+
+def topological_order(stages: Iterable[Stage]) -> List[Stage]:
+    by_name = {s.name: s for s in stages}
+    order: List[Stage] = []
+    state: Dict[str, str] = {}
+
+    def visit(name: str) -> None:
+        if state.get(name) == "done":
+            return
+        if state.get(name) == "visiting":
+            raise ValueError(f"Cycle through stage {name!r}")
+        if name not in by_name:
+            raise ValueError(f"Unknown stage {name!r}")
+        state[name] = "visiting"
+        for dep in by_name[name].deps:
+            visit(dep)
+        state[name] = "done"
+        order.append(by_name[name])
+
+    for name in by_name:
+        visit(name)
+    return order
+
+
+@contextlib.contextmanager
+def _locked(work_dir: Path) -> Iterator[None]:
+    # flock is released when the process dies, so a crashed run never leaves a stale lock
+    with (work_dir / LOCK_FILE).open("a") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+
+def _write_state(path: Path, state: Dict[str, Any]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _decide(
+    stage: Stage,
+    key: Optional[str],
+    last: Dict[str, Any],
+    force: Sequence[str],
+    cache: Optional[ArtifactCache],
+) -> Tuple[str, str]:
+    """(action, reason) with action "skip", "cached" or "run"."""
+    if stage.volatile:
+        return "run", "volatile"
+    if stage.name in force or "all" in force:
+        return "run", "forced"
+    if key is None:
+        return "run", "upstream recomputed"
+    if last.get("key") == key and Path(stage.output).exists():
+        return "skip", "unchanged since last run"
+    if cache is not None and stage.cacheable and key in cache:
+        return "cached", "in artifact cache"
+    return "run", "inputs changed" if last else "no previous run"
+
+
+def _read_state(work_dir: Path) -> Dict[str, Any]:
+    state_path = Path(work_dir) / STATE_FILE
+    if state_path.exists():
+        return json.loads(state_path.read_text(encoding="utf-8"))
+    return {"stages": {}, "file_hashes": {}}
+
+
+def _input_fingerprints(stage: Stage, hasher: FileHasher) -> Dict[str, Optional[str]]:
+    return {str(p): path_fingerprint(p, file_hash=hasher.file) for p in stage.inputs}
+
+
+def plan_dag(
+    stages: Sequence[Stage],
+    work_dir: Path,
+    force: Sequence[str] = (),
+    cache: Optional[ArtifactCache] = None,
+) -> Dict[str, Dict[str, Any]]:
+    """Dry run of :func:`run_dag`: ``{stage: {"action", "reason", "key"}}`` without running
+    anything. A stage downstream of one that runs is reported as "run", because its key
+    depends on an output that does not exist yet."""
+    state = _read_state(work_dir)
+    hasher = FileHasher(state.get("file_hashes"))
+    previous = state.get("stages", {})
+    hashes: Dict[str, Optional[str]] = {}
+    plan: Dict[str, Dict[str, Any]] = {}
+    for stage in topological_order(stages):
+        dep_hashes = {d: hashes[d] for d in stage.deps}
+        key = None
+        if all(h is not None for h in dep_hashes.values()):
+            key = stage_key(stage, _input_fingerprints(stage, hasher), dep_hashes)  # type: ignore[arg-type]
+        last = previous.get(stage.name, {})
+        action, reason = _decide(stage, key, last, force, cache)
+        hashes[stage.name] = None
+        if action == "skip":
+            hashes[stage.name] = last["output_hash"]
+        elif action == "cached":
+            entry = cache.entry(key) if cache is not None and key is not None else None
+            hashes[stage.name] = entry.meta["output_hash"] if entry is not None else None
+        plan[stage.name] = {"action": action, "reason": reason, "key": key}
+    return plan
+
+
+def run_dag(
+    stages: Sequence[Stage],
+    work_dir: Path,
+    force: Sequence[str] = (),
+    progress: Optional[ProgressFn] = None,
+    cache: Optional[ArtifactCache] = None,
+) -> Dict[str, Any]:
+    """Run ``stages`` in dependency order, skipping those whose inputs are unchanged.
+
+    Values flow between stages in memory; every output is also saved so a later run can
+    skip the stage and reload it, and stored in ``cache`` (if given) so any later run with
+    the same key restores it instead of recomputing. ``force`` names stages to rerun
+    regardless (``"all"`` for every stage). Concurrent runs on one ``work_dir`` are
+    serialized with a file lock. Returns ``{stage: {"status", "seconds", "output",
+    "output_hash"}}``.
+    """
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+    notify = progress or (lambda stage, status, info: None)
+    with _locked(work_dir):
+        state_path = work_dir / STATE_FILE
+        state = _read_state(work_dir)
+        hasher = FileHasher(state.get("file_hashes"))
+        previous: Dict[str, Dict[str, Any]] = state.get("stages", {})
+
+        values: Dict[str, Any] = {}
+        hashes: Dict[str, str] = {}
+        report: Dict[str, Any] = {}
+        by_name = {s.name: s for s in stages}
+
+        def value_of(name: str) -> Any:
+            if name not in values:
+                values[name] = by_name[name].load(by_name[name].output)
+            return values[name]
+
+        def finish(stage: Stage, key: str, output_hash: str, status: str, start: float) -> None:
+            hashes[stage.name] = output_hash
+            previous[stage.name] = {
+                "key": key,
+                "output_hash": output_hash,
+                "finished_at": time.time(),
+            }
+            # Recorded per stage, so a failure further down keeps the work already done
+            _write_state(state_path, {"stages": previous, "file_hashes": hasher.cache})
+            report[stage.name] = {
+                "status": status,
+                "seconds": round(time.perf_counter() - start, 3),
+                "output": str(stage.output),
+                "output_hash": output_hash,
+            }
+            notify(stage.name, status, report[stage.name])
+
+        for stage in topological_order(stages):
+            key = stage_key(
+                stage, _input_fingerprints(stage, hasher), {d: hashes[d] for d in stage.deps}
+            )
+            last = previous.get(stage.name, {})
+            action, _ = _decide(stage, key, last, force, cache)
+            if action == "skip":
+                hashes[stage.name] = last["output_hash"]
+                report[stage.name] = {
+                    "status": "skipped",
+                    "seconds": 0.0,
+                    "output": str(stage.output),
+                    "output_hash": last["output_hash"],
+                }
+                notify(stage.name, "skipped", report[stage.name])
+                continue
+
+            start = time.perf_counter()
+            if action == "cached":
+                assert cache is not None
+                meta = cache.get_files(key, Path(stage.output))
+                if meta is not None:
+                    values.pop(stage.name, None)
+                    finish(stage, key, meta["output_hash"], "cached", start)
+                    continue
+
+            notify(stage.name, "running", {"output": str(stage.output)})
+            try:
+                value = stage.run({d: value_of(d) for d in stage.deps})
+                Path(stage.output).parent.mkdir(parents=True, exist_ok=True)
+                stage.save(value, Path(stage.output))
+            except Exception as exc:
+                notify(stage.name, "failed", {"error": f"{type(exc).__name__}: {exc}"})
+                raise
+            values[stage.name] = value
+            output_hash = hasher.path(Path(stage.output)) or ""
+            if cache is not None and stage.cacheable and not stage.volatile:
+                cache.put_files(key, Path(stage.output), stage=stage.name, output_hash=output_hash)
+            finish(stage, key, output_hash, "done", start)
+        _write_state(state_path, {"stages": previous, "file_hashes": hasher.cache})
+    return report
@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from ..cli.collect_and_build import collect_matches
+from ..cli.compute_lane_wr_from_matches import compute_lane_wr
+from ..etl.match_table import MATCHES_V1_SCHEMA, conform_table, records_to_table
+from ..features.champion_table import ChampionTableSet
+from ..features.featurize import as_champion_table
+from ..features.pair_features import PairMatrixSet
+from ..train.train_lightgbm import select_patch, train_frame
+from .build_training_set import build_training_frame, save_parquet
+from .artifact_cache import ArtifactCache
+from .dag import ProgressFn, Stage, plan_dag, run_dag
+
+# collect -> parse -> lane_wr -> featurize -> train; file names under PipelineConfig.work_dir
+STAGE_NAMES = ["collect", "parse", "lane_wr", "featurize", "train"]
+OUTPUTS = {
+    "collect": "collected.parquet",
+    "parse": "matches.parquet",
+    "lane_wr": "lane_wr.parquet",
+    "featurize": "training.parquet",
+    "train": "train_metrics.json",
+}
+
+
+@dataclass
+class PipelineConfig:
+    """Inputs and outputs of one :func:`run_pipeline` run.
+
+    ``collect`` (a collect_and_build.CollectionConfig) fetches a player's recent matches; the
+    parsed table then accumulates across runs. ``matches`` are existing matches parquet
+    files/directories (crawl or reparse output) merged in. ``champion_table_dir`` bundles win
+    over ``champ_info_path``, as in the backend's feature loader.
+    """
+
+    work_dir: Path
+    collect: Optional[Any] = None
+    matches: Sequence[Path] = ()
+    champion_table_dir: Optional[Path] = None
+    champ_info_path: Optional[Path] = None
+    pair_matrix_dir: Optional[Path] = None
+    smoothing: Dict[str, Any] = field(default_factory=dict)
+    train: bool = True
+    output_model: Optional[Path] = None
+    registry: Optional[Path] = None
+    patch: Optional[str] = None
+    calibration: Optional[str] = "isotonic"
+
+
+def _write_table(table: pa.Table, path: Path) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    pq.write_table(table, tmp)
+    os.replace(tmp, path)
+
+
+def _write_frame(df: pd.DataFrame, path: Path) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    df.to_parquet(tmp, index=False)
+    os.replace(tmp, path)
+
+
+def _matches_table(path: Path) -> pa.Table:
+    table = ds.dataset(str(path), format="parquet").to_table(columns=MATCHES_V1_SCHEMA.names)
+    return conform_table(table, MATCHES_V1_SCHEMA)
+
+
+def merge_matches(tables: Sequence[pa.Table]) -> pd.DataFrame:
+    """One row per match_id (later tables win), sorted so equal inputs give equal files."""
+    table = pa.concat_tables([t.select(MATCHES_V1_SCHEMA.names) for t in tables])
+    df = table.to_pandas()
+    df = df.drop_duplicates("match_id", keep="last").dropna(subset=["match_id"])
+    return df.sort_values("match_id", kind="stable").reset_index(drop=True)
+
+
+def load_champion_source(config: PipelineConfig) -> ChampionTableSet:
+    """Per-patch bundles under champion_table_dir; champ_info covers patches before them."""
+    default = None
+    if config.champ_info_path is not None and Path(config.champ_info_path).exists():
+        champ_info = pd.read_parquet(config.champ_info_path)
+        if "champion" in champ_info.columns:
+            champ_info = champ_info.set_index("champion")
+        default = as_champion_table(champ_info)
+    tables = ChampionTableSet({}, default)
+    if config.champion_table_dir is not None:
+        tables = ChampionTableSet.load(Path(config.champion_table_dir), default)
+    if not len(tables) and default is None:
+        raise ValueError("No champion table bundle or champ_info parquet to featurize with")
+    return tables
+
+
+def build_stages(config: PipelineConfig) -> List[Stage]:
+    work_dir = Path(config.work_dir)
+    out = {name: work_dir / filename for name, filename in OUTPUTS.items()}
+    stages: List[Stage] = []
+
+    parse_deps: List[str] = []
+    parse_inputs = [Path(p) for p in config.matches]
+    if config.collect is not None:
+        c = config.collect
+        stages.append(
+            Stage(
+                name="collect",
+                run=lambda deps: asyncio.run(collect_matches(c)),
+                output=out["collect"],
+                save=lambda df, path: _write_table(records_to_table(df.to_dict("records")), path),
+                load=pd.read_parquet,
+                volatile=True,
+            )
+        )
+        parse_deps.append("collect")
+
+    def parse(deps: Dict[str, Any]) -> pd.DataFrame:
+        tables = [_matches_table(p) for p in parse_inputs if p.exists()]
+        if "collect" in deps:
+            # Collected matches accumulate across runs: the previous table is merged in too.
+            # It is left out of the stage key, so re-collecting the same matches skips parse.
+            if out["parse"].exists():
+                tables.append(_matches_table(out["parse"]))
+            tables.append(records_to_table(deps["collect"].to_dict("records")))
+        df = merge_matches(tables) if tables else pd.DataFrame()
+        if df.empty:
+            raise ValueError("No matches to build from")
+        return df
+
+    stages.append(
+        Stage(
+            name="parse",
+            run=parse,
+            output=out["parse"],
+            save=lambda df, path: _write_table(
+                pa.Table.from_pandas(df, schema=MATCHES_V1_SCHEMA, preserve_index=False), path
+            ),
+            load=pd.read_parquet,
+            deps=parse_deps,
+            inputs=parse_inputs,
+            code=(merge_matches, records_to_table),
+            # When collecting, the result also depends on the previous matches.parquet
+            cacheable=config.collect is None,
+        )
+    )
+    stages.append(
+        Stage(
+            name="lane_wr",
+            run=lambda deps: compute_lane_wr(deps["parse"], **config.smoothing),
+            output=out["lane_wr"],
+            save=_write_frame,
+            load=pd.read_parquet,
+            deps=["parse"],
+            params={"smoothing": config.smoothing},
+            code=(*compute_lane_wr.stage.code, compute_lane_wr),
+        )
+    )
+
+    def featurize(deps: Dict[str, Any]) -> pd.DataFrame:
+        pairs = PairMatrixSet.load(config.pair_matrix_dir) if config.pair_matrix_dir else None
+        return build_training_frame(
+            deps["parse"],
+            load_champion_source(config),
+            deps["lane_wr"],
+            pair_matrices=pairs or None,
+        )
+
+    feature_inputs = [
+        Path(p)
+        for p in (config.champion_table_dir, config.champ_info_path, config.pair_matrix_dir)
+        if p is not None
+    ]
+    stages.append(
+        Stage(
+            name="featurize",
+            run=featurize,
+            output=out["featurize"],
+            save=save_parquet,
+            load=pd.read_parquet,
+            deps=["parse", "lane_wr"],
+            inputs=feature_inputs,
+            code=(*build_training_frame.stage.code, build_training_frame, load_champion_source),
+        )
+    )
+
+    if config.train:
+        stages.append(
+            Stage(
+                name="train",
+                run=lambda deps: train_frame(
+                    select_patch(deps["featurize"], config.patch),
+                    output_model=config.output_model,
+                    patch=config.patch,
+                    registry=config.registry,
+                    calibration=config.calibration,
+                ),
+                output=out["train"],
+                save=lambda metrics, path: path.write_text(
+                    json.dumps(metrics, indent=2, default=str), encoding="utf-8"
+                ),
+                load=lambda path: json.loads(path.read_text(encoding="utf-8")),
+                deps=["featurize"],
+                code=(train_frame,),
+                # Registering a model is a side effect a restored metrics file cannot replay
+                cacheable=False,
+                params={
+                    "patch": config.patch,
+                    "calibration": config.calibration,
+                    "output_model": config.output_model,
+                    "registry": config.registry,
+                },
+            )
+        )
+    return stages
+
+
+def run_pipeline(
+    config: PipelineConfig,
+    force: Sequence[str] = (),
+    progress: Optional[ProgressFn] = None,
+    cache: Optional[ArtifactCache] = None,
+) -> Dict[str, Any]:
+    """Run collect -> parse -> lane_wr -> featurize -> train under ``config.work_dir``.
+
+    Frames are handed from stage to stage in memory; stages whose inputs hash the same as
+    on the last run are skipped, and with ``cache`` any stage computed before under the
+    same inputs and code is restored from it (see dag.run_dag). Returns the per-stage
+    report and, when the train stage ran or was skipped, its metrics.
+    """
+    if config.train and config.output_model is None and config.registry is None:
+        raise ValueError("Training needs output_model and/or registry")
+    stages = build_stages(config)
+    report = run_dag(stages, config.work_dir, force=force, progress=progress, cache=cache)
+    result: Dict[str, Any] = {"stages": report, "work_dir": str(config.work_dir)}
+    train_out = Path(config.work_dir) / OUTPUTS["train"]
+    if config.train and train_out.exists():
+        result["metrics"] = json.loads(train_out.read_text(encoding="utf-8"))
+    return result
+
+
+def plan_pipeline(
+    config: PipelineConfig, force: Sequence[str] = (), cache: Optional[ArtifactCache] = None
+) -> Dict[str, Dict[str, Any]]:
+    """Which stages :func:`run_pipeline` would skip, restore from ``cache`` or recompute."""
+    return plan_dag(build_stages(config), config.work_dir, force=force, cache=cache)
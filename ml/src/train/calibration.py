@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+# Calibration is stored as a piecewise-linear map {"method", "x", "y"}: serving applies it
+# with one np.interp over the batch. sklearn is only imported when fitting.
+
+METHODS = ("isotonic", "platt")
+MAX_KNOTS = 256
+# Calibrated output is kept in [CLIP, 1 - CLIP]: isotonic end knots reach exactly 0 and 1,
+# and a draft-stage model should never claim certainty
+CLIP = 0.01
+_EPS = 1e-6
+
+
+def _thin(x: np.ndarray, y: np.ndarray, max_knots: int) -> tuple:
+    if len(x) <= max_knots:
+        return x, y
+    keep = np.unique(np.linspace(0, len(x) - 1, max_knots).round().astype(int))
+    return x[keep], y[keep]
+
+
+def fit_calibration(
+    proba: np.ndarray, y: np.ndarray, method: str = "isotonic", max_knots: int = MAX_KNOTS
+) -> Dict[str, Any]:
+    """Fit ``method`` on held-out (raw probability, label) pairs and return the lookup table."""
+    proba = np.asarray(proba, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    if method == "isotonic":
+        from sklearn.isotonic import IsotonicRegression
+
+        iso = IsotonicRegression(y_min=0.0, y_max=1.0, out_of_bounds="clip").fit(proba, y)
+        # IsotonicRegression.predict interpolates linearly between these knots, so np.interp
+        # over them reproduces it exactly (up to thinning)
+        x_knots, y_knots = _thin(iso.X_thresholds_, iso.y_thresholds_, max_knots)
+    elif method == "platt":
+        from sklearn.linear_model import LogisticRegression
+
+        logit = np.log(np.clip(proba, _EPS, 1 - _EPS) / np.clip(1 - proba, _EPS, 1 - _EPS))
+        lr = LogisticRegression(C=1e6).fit(logit[:, None], y.astype(int))
+        # Evaluate the sigmoid on a grid uniform in logit space, dense where it bends
+        grid = np.linspace(-10.0, 10.0, max_knots)
+        x_knots = 1.0 / (1.0 + np.exp(-grid))
+        y_knots = lr.predict_proba(grid[:, None])[:, 1]
+    else:
+        raise ValueError(f"Unknown calibration method {method!r}; expected one of {list(METHODS)}")
+    return {
+        "method": method,
+        "x": [float(v) for v in x_knots],
+        "y": [float(v) for v in y_knots],
+    }
+
+
+def apply_calibration(
+    table: Optional[Dict[str, Any]], proba: np.ndarray, clip: float = CLIP
+) -> np.ndarray:
+    """Calibrated probabilities clipped to ``[clip, 1 - clip]`` (``proba`` unchanged when
+    ``table`` is None)."""
+    if not table:
+        return np.asarray(proba, dtype=np.float64)
+    return np.clip(np.interp(proba, table["x"], table["y"]), clip, 1.0 - clip)
+
+
+def reliability_curve(proba: np.ndarray, y: np.ndarray, n_bins: int = 10) -> List[Dict[str, float]]:
+    """Per equal-width probability bin: mean predicted probability, observed win rate, count."""
+    proba = np.asarray(proba, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    bins = np.minimum((proba * n_bins).astype(int), n_bins - 1)
+    count = np.bincount(bins, minlength=n_bins)
+    pred_sum = np.bincount(bins, weights=proba, minlength=n_bins)
+    pos_sum = np.bincount(bins, weights=y, minlength=n_bins)
+    curve: List[Dict[str, float]] = []
+    for b in range(n_bins):
+        if count[b] == 0:
+            continue
+        curve.append(
+            {
+                "bin_lower": b / n_bins,
+                "bin_upper": (b + 1) / n_bins,
+                "mean_predicted": float(pred_sum[b] / count[b]),
+                "fraction_positive": float(pos_sum[b] / count[b]),
+                "count": int(count[b]),
+            }
+        )
+    return curve
+
+
+def expected_calibration_error(proba: np.ndarray, y: np.ndarray, n_bins: int = 10) -> float:
+    curve = reliability_curve(proba, y, n_bins)
+    total = sum(c["count"] for c in curve)
+    if not total:
+        return float("nan")
+    return float(
+        sum(c["count"] * abs(c["mean_predicted"] - c["fraction_positive"]) for c in curve) / total
+    )
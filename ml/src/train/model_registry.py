@@ -0,0 +1,108 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from ..data.ddragon import version_key
+from .native_model import meta_path
+
+MANIFEST_FILE = "manifest.json"
+
+
+@dataclass(frozen=True)
+class RegistryEntry:
+    model_id: str
+    path: str  # bundle file, relative to the registry root
+    patch: Optional[str] = None  # None for a global (all-patch) model
+    created_at: float = 0.0
+    metrics: Dict[str, float] = field(default_factory=dict)
+    # Native LightGBM artifact exported next to the bundle (preferred for serving)
+    native_path: Optional[str] = None
+
+
+def read_manifest(root: Path) -> List[RegistryEntry]:
+    path = Path(root) / MANIFEST_FILE
+    if not path.exists():
+        return []
+    data = json.loads(path.read_text(encoding="utf-8"))
+    return [RegistryEntry(**entry) for entry in data.get("models", [])]
+
+
+def write_manifest(root: Path, entries: List[RegistryEntry]) -> None:
+    """Replace the manifest atomically so a polling server never reads a partial file."""
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    tmp = root / (MANIFEST_FILE + ".tmp")
+    tmp.write_text(json.dumps({"models": [asdict(e) for e in entries]}, indent=2), encoding="utf-8")
+    os.replace(tmp, root / MANIFEST_FILE)
+
+
+def new_model_id(patch: Optional[str]) -> str:
+    # The random suffix keeps two trainings of one patch within a second from sharing an id
+    # (register_model would treat the new files as the old entry's)
+    return f"lgbm-{patch or 'global'}-{time.strftime('%Y%m%d%H%M%S')}-{uuid.uuid4().hex[:8]}"
+
+
+def register_model(
+    root: Path,
+    model_id: str,
+    patch: Optional[str] = None,
+    metrics: Optional[Dict[str, float]] = None,
+) -> RegistryEntry:
+    """Record ``root/<model_id>.joblib`` (and its ``.txt`` native export, if present) as the
+    model for ``patch`` (None = global). Native-only models (out-of-core training) register
+    the ``.txt`` as their path.
+
+    A previous model for the same patch is dropped from the manifest and its files (bundle,
+    native export and its metadata, reliability curves) deleted; servers that already loaded
+    it keep serving from memory until they next refresh.
+    """
+    root = Path(root)
+    bundle = f"{model_id}.joblib"
+    entry = RegistryEntry(
+        model_id=model_id,
+        path=bundle if (root / bundle).exists() else f"{model_id}.txt",
+        patch=patch,
+        created_at=time.time(),
+        metrics=dict(metrics or {}),
+        native_path=f"{model_id}.txt" if (root / f"{model_id}.txt").exists() else None,
+    )
+    if not (root / entry.path).exists():
+        raise FileNotFoundError(root / entry.path)
+    kept: List[RegistryEntry] = []
+    for old in read_manifest(root):
+        if old.patch == patch and old.model_id != model_id:
+            for name in {old.path, old.native_path or old.path}:
+                (root / name).unlink(missing_ok=True)
+                if name.endswith(".txt"):
+                    meta_path(root / name).unlink(missing_ok=True)
+            (root / f"{old.model_id}.reliability.json").unlink(missing_ok=True)
+        elif old.model_id != model_id:
+            kept.append(old)
+    write_manifest(root, [*kept, entry])
+    return entry
+
+
+def resolve_entry(entries: List[RegistryEntry], patch: Optional[str]) -> Optional[RegistryEntry]:
+    """Best model for ``patch``: the newest per-patch model not after it, else the global one.
+
+    None when neither exists (``patch`` predates every per-patch model, or is missing), so
+    the caller falls back to its own default model rather than one trained on a later patch.
+    """
+    per_patch = sorted(
+        (e for e in entries if e.patch and version_key(e.patch)),
+        key=lambda e: version_key(e.patch or ""),
+    )
+    if patch and version_key(patch):
+        earlier = [e for e in per_patch if version_key(e.patch or "") <= version_key(patch or "")]
+        if earlier:
+            return earlier[-1]
+    global_models = [e for e in entries if e.patch is None]
+    if global_models:
+        return max(global_models, key=lambda e: e.created_at)
+    return None
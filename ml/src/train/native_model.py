@@ -0,0 +1,236 @@
+from __future__ import annotations
+
+import ctypes
+import importlib.util
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+# Serving artifact: LightGBM's text model plus a sidecar with the feature order, e.g.
+# model.txt + model.json. Scoring goes straight to lib_lightgbm through ctypes, because
+# `import lightgbm` also imports scikit-learn and pandas when they are installed.
+
+META_SUFFIX = ".json"
+_C_API_DTYPE_FLOAT64 = 1
+_C_API_PREDICT_NORMAL = 0
+
+_LIB: Optional[ctypes.CDLL] = None
+
+
+def meta_path(model_path: Path) -> Path:
+    return Path(model_path).with_suffix(META_SUFFIX)
+
+
+def _lib_name() -> str:
+    if sys.platform == "win32":
+        return "lib_lightgbm.dll"
+    return "lib_lightgbm.dylib" if sys.platform == "darwin" else "lib_lightgbm.so"
+
+
+def _load_lib() -> ctypes.CDLL:
+    """lib_lightgbm from the installed lightgbm wheel, located without importing the package."""
+    global _LIB
+    if _LIB is not None:
+        return _LIB
+    spec = importlib.util.find_spec("lightgbm")
+    candidates = [
+        Path(location) / "lib" / _lib_name()
+        for location in ((spec.submodule_search_locations or []) if spec else [])
+    ]
+    found = next((p for p in candidates if p.exists()), None)
+    if found is None:
+        raise RuntimeError(f"{_lib_name()} not found; is lightgbm installed?")
+    lib = ctypes.cdll.LoadLibrary(str(found))
+    _declare(lib)
+    _LIB = lib
+    return lib
+
+
+def _declare(lib: ctypes.CDLL) -> None:
+    """Prototypes from LightGBM's c_api.h, so ctypes converts (and checks) each argument
+    instead of guessing int widths and passing handles as C ints."""
+    c_int, c_int32, c_int64 = ctypes.c_int, ctypes.c_int32, ctypes.c_int64
+    handle = ctypes.c_void_p
+    prototypes = {
+        "LGBM_GetLastError": (ctypes.c_char_p, []),
+        "LGBM_BoosterCreateFromModelfile": (
+            c_int,
+            [ctypes.c_char_p, ctypes.POINTER(c_int), ctypes.POINTER(handle)],
+        ),
+        "LGBM_BoosterGetNumFeature": (c_int, [handle, ctypes.POINTER(c_int)]),
+        "LGBM_BoosterPredictForMat": (
+            c_int,
+            [
+                handle,  # booster
+                ctypes.c_void_p,  # data
+                c_int,  # data_type
+                c_int32,  # nrow
+                c_int32,  # ncol
+                c_int,  # is_row_major
+                c_int,  # predict_type
+                c_int,  # start_iteration
+                c_int,  # num_iteration
+                ctypes.c_char_p,  # parameter
+                ctypes.POINTER(c_int64),  # out_len
+                ctypes.POINTER(ctypes.c_double),  # out_result
+            ],
+        ),
+        "LGBM_BoosterFree": (c_int, [handle]),
+    }
+    for name, (restype, argtypes) in prototypes.items():
+        fn = getattr(lib, name)
+        fn.restype = restype
+        fn.argtypes = argtypes
+
+
+def _check(ret: int) -> None:
+    if ret != 0:
+        raise RuntimeError(_load_lib().LGBM_GetLastError().decode("utf-8"))
+
+
+def _atomic_write(path: Path, text: str) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(text, encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def export_native(
+    pipeline: Any,
+    feature_names: Sequence[str],
+    path: Path,
+    model_version: Optional[str] = None,
+    calibration: Optional[Dict[str, Any]] = None,
+) -> Path:
+    """Write the pipeline's booster as ``path`` (LightGBM text) plus ``<stem>.json``.
+
+    ``pipeline`` is the bundle's sklearn Pipeline (or a bare LGBMClassifier / Booster).
+    Bundles trained before the scaler was dropped keep a ``StandardScaler(with_mean=False)``
+    step; its ``scale_`` is recorded and applied at predict time. Any other transform is
+    rejected.
+    """
+    steps = list(getattr(pipeline, "steps", [("clf", pipeline)]))
+    clf = steps[-1][1]
+    scale: Optional[np.ndarray] = None
+    for name, step in steps[:-1]:
+        if getattr(step, "with_mean", True) or not hasattr(step, "scale_"):
+            raise ValueError(f"Cannot export pipeline step {name!r} ({type(step).__name__})")
+        if step.scale_ is not None:
+            scale = step.scale_ if scale is None else scale * step.scale_
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    meta = {
+        "format": "lightgbm-text",
+        "feature_names": list(feature_names),
+        "scale": None if scale is None else [float(s) for s in scale],
+        "model_version": model_version,
+        # Piecewise-linear calibration map (calibration.fit_calibration), applied by the caller
+        "calibration": calibration,
+    }
+    # Sidecar first: a watcher keyed on the model file never sees it without its metadata
+    _atomic_write(meta_path(path), json.dumps(meta))
+    _atomic_write(path, getattr(clf, "booster_", clf).model_to_string())
+    return path
+
+
+class NativePredictor:
+    """Minimal scorer for an :func:`export_native` artifact; needs only numpy at import.
+
+    ``predict`` takes an [N, len(feature_names)] float matrix in ``feature_names`` order (NaN
+    for missing) and returns blue-win probabilities; ``predict_proba`` mirrors sklearn's
+    two-column output so it can stand in for the joblib Pipeline.
+    """
+
+    def __init__(self, path: Path, params: str = "") -> None:
+        self.path = Path(path)
+        meta = json.loads(meta_path(self.path).read_text(encoding="utf-8"))
+        self.feature_names: List[str] = list(meta["feature_names"])
+        self.model_version: Optional[str] = meta.get("model_version")
+        self.calibration: Optional[Dict[str, Any]] = meta.get("calibration")
+        scale = meta.get("scale")
+        self._scale = None if scale is None else np.asarray(scale, dtype=np.float64)
+        self._params = params.encode("utf-8")
+        self._lib = _load_lib()
+        self._handle = ctypes.c_void_p()
+        n_iter = ctypes.c_int(0)
+        _check(
+            self._lib.LGBM_BoosterCreateFromModelfile(
+                str(self.path).encode("utf-8"), ctypes.byref(n_iter), ctypes.byref(self._handle)
+            )
+        )
+        n_features = ctypes.c_int(0)
+        _check(self._lib.LGBM_BoosterGetNumFeature(self._handle, ctypes.byref(n_features)))
+        if n_features.value != len(self.feature_names):
+            raise ValueError(
+                f"{self.path} has {n_features.value} features, "
+                f"metadata lists {len(self.feature_names)}"
+            )
+
+    def predict(self, X: Any) -> np.ndarray:
+        data = np.ascontiguousarray(X, dtype=np.float64)
+        if data.ndim == 1:
+            data = data[None, :]
+        if data.shape[1] != len(self.feature_names):
+            raise ValueError(f"Expected {len(self.feature_names)} features, got {data.shape[1]}")
+        if data.shape[0] > np.iinfo(np.int32).max:
+            raise ValueError(f"At most {np.iinfo(np.int32).max} rows per call, got {data.shape[0]}")
+        if self._scale is not None:
+            data = data / self._scale  # same operation as StandardScaler.transform
+        out = np.empty(data.shape[0], dtype=np.float64)
+        out_len = ctypes.c_int64(0)
+        _check(
+            self._lib.LGBM_BoosterPredictForMat(
+                self._handle,
+                data.ctypes.data_as(ctypes.c_void_p),
+                _C_API_DTYPE_FLOAT64,
+                data.shape[0],
+                data.shape[1],
+                1,  # row-major
+                _C_API_PREDICT_NORMAL,
+                0,  # start_iteration
+                -1,  # all iterations
+                self._params,
+                ctypes.byref(out_len),
+                out.ctypes.data_as(ctypes.POINTER(ctypes.c_double)),
+            )
+        )
+        return out
+
+    def predict_proba(self, X: Any) -> np.ndarray:
+        p = self.predict(X)
+        return np.column_stack([1.0 - p, p])
+
+    def __del__(self) -> None:
+        handle = getattr(self, "_handle", None)
+        if handle is not None and handle.value:
+            self._lib.LGBM_BoosterFree(handle)
+            self._handle = ctypes.c_void_p()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    import joblib
+
+    parser = argparse.ArgumentParser(
+        description="Export a model.joblib bundle as a native LightGBM artifact"
+    )
+    parser.add_argument(
+        "--bundle", type=Path, required=True, help="model.joblib written by train_lightgbm"
+    )
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Model text path (default: <bundle>.txt)"
+    )
+    args = parser.parse_args()
+
+    bundle = joblib.load(args.bundle)
+    out = export_native(
+        bundle["pipeline"],
+        bundle["feature_names"],
+        args.output or args.bundle.with_suffix(".txt"),
+        model_version=bundle.get("model_version"),
+    )
+    print(f"Wrote {out} and {meta_path(out)}")
@@ -0,0 +1,186 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import sys
+import time
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+import lightgbm as lgb
+import numpy as np
+import pyarrow.parquet as pq
+
+# Binning parameters baked into a constructed Dataset; part of the cache key
+DATASET_PARAMS: Dict[str, Any] = {
+    "max_bin": 255,
+    "bin_construct_sample_cnt": 200_000,
+    "verbose": -1,
+}
+
+
+def parquet_files(path: Path) -> List[Path]:
+    """``path`` itself, or every ``*.parquet`` under it in sorted order (a partitioned dataset)."""
+    path = Path(path)
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*.parquet") if p.is_file())
+    return [path]
+
+
+def schema_names(path: Path) -> List[str]:
+    return list(pq.read_schema(path).names)
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far (0 where unsupported)."""
+    try:
+        import resource
+    except ImportError:  # Windows
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS, kilobytes on Linux
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+class ParquetSequence(lgb.Sequence):
+    """One parquet file's feature columns as an ``lgb.Sequence``, decoded a row group at a time.
+
+    LightGBM samples rows in increasing order and then reads ``batch_size`` slices front to
+    back, so caching the current row group keeps memory at one decoded row group per file.
+    Write the training set with modest row groups (``save_parquet`` uses 65,536 rows).
+    """
+
+    def __init__(self, path: Path, columns: Sequence[str], batch_size: int = 65_536) -> None:
+        self.path = Path(path)
+        self.columns = list(columns)
+        self.batch_size = batch_size
+        self._file = pq.ParquetFile(self.path)
+        meta = self._file.metadata
+        sizes = [meta.row_group(i).num_rows for i in range(meta.num_row_groups)]
+        self._starts = np.concatenate([[0], np.cumsum(sizes)]).astype(np.int64)
+        self._cached: Tuple[int, Optional[np.ndarray]] = (-1, None)
+
+    def __len__(self) -> int:
+        return int(self._starts[-1])
+
+    def _group_of(self, row: int) -> int:
+        return int(np.searchsorted(self._starts, row, side="right") - 1)
+
+    def _rows(self, group: int) -> np.ndarray:
+        if self._cached[0] != group:
+            table = self._file.read_row_group(group, columns=self.columns)
+            rows = np.empty((table.num_rows, len(self.columns)), dtype=np.float64)
+            for j, name in enumerate(self.columns):
+                rows[:, j] = table.column(name).to_numpy(zero_copy_only=False)
+            self._cached = (group, rows)
+        return self._cached[1]  # type: ignore[return-value]
+
+    def __getitem__(self, idx: Union[int, slice]) -> np.ndarray:
+        if isinstance(idx, slice):
+            start, stop, step = idx.indices(len(self))
+            if step != 1:
+                raise ValueError("ParquetSequence only supports contiguous slices")
+            parts: List[np.ndarray] = []
+            while start < stop:
+                group = self._group_of(start)
+                base = int(self._starts[group])
+                end = min(stop, int(self._starts[group + 1]))
+                parts.append(self._rows(group)[start - base : end - base])
+                start = end
+            return np.concatenate(parts) if parts else np.empty((0, len(self.columns)))
+        row = int(idx) + (len(self) if int(idx) < 0 else 0)
+        group = self._group_of(row)
+        return self._rows(group)[row - int(self._starts[group])]
+
+
+def iter_feature_batches(
+    files: Sequence[Path], columns: Sequence[str], batch_size: int = 65_536
+) -> Iterator[np.ndarray]:
+    """Stream ``columns`` of every file as float64 [rows, len(columns)] blocks."""
+    for path in files:
+        parquet = pq.ParquetFile(path)
+        for batch in parquet.iter_batches(batch_size=batch_size, columns=list(columns)):
+            rows = np.empty((batch.num_rows, len(columns)), dtype=np.float64)
+            for j, name in enumerate(columns):
+                rows[:, j] = batch.column(name).to_numpy(zero_copy_only=False)
+            yield rows
+
+
+def read_column(files: Sequence[Path], name: str) -> np.ndarray:
+    """One column of every file, concatenated (for labels, ids and patches, not features)."""
+    return np.concatenate(
+        [
+            pq.read_table(path, columns=[name]).column(name).to_numpy(zero_copy_only=False)
+            for path in files
+        ]
+    )
+
+
+def dataset_cache_key(files: Sequence[Path], features: Sequence[str], label: str) -> str:
+    """Hash of each input file's path, size and mtime, the feature list and binning params."""
+    fingerprint = {
+        "files": [[str(p.resolve()), p.stat().st_size, p.stat().st_mtime_ns] for p in files],
+        "features": list(features),
+        "label": label,
+        "params": DATASET_PARAMS,
+        "lightgbm": lgb.__version__,
+    }
+    return hashlib.sha1(json.dumps(fingerprint, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def load_or_build_dataset(
+    files: Sequence[Path],
+    features: Sequence[str],
+    label: str,
+    cache_dir: Optional[Path] = None,
+    batch_size: int = 65_536,
+) -> Tuple[lgb.Dataset, Dict[str, Any]]:
+    """Constructed (binned) Dataset over ``files``, reusing ``cache_dir/<key>.bin`` if present.
+
+    On a miss the rows are streamed through :class:`ParquetSequence` (only labels are read in
+    full) and the result is saved in LightGBM's binary format; a hit skips parquet decoding
+    and binning entirely. The returned stats hold the cache path, hit flag, build seconds
+    and peak RSS.
+    """
+    started = time.perf_counter()
+    cache_path: Optional[Path] = None
+    if cache_dir is not None:
+        cache_path = Path(cache_dir) / f"{dataset_cache_key(files, features, label)}.bin"
+    hit = cache_path is not None and cache_path.exists()
+    if hit:
+        dataset = lgb.Dataset(str(cache_path), params=DATASET_PARAMS).construct()
+    else:
+        seqs = [ParquetSequence(path, features, batch_size=batch_size) for path in files]
+        labels = read_column(files, label).astype(np.float32)
+        dataset = lgb.Dataset(
+            seqs,
+            label=labels,
+            feature_name=list(features),
+            params=DATASET_PARAMS,
+            free_raw_data=True,
+        ).construct()
+        if cache_path is not None:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = cache_path.with_name(cache_path.name + ".tmp")
+            dataset.save_binary(str(tmp))
+            os.replace(tmp, cache_path)
+    stats = {
+        "dataset_cache": str(cache_path) if cache_path is not None else None,
+        "dataset_cache_hit": hit,
+        "dataset_rows": int(dataset.num_data()),
+        "dataset_seconds": round(time.perf_counter() - started, 3),
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+    }
+    return dataset, stats
+
+
+def holdout_mask(match_ids: np.ndarray, every: int = 5, remainder: int = 0) -> np.ndarray:
+    """Deterministic ~1/``every`` validation split by match id (stable across runs and files);
+    a different ``remainder`` picks a disjoint split."""
+    return np.fromiter(
+        (zlib.crc32(str(m).encode("utf-8")) % every == remainder for m in match_ids),
+        dtype=bool,
+        count=len(match_ids),
+    )
@@ -1,16 +1,38 @@
 from __future__ import annotations
 
+import json
+import os
 from pathlib import Path
-from typing import List
+from typing import Any, Dict, List, Optional
 
 import joblib
+import lightgbm as lgb
+import numpy as np
 import pandas as pd
 from lightgbm import LGBMClassifier
 from sklearn.metrics import roc_auc_score, brier_score_loss
 from sklearn.model_selection import train_test_split
-from sklearn.preprocessing import StandardScaler
 from sklearn.pipeline import Pipeline
 
+from ..data.ddragon import version_key
+from .calibration import (
+    apply_calibration,
+    expected_calibration_error,
+    fit_calibration,
+    reliability_curve,
+)
+from .model_registry import new_model_id, register_model
+from .native_model import export_native
+from .parquet_dataset import (
+    holdout_mask,
+    iter_feature_batches,
+    load_or_build_dataset,
+    parquet_files,
+    peak_rss_mb,
+    read_column,
+    schema_names,
+)
+
 
 TARGET = "blue_win"
 NON_FEATURE_COLS = {TARGET, "match_id", "patch"}
@@ -20,42 +42,325 @@ def get_feature_columns(df: pd.DataFrame) -> List[str]:
     return [c for c in df.columns if c not in NON_FEATURE_COLS]
 
 
-def train_model(input_parquet: Path, output_model: Path) -> dict:
-    df = pd.read_parquet(input_parquet)
+# Fixed hyperparameters of the default (non-search) training run
+DEFAULT_PARAMS = {
+    "n_estimators": 600,
+    "learning_rate": 0.03,
+    "max_depth": -1,
+    "num_leaves": 64,
+    "subsample": 0.8,
+    "colsample_bytree": 0.8,
+    "reg_alpha": 0.0,
+    "reg_lambda": 1.0,
+    "random_state": 42,
+}
+
+
+def build_pipeline(params: Optional[Dict[str, Any]] = None) -> Pipeline:
+    # Trees are invariant to per-feature scaling, so there is no scaler step; the Pipeline
+    # wrapper keeps the bundle format unchanged for existing loaders
+    return Pipeline(steps=[("clf", LGBMClassifier(**{**DEFAULT_PARAMS, **(params or {})}))])
+
+
+def load_training_frame(input_parquet: Path, patch: Optional[str] = None) -> pd.DataFrame:
+    return select_patch(pd.read_parquet(input_parquet), patch)
+
+
+def select_patch(df: pd.DataFrame, patch: Optional[str] = None) -> pd.DataFrame:
+    if patch is not None:
+        df = df[df["patch"].astype(str) == patch].reset_index(drop=True)
+        if df.empty:
+            raise ValueError(f"No training rows for patch {patch}")
+    return df
+
+
+def calibration_split(patches: pd.Series, y: pd.Series) -> pd.Series:
+    """Boolean mask of the rows held out for calibration: the newest patch when there are
+    several, else a stratified random 20%."""
+    ordered = sorted(patches.astype(str).unique(), key=lambda p: (version_key(p), p))
+    if len(ordered) >= 2:
+        return patches.astype(str) == ordered[-1]
+    _, held = train_test_split(y.index, test_size=0.2, random_state=42, stratify=y)
+    return pd.Series(y.index.isin(held), index=y.index)
+
+
+def calibrate(
+    method: str,
+    cal_proba: np.ndarray,
+    y_cal: np.ndarray,
+    metrics: Dict[str, Any],
+    reliability: Dict[str, Any],
+    val_proba: Optional[np.ndarray] = None,
+    y_val: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """Fit the calibration table on held-out predictions and add its diagnostics to
+    ``metrics`` / ``reliability`` (validation ones only when ``val_proba`` is given)."""
+    table = fit_calibration(cal_proba, y_cal, method=method)
+    reliability["calibration_set"] = {"raw": reliability_curve(cal_proba, y_cal)}
+    metrics.update(
+        {
+            "calibration": method,
+            "n_calibration": int(len(y_cal)),
+            "calibration_knots": len(table["x"]),
+        }
+    )
+    if val_proba is not None and y_val is not None and len(y_val):
+        val_calibrated = apply_calibration(table, val_proba)
+        reliability.setdefault("validation", {})["calibrated"] = reliability_curve(
+            val_calibrated, y_val
+        )
+        metrics.update(
+            {
+                "val_brier_calibrated": float(brier_score_loss(y_val, val_calibrated)),
+                "val_ece": expected_calibration_error(val_proba, y_val),
+                "val_ece_calibrated": expected_calibration_error(val_calibrated, y_val),
+            }
+        )
+    reliability["calibration"] = table
+    return table
+
+
+def calibration_holdout(patches: np.ndarray, match_ids: np.ndarray, rows: np.ndarray) -> np.ndarray:
+    """calibration_split for out-of-core training: among ``rows`` (a boolean mask), the newest
+    patch when there are several, else the ~20% of matches picked by match id (disjoint from
+    holdout_mask's validation split)."""
+    patches = patches.astype(str)
+    ordered = sorted(set(patches[rows]), key=lambda p: (version_key(p), p))
+    if len(ordered) >= 2:
+        return rows & (patches == ordered[-1])
+    return rows & holdout_mask(match_ids, remainder=1)
+
+
+def train_model(
+    input_parquet: Path,
+    output_model: Optional[Path] = None,
+    patch: Optional[str] = None,
+    registry: Optional[Path] = None,
+    calibration: Optional[str] = "isotonic",
+) -> dict:
+    """Train and save a bundle to ``output_model`` and/or register it under ``registry``.
+
+    Each joblib bundle gets a native serving artifact next to it (``.txt`` booster + ``.json``
+    feature order, see native_model.NativePredictor).
+
+    ``patch`` restricts training to that patch's rows and keys the registry entry; without it
+    the model is registered as the global fallback.
+
+    ``calibration`` ("isotonic", "platt" or None) is fit on rows the model never sees (see
+    calibration_split) and stored in the bundle as a piecewise-linear table; reliability
+    curves for the validation split are written to ``<model>.reliability.json``.
+    """
+    if output_model is None and registry is None:
+        raise ValueError("Pass output_model and/or registry")
+    return train_frame(
+        load_training_frame(input_parquet, patch), output_model, patch, registry, calibration
+    )
+
+
+def train_frame(
+    df: pd.DataFrame,
+    output_model: Optional[Path] = None,
+    patch: Optional[str] = None,
+    registry: Optional[Path] = None,
+    calibration: Optional[str] = "isotonic",
+) -> dict:
+    """:func:`train_model` on an in-memory training frame (already restricted to ``patch``)."""
+    if output_model is None and registry is None:
+        raise ValueError("Pass output_model and/or registry")
     X = df[get_feature_columns(df)]
     y = df[TARGET].astype(int)
 
-    X_train, X_val, y_train, y_val = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
-
-    pipeline = Pipeline(
-        steps=[
-            ("scaler", StandardScaler(with_mean=False)),
-            (
-                "clf",
-                LGBMClassifier(
-                    n_estimators=600,
-                    learning_rate=0.03,
-                    max_depth=-1,
-                    num_leaves=64,
-                    subsample=0.8,
-                    colsample_bytree=0.8,
-                    reg_alpha=0.0,
-                    reg_lambda=1.0,
-                    random_state=42,
-                ),
-            ),
-        ]
+    X_train, X_val, y_train, y_val = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
     )
+    held = pd.Series(False, index=y_train.index)
+    if calibration is not None:
+        held = calibration_split(df.loc[X_train.index, "patch"], y_train)
 
-    pipeline.fit(X_train, y_train)
+    pipeline = build_pipeline()
+    pipeline.fit(X_train[~held], y_train[~held])
     val_proba = pipeline.predict_proba(X_val)[:, 1]
     auc = roc_auc_score(y_val, val_proba)
     brier = brier_score_loss(y_val, val_proba)
 
-    output_model.parent.mkdir(parents=True, exist_ok=True)
-    joblib.dump({"pipeline": pipeline, "feature_names": get_feature_columns(df)}, output_model)
+    metrics = {
+        "val_auc": float(auc),
+        "val_brier": float(brier),
+        "n_train": int((~held).sum()),
+        "n_val": int(len(X_val)),
+    }
+    table = None
+    reliability: Dict[str, Any] = {"validation": {"raw": reliability_curve(val_proba, y_val)}}
+    if calibration is not None:
+        cal_proba = pipeline.predict_proba(X_train[held])[:, 1]
+        table = calibrate(
+            calibration, cal_proba, y_train[held], metrics, reliability, val_proba, y_val
+        )
+    reliability["calibration"] = table
+    return save_model(
+        pipeline,
+        get_feature_columns(df),
+        metrics,
+        output_model,
+        registry,
+        patch,
+        calibration=table,
+        reliability=reliability,
+    )
+
+
+def train_model_out_of_core(
+    input_path: Path,
+    output_model: Optional[Path] = None,
+    patch: Optional[str] = None,
+    registry: Optional[Path] = None,
+    cache_dir: Optional[Path] = None,
+    batch_size: int = 65_536,
+    calibration: Optional[str] = "isotonic",
+) -> dict:
+    """train_model for training sets larger than memory (a parquet file or directory of parts).
+
+    Rows are streamed into a binned LightGBM Dataset (cached under ``cache_dir``, see
+    parquet_dataset.load_or_build_dataset) and split with Dataset.subset, so raw features are
+    never materialized; validation is the ~20% of matches picked by holdout_mask, scored
+    batch by batch. ``calibration`` is fit like train_model's on rows left out of the fit
+    (see calibration_holdout). Only the native ``.txt``/``.json`` artifact is written (no
+    joblib bundle).
+    """
+    if output_model is None and registry is None:
+        raise ValueError("Pass output_model and/or registry")
+    files = parquet_files(input_path)
+    if not files:
+        raise ValueError(f"No parquet files under {input_path}")
+    features = [c for c in schema_names(files[0]) if c not in NON_FEATURE_COLS]
+    dataset, stats = load_or_build_dataset(files, features, TARGET, cache_dir, batch_size)
+
+    labels = dataset.get_label()
+    match_ids = read_column(files, "match_id")
+    patches = read_column(files, "patch").astype(str)
+    val = holdout_mask(match_ids)
+    keep = np.ones(len(val), dtype=bool)
+    if patch is not None:
+        keep = patches == patch
+        if not keep.any():
+            raise ValueError(f"No training rows for patch {patch}")
+    val &= keep
+    held = np.zeros(len(val), dtype=bool)
+    if calibration is not None:
+        held = calibration_holdout(patches, match_ids, keep & ~val)
+    train_idx = np.flatnonzero(keep & ~val & ~held).astype(np.int32)
+
+    params = {**DEFAULT_PARAMS, "objective": "binary", "verbose": -1}
+    n_rounds = params.pop("n_estimators")
+    booster = lgb.train(params, dataset.subset(train_idx), num_boost_round=n_rounds)
+
+    # Score the validation and calibration rows batch by batch from parquet
+    scored_idx = np.flatnonzero(val | held)
+    scored: List[np.ndarray] = []
+    offset = 0
+    for rows in iter_feature_batches(files, features, batch_size):
+        in_batch = scored_idx[(scored_idx >= offset) & (scored_idx < offset + len(rows))] - offset
+        if len(in_batch):
+            scored.append(booster.predict(rows[in_batch]))
+        offset += len(rows)
+    scored_proba = np.concatenate(scored) if scored else np.empty(0)
+    proba = scored_proba[val[scored_idx]]
+    y_val = labels[val]
+
+    metrics = {
+        "val_auc": float(roc_auc_score(y_val, proba)) if len(set(y_val)) > 1 else float("nan"),
+        "val_brier": float(brier_score_loss(y_val, proba)) if len(y_val) else float("nan"),
+        "n_train": int(len(train_idx)),
+        "n_val": int(val.sum()),
+        **stats,
+    }
+    table = None
+    reliability: Optional[Dict[str, Any]] = None
+    if calibration is not None:
+        if not held.any():
+            raise ValueError("No rows left to fit the calibration on")
+        reliability = {"validation": {"raw": reliability_curve(proba, y_val)}}
+        table = calibrate(
+            calibration,
+            scored_proba[held[scored_idx]],
+            labels[held],
+            metrics,
+            reliability,
+            proba,
+            y_val,
+        )
+    metrics["peak_rss_mb"] = round(peak_rss_mb(), 1)
+    return save_model(
+        booster,
+        features,
+        metrics,
+        output_model,
+        registry,
+        patch,
+        calibration=table,
+        reliability=reliability,
+    )
+
+
+def save_model(
+    model: Any,
+    feature_names: List[str],
+    metrics: Dict[str, Any],
+    output_model: Optional[Path] = None,
+    registry: Optional[Path] = None,
+    patch: Optional[str] = None,
+    calibration: Optional[Dict[str, Any]] = None,
+    reliability: Optional[Dict[str, Any]] = None,
+) -> Dict[str, Any]:
+    """Write the joblib bundle + native export to ``output_model`` and/or the registry.
+
+    A bare ``lgb.Booster`` (out-of-core training) gets only the native export.
+    ``calibration`` travels in both artifacts; ``reliability`` is written beside them.
+    """
+    native_only = isinstance(model, lgb.Booster)
+    bundle = {"pipeline": model, "feature_names": list(feature_names), "calibration": calibration}
+    targets: List[Path] = []
+    if output_model is not None:
+        if not native_only:
+            _dump_atomic(bundle, output_model)
+        export_native(
+            model,
+            bundle["feature_names"],
+            Path(output_model).with_suffix(".txt"),
+            calibration=calibration,
+        )
+        targets.append(Path(output_model))
+    if registry is not None:
+        model_id = new_model_id(patch)
+        if not native_only:
+            _dump_atomic(
+                {**bundle, "model_version": model_id}, Path(registry) / f"{model_id}.joblib"
+            )
+        export_native(
+            model,
+            bundle["feature_names"],
+            Path(registry) / f"{model_id}.txt",
+            model_version=model_id,
+            calibration=calibration,
+        )
+        targets.append(Path(registry) / f"{model_id}.joblib")
+        # Registry metrics stay scalar; search logs are returned to the caller only
+        scalars = {k: v for k, v in metrics.items() if isinstance(v, (int, float))}
+        register_model(registry, model_id, patch=patch, metrics=scalars)
+        metrics["model_id"] = model_id
+    if reliability is not None:
+        for target in targets:
+            path = target.with_name(f"{target.stem}.reliability.json")
+            path.write_text(json.dumps(reliability, indent=2), encoding="utf-8")
+    return metrics
 
-    return {"val_auc": float(auc), "val_brier": float(brier), "n_train": int(len(X_train)), "n_val": int(len(X_val))}
+
+def _dump_atomic(bundle: dict, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Write then rename so a serving process watching the path never reads a partial file
+    tmp_path = path.with_name(path.name + ".tmp")
+    joblib.dump(bundle, tmp_path)
+    os.replace(tmp_path, path)
 
 
 if __name__ == "__main__":
@@ -63,10 +368,62 @@ if __name__ == "__main__":
 
     parser = argparse.ArgumentParser()
     parser.add_argument("--input", type=Path, required=True, help="Path to training parquet")
-    parser.add_argument("--output", type=Path, required=True, help="Path to write model.joblib")
+    parser.add_argument("--output", type=Path, default=None, help="Path to write model.joblib")
+    parser.add_argument(
+        "--registry", type=Path, default=None, help="Model registry directory (manifest.json)"
+    )
+    parser.add_argument(
+        "--patch",
+        type=str,
+        default=None,
+        help="Train only on this patch and register it for that patch",
+    )
+    parser.add_argument(
+        "--out-of-core",
+        action="store_true",
+        help=(
+            "Stream --input (parquet file or directory) into a LightGBM Dataset; "
+            "writes only the native model.txt"
+        ),
+    )
+    parser.add_argument(
+        "--calibration",
+        choices=["isotonic", "platt", "none"],
+        default="isotonic",
+        help="Calibration fit on the newest patch (or a random 20%%) held out from training",
+    )
+    parser.add_argument(
+        "--dataset-cache",
+        type=Path,
+        default=None,
+        help="Directory for LightGBM binary Dataset caches",
+    )
+    parser.add_argument(
+        "--batch-size", type=int, default=65_536, help="Rows per streamed batch (--out-of-core)"
+    )
     args = parser.parse_args()
+    if args.output is None and args.registry is None:
+        parser.error("pass --output and/or --registry")
 
-    metrics = train_model(args.input, args.output)
+    calibration = None if args.calibration == "none" else args.calibration
+    if args.out_of_core:
+        metrics = train_model_out_of_core(
+            args.input,
+            args.output,
+            patch=args.patch,
+            registry=args.registry,
+            cache_dir=args.dataset_cache,
+            batch_size=args.batch_size,
+            calibration=calibration,
+        )
+    else:
+        metrics = train_model(
+            args.input,
+            args.output,
+            patch=args.patch,
+            registry=args.registry,
+            calibration=calibration,
+        )
     print(metrics)
 
 
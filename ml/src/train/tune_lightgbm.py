@@ -0,0 +1,364 @@
+from __future__ import annotations
+
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+from ..data.ddragon import version_key
+from .train_lightgbm import (
+    DEFAULT_PARAMS,
+    TARGET,
+    build_pipeline,
+    calibrate,
+    calibration_split,
+    get_feature_columns,
+    load_training_frame,
+    save_model,
+)
+
+Fold = Tuple[np.ndarray, np.ndarray]  # (train row ids, validation row ids)
+
+# (scale, low, high) per sampled hyperparameter; the rest come from DEFAULT_PARAMS
+SEARCH_SPACE: Dict[str, Tuple[str, float, float]] = {
+    "learning_rate": ("log", 0.01, 0.2),
+    "num_leaves": ("int_log", 8, 256),
+    "min_child_samples": ("int_log", 5, 200),
+    "subsample": ("uniform", 0.5, 1.0),
+    "colsample_bytree": ("uniform", 0.5, 1.0),
+    "reg_lambda": ("log", 1e-3, 10.0),
+}
+MAX_ROUNDS = 5000
+EARLY_STOPPING_ROUNDS = 100
+# Tail of each fold's training window held out for early stopping, so the validation
+# patch is never used to pick the number of rounds
+EARLY_STOPPING_FRACTION = 0.1
+# Lower is better for every metric; AUC is negated when used for selection
+METRICS = ("brier", "logloss", "auc")
+
+
+def sample_params(rng: np.random.Generator) -> Dict[str, Any]:
+    params: Dict[str, Any] = {}
+    for name, (scale, low, high) in SEARCH_SPACE.items():
+        if scale == "uniform":
+            params[name] = float(rng.uniform(low, high))
+        else:
+            value = math.exp(rng.uniform(math.log(low), math.log(high)))
+            params[name] = int(round(value)) if scale == "int_log" else float(value)
+    # LightGBM only bags rows when subsample_freq > 0
+    params["subsample_freq"] = 1
+    return params
+
+
+def rolling_origin_folds(df: pd.DataFrame, n_folds: int) -> List[Fold]:
+    """Expanding-window folds, oldest first: train on every patch before the validation patch.
+
+    With a single patch (e.g. a per-patch model) rows are split into ``n_folds + 1``
+    contiguous blocks in file order instead.
+    """
+    patches = df["patch"].astype(str).to_numpy()
+    ordered = sorted(set(patches), key=lambda p: (version_key(p), p))
+    if len(ordered) >= 2:
+        groups = [np.flatnonzero(patches == p) for p in ordered]
+    else:
+        groups = [g for g in np.array_split(np.arange(len(df)), n_folds + 1) if len(g)]
+    n = min(n_folds, len(groups) - 1)
+    if n < 1:
+        raise ValueError("Need at least two patches (or rows for two blocks) to validate")
+    return [(np.concatenate(groups[:k]), groups[k]) for k in range(len(groups) - n, len(groups))]
+
+
+# Per-worker state set by _init_worker so each task only pickles its params
+_X: Optional[np.ndarray] = None
+_Y: Optional[np.ndarray] = None
+_FOLDS: List[Fold] = []
+_THREADS = 1
+
+
+def _materialize(df: pd.DataFrame, folds: List[Fold], directory: Path) -> None:
+    """Write X, y and the fold indices as .npy files for the workers to memory-map."""
+    np.save(directory / "X.npy", df[get_feature_columns(df)].to_numpy(dtype=np.float64))
+    np.save(directory / "y.npy", df[TARGET].astype(int).to_numpy())
+    for k, (train_idx, val_idx) in enumerate(folds):
+        np.save(directory / f"fold{k}_train.npy", train_idx)
+        np.save(directory / f"fold{k}_val.npy", val_idx)
+
+
+def _init_worker(data_dir: str, n_folds: int, threads: int) -> None:
+    # Memory-mapped, so every worker shares the parent's page cache instead of holding its
+    # own copy of the training matrix
+    global _X, _Y, _FOLDS, _THREADS
+    directory = Path(data_dir)
+    _X = np.load(directory / "X.npy", mmap_mode="r")
+    _Y = np.load(directory / "y.npy", mmap_mode="r")
+    _FOLDS = [
+        (
+            np.load(directory / f"fold{k}_train.npy", mmap_mode="r"),
+            np.load(directory / f"fold{k}_val.npy", mmap_mode="r"),
+        )
+        for k in range(n_folds)
+    ]
+    _THREADS = threads
+
+
+def _run_fold(candidate: int, fold: int, params: Dict[str, Any]) -> Dict[str, Any]:
+    """Fit one candidate on one fold with early stopping; returns that fold's scores."""
+    import lightgbm as lgb
+    from sklearn.metrics import brier_score_loss, log_loss, roc_auc_score
+
+    assert _X is not None and _Y is not None
+    started = time.perf_counter()
+    train_idx, val_idx = _FOLDS[fold]
+    n_es = max(1, int(len(train_idx) * EARLY_STOPPING_FRACTION))
+    fit_idx, es_idx = train_idx[:-n_es], train_idx[-n_es:]
+    # Native API: the sklearn names in DEFAULT_PARAMS are all accepted as LightGBM aliases
+    native = {
+        **DEFAULT_PARAMS,
+        **params,
+        "objective": "binary",
+        "num_threads": _THREADS,
+        "verbose": -1,
+    }
+    native.pop("n_estimators", None)
+    train_set = lgb.Dataset(_X[fit_idx], _Y[fit_idx])
+    booster = lgb.train(
+        native,
+        train_set,
+        num_boost_round=MAX_ROUNDS,
+        valid_sets=[lgb.Dataset(_X[es_idx], _Y[es_idx], reference=train_set)],
+        callbacks=[lgb.early_stopping(EARLY_STOPPING_ROUNDS, verbose=False)],
+    )
+    proba = booster.predict(_X[val_idx], num_iteration=booster.best_iteration)
+    y_val = _Y[val_idx]
+    return {
+        "candidate": candidate,
+        "fold": fold,
+        "auc": float(roc_auc_score(y_val, proba)) if len(set(y_val)) > 1 else float("nan"),
+        "brier": float(brier_score_loss(y_val, proba)),
+        "logloss": float(log_loss(y_val, proba, labels=[0, 1])),
+        "best_iteration": int(booster.best_iteration or MAX_ROUNDS),
+        "n_train": int(len(fit_idx)),
+        "n_val": int(len(val_idx)),
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def _score(results: Iterable[Dict[str, Any]], metric: str) -> float:
+    values = [r[metric] for r in results]
+    mean = float(np.nanmean(values)) if values else float("nan")
+    return -mean if metric == "auc" else mean
+
+
+def search(
+    input_parquet: Path,
+    output_model: Optional[Path] = None,
+    registry: Optional[Path] = None,
+    patch: Optional[str] = None,
+    n_candidates: int = 20,
+    n_folds: int = 3,
+    strategy: str = "random",
+    eta: int = 3,
+    metric: str = "brier",
+    workers: Optional[int] = None,
+    threads_per_worker: int = 1,
+    seed: int = 42,
+    calibration: Optional[str] = "isotonic",
+) -> Dict[str, Any]:
+    """Hyperparameter search scored by patch-ordered rolling-origin validation.
+
+    Every (candidate, fold) fit is one task on a process pool (``workers`` processes with
+    ``threads_per_worker`` LightGBM threads each), so wall-clock time scales with cores. The
+    feature matrix is written once to a temporary .npy that the workers memory-map, so
+    memory does not grow with the worker count.
+    ``strategy="random"`` runs all candidates on all folds; ``"halving"`` is successive
+    halving with folds as the budget: candidates start on the newest fold, and only the best
+    ``1/eta`` move on to ``eta`` times as many folds. Candidate 0 is DEFAULT_PARAMS. The best
+    candidate is refit on all rows with the mean of its early-stopped round counts and
+    saved like train_model; with ``calibration`` the calibration_split rows are left out of
+    the refit and used to fit the calibration table.
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric {metric!r}; expected one of {list(METRICS)}")
+    if strategy not in ("random", "halving"):
+        raise ValueError(f"Unknown strategy {strategy!r}; expected 'random' or 'halving'")
+    df = load_training_frame(input_parquet, patch)
+    folds = rolling_origin_folds(df, n_folds)
+    n_folds = len(folds)
+    workers = workers or max(1, (os.cpu_count() or 1) // threads_per_worker)
+
+    rng = np.random.default_rng(seed)
+    candidates: List[Dict[str, Any]] = [{}] + [sample_params(rng) for _ in range(n_candidates - 1)]
+    results: Dict[Tuple[int, int], Dict[str, Any]] = {}
+    newest_first = list(reversed(range(n_folds)))
+    started = time.perf_counter()
+
+    data_dir = tempfile.TemporaryDirectory(prefix="tune_lightgbm-")
+    _materialize(df, folds, Path(data_dir.name))
+    # spawn, not fork: a forked child inheriting the parent's OpenMP state can deadlock LightGBM
+    with data_dir, ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(data_dir.name, n_folds, threads_per_worker),
+    ) as pool:
+
+        def run(tasks: List[Tuple[int, int]]) -> None:
+            pending: Set[Future] = set()
+
+            def collect(done: Iterable[Future]) -> None:
+                for fut in done:
+                    r = fut.result()
+                    results[(r["candidate"], r["fold"])] = r
+                    print(
+                        f"candidate {r['candidate']:>3} fold {r['fold']}: auc={r['auc']:.4f} "
+                        f"brier={r['brier']:.4f} logloss={r['logloss']:.4f} "
+                        f"rounds={r['best_iteration']} ({r['seconds']:.1f}s)",
+                        flush=True,
+                    )
+
+            for c, f in tasks:
+                if (c, f) in results:
+                    continue
+                pending.add(pool.submit(_run_fold, c, f, candidates[c]))
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+            collect(pending)
+
+        alive = list(range(len(candidates)))
+        if strategy == "random":
+            run([(c, f) for c in alive for f in newest_first])
+        else:
+            budget = 1
+            while True:
+                run([(c, f) for c in alive for f in newest_first[:budget]])
+                if budget >= n_folds or len(alive) == 1:
+                    break
+                alive.sort(
+                    key=lambda c: _score((results[(c, f)] for f in newest_first[:budget]), metric)
+                )
+                alive = alive[: max(1, math.ceil(len(alive) / eta))]
+                budget = min(n_folds, budget * eta)
+        # Only candidates that reached the final rung compete, on the same folds
+        used = newest_first[:budget] if strategy == "halving" else newest_first
+        best = min(alive, key=lambda c: _score((results[(c, f)] for f in used), metric))
+
+    best_folds = [results[(best, f)] for f in sorted(used)]
+    n_estimators = max(1, int(round(np.mean([r["best_iteration"] for r in best_folds]))))
+    best_params = {**candidates[best], "n_estimators": n_estimators}
+
+    features = get_feature_columns(df)
+    y = df[TARGET].astype(int)
+    held = pd.Series(False, index=df.index)
+    if calibration is not None:
+        held = calibration_split(df["patch"], y)
+    pipeline = build_pipeline(best_params)
+    pipeline.fit(df.loc[~held, features], y[~held])
+
+    metrics: Dict[str, Any] = {
+        f"cv_{m}": float(np.nanmean([r[m] for r in best_folds])) for m in METRICS
+    }
+    metrics.update(
+        {
+            "n_train": int((~held).sum()),
+            "n_folds": len(used),
+            "n_candidates": len(candidates),
+            "n_fits": len(results),
+            "best_candidate": best,
+            "best_params": best_params,
+            "folds": best_folds,
+            "search_seconds": round(time.perf_counter() - started, 1),
+            "workers": workers,
+        }
+    )
+    table = None
+    reliability: Optional[Dict[str, Any]] = None
+    if calibration is not None:
+        reliability = {}
+        cal_proba = pipeline.predict_proba(df.loc[held, features])[:, 1]
+        table = calibrate(calibration, cal_proba, y[held], metrics, reliability)
+    if output_model is not None or registry is not None:
+        save_model(
+            pipeline,
+            features,
+            metrics,
+            output_model,
+            registry,
+            patch,
+            calibration=table,
+            reliability=reliability,
+        )
+    return metrics
+
+
+def main() -> None:
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(
+        description="Rolling-origin CV hyperparameter search for the LightGBM draft model"
+    )
+    parser.add_argument("--input", type=Path, required=True, help="Path to training parquet")
+    parser.add_argument(
+        "--output", type=Path, default=None, help="Path to write the best model.joblib"
+    )
+    parser.add_argument(
+        "--registry", type=Path, default=None, help="Model registry directory (manifest.json)"
+    )
+    parser.add_argument(
+        "--patch",
+        type=str,
+        default=None,
+        help="Search on this patch only and register it for that patch",
+    )
+    parser.add_argument(
+        "--candidates", type=int, default=20, help="Hyperparameter sets, including the defaults"
+    )
+    parser.add_argument(
+        "--folds", type=int, default=3, help="Newest patches used as validation folds"
+    )
+    parser.add_argument("--strategy", choices=["random", "halving"], default="random")
+    parser.add_argument("--eta", type=int, default=3, help="Successive-halving reduction factor")
+    parser.add_argument("--metric", choices=list(METRICS), default="brier", help="Selection metric")
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Processes (default: cores / threads)"
+    )
+    parser.add_argument(
+        "--threads-per-worker", type=int, default=1, help="LightGBM threads per process"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--calibration",
+        choices=["isotonic", "platt", "none"],
+        default="isotonic",
+        help="Calibration fit on the newest patch (or a random 20%%) held out from the refit",
+    )
+    args = parser.parse_args()
+
+    metrics = search(
+        args.input,
+        output_model=args.output,
+        registry=args.registry,
+        patch=args.patch,
+        n_candidates=args.candidates,
+        n_folds=args.folds,
+        strategy=args.strategy,
+        eta=args.eta,
+        metric=args.metric,
+        workers=args.workers,
+        threads_per_worker=args.threads_per_worker,
+        seed=args.seed,
+        calibration=None if args.calibration == "none" else args.calibration,
+    )
+    print(json.dumps({k: v for k, v in metrics.items() if k != "folds"}, indent=2, default=str))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ _TEAM_POSITION_MAP = {
     "MIDDLE": "mid",
     "BOTTOM": "adc",
     "SUPPORT": "sup",
+    "UTILITY": "sup",  # match-v5 teamPosition for supports
 }
 
 